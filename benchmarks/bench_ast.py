@@ -0,0 +1,193 @@
+"""
+Measure AST memory per node and postfix walk throughput, and compare the
+tuple nodes the parser builds against the alternatives: a `__slots__`
+class per node, and a flat pool of parallel arrays indexed by node.
+
+Run from the project root:
+
+    python -m benchmarks.bench_ast [terms]
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+from array import array
+from parser import Parser
+
+from evaluator import Evaluator, NodeType
+from lexer import Lexer
+
+BINARY, UNARY = NodeType.BINARY_OP, NodeType.UNARY_OP
+
+
+class SlotNode:
+    """An AST node as a `__slots__` instance; leaves are not shared."""
+
+    __slots__ = ("kind", "value", "left", "right")
+
+    def __init__(self, kind, value, left=None, right=None):
+        self.kind = kind
+        self.value = value
+        self.left = left
+        self.right = right
+
+
+class NodePool:
+    """Every node of an AST in parallel arrays, children by index."""
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.values = []
+        self.left = array("i")
+        self.right = array("i")
+
+    def add(self, kind, value, left=-1, right=-1) -> int:
+        self.kinds.append(kind)
+        self.values.append(value)
+        self.left.append(left)
+        self.right.append(right)
+        return len(self.kinds) - 1
+
+
+def convert(ast, make):
+    """
+    Rebuild the expression of an assignment bottom-up with `make(kind,
+    value, *children)`, without recursing.
+    """
+    stack, built = [(ast[2], False)], []
+    while stack:
+        node, ready = stack.pop()
+        kind = node[0]
+        if kind is BINARY or kind is UNARY:
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node[2:]))
+                continue
+            children = built[len(built) - len(node) + 2 :]
+            del built[len(built) - len(node) + 2 :]
+            built.append(make(kind, node[1], *children))
+        else:
+            built.append(make(kind, node[1]))
+    return built[0]
+
+
+def walk_tuples(ast) -> int:
+    visited, stack = 0, [ast[2]]
+    while stack:
+        node = stack.pop()
+        visited += 1
+        if node[0] is BINARY:
+            stack.append(node[3])
+            stack.append(node[2])
+        elif node[0] is UNARY:
+            stack.append(node[2])
+    return visited
+
+
+def walk_slots(root) -> int:
+    visited, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        visited += 1
+        if node.kind is BINARY:
+            stack.append(node.right)
+            stack.append(node.left)
+        elif node.kind is UNARY:
+            stack.append(node.left)
+    return visited
+
+
+def walk_pool(pool_root) -> int:
+    pool, root = pool_root
+    kinds, left, right = pool.kinds, pool.left, pool.right
+    visited, stack = 0, [root]
+    while stack:
+        index = stack.pop()
+        visited += 1
+        kind = kinds[index]
+        if kind == BINARY:
+            stack.append(right[index])
+            stack.append(left[index])
+        elif kind == UNARY:
+            stack.append(left[index])
+    return visited
+
+
+def traced(build):
+    """What `build()` returns and the memory it still holds."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def compare(ast, nodes: int, size: int) -> None:
+    """
+    Memory and traversal speed of each node representation, given the
+    memory the parser's tuples take.
+    """
+
+    def pool():
+        pool = NodePool()
+        return pool, convert(ast, pool.add)
+
+    representations = [
+        ("tuples", None, walk_tuples),
+        ("__slots__", lambda: convert(ast, SlotNode), walk_slots),
+        ("flat pool", pool, walk_pool),
+    ]
+    print(f"{'':>10} {'B/node':>8} {'traverse':>9}")
+    for name, build, walk in representations:
+        # The tuples were built by the parser, and measured there
+        root, size = (ast, size) if build is None else traced(build)
+        assert walk(root) == nodes - 1
+        seconds = min(timeit.repeat(lambda: walk(root), number=1, repeat=5))
+        print(f"{name:>10} {size / nodes:8.1f} {seconds:8.3f}s")
+
+
+def make_expression(terms: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = [f"v{rng.randrange(100)}"]
+    for i in range(terms):
+        operand = f"v{rng.randrange(100)}" if i % 2 else str(rng.randrange(50))
+        if i % 7 == 0:
+            operand = f"-({operand} + v{rng.randrange(100)})"
+        parts.append(rng.choice("+-*/%") + " " + operand)
+    return "x = " + " ".join(parts)
+
+
+def count_nodes(ast) -> int:
+    count, stack = 0, [ast]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(child for child in node[2:] if type(child) is tuple)
+    return count
+
+
+def main(terms: int = 200_000) -> None:
+    buffer = Lexer(make_expression(terms)).tokenize_buffer()
+
+    tracemalloc.start()
+    ast = Parser(buffer).parse()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(ast)
+
+    def walk():
+        Evaluator(ast, {}).evaluate()
+
+    walk_time = min(timeit.repeat(walk, number=1, repeat=5))
+
+    print(f"nodes: {nodes}")
+    print(f"memory: {size / nodes:.1f} B/node")
+    rate = nodes / walk_time / 1e6
+    print(f"walk:   {walk_time:.3f}s ({rate:.2f} M nodes/s)")
+    print()
+    compare(ast, nodes, size)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
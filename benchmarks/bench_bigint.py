@@ -0,0 +1,60 @@
+"""
+Time a document whose intermediates grow to ~100k digits, comparing the
+VM's direct arithmetic with the previous eval() string round trip.
+
+Run from the project root:
+
+    python -m benchmarks.bench_bigint [digits]
+"""
+
+import sys
+import time
+from parser import Parser
+
+from benchmarks.bench_vm import legacy_execute
+from evaluator import Evaluator, format_number
+
+
+def make_document(digits: int) -> str:
+    # Squaring doubles the digit count; a_n has about 0.85 * 2**n digits.
+    # Each line also adds and subtracts a big intermediate.
+    lines = ["a0 = 7"]
+    i = 0
+    while 0.85 * 2**i < digits:
+        lines.append(f"a{i + 1} = a{i} * a{i} + a{i} - a{i} % 1000")
+        i += 1
+    lines.append(f"result = a{i} * 3 - a{i} * 2 - a{i} % 1000003")
+    return "\n".join(lines)
+
+
+def main(digits: int = 100_000) -> None:
+    statements = Parser.parse_program(make_document(digits))
+
+    start = time.perf_counter()
+    symbol_table = {}
+    for statement in statements:
+        Evaluator(statement.ast, symbol_table).execute()
+    vm = time.perf_counter() - start
+    largest = max(symbol_table.values())
+    print(f"largest intermediate: {len(format_number(largest))} digits")
+    print(f"VM:     {vm:.3f}s")
+
+    # The eval() loop formats every operand, so it needs the int/str
+    # conversion limit lifted to get through at all
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        start = time.perf_counter()
+        legacy_table = {}
+        for statement in statements:
+            evaluator = Evaluator(statement.ast, legacy_table)
+            evaluator.evaluate()
+            legacy_execute(evaluator.postfix, legacy_table)
+        legacy = time.perf_counter() - start
+    finally:
+        sys.set_int_max_str_digits(limit)
+    print(f"eval(): {legacy:.3f}s (with the conversion limit lifted)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
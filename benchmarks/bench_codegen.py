@@ -0,0 +1,47 @@
+"""
+Re-run one document against many input tables: per-line evaluation vs a
+cached compiled program.
+
+Run from the project root:
+
+    python -m benchmarks.bench_codegen [lines] [runs]
+"""
+
+import sys
+import time
+from parser import Parser
+
+from benchmarks.bench_vm import make_document
+from codegen import compile_program
+from evaluator import Evaluator
+
+
+def main(lines: int = 2_000, runs: int = 50) -> None:
+    document = make_document(lines)
+    inputs = [{"v0": i} for i in range(runs)]
+
+    start = time.perf_counter()
+    for symbol_table in inputs:
+        symbol_table = dict(symbol_table)
+        for statement in Parser.parse_program(document):
+            Evaluator(statement.ast, symbol_table).execute()
+    evaluator = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compile_program(document)
+    compiled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for symbol_table in inputs:
+        compile_program(document).run(dict(symbol_table))
+    cached = time.perf_counter() - start
+
+    print(f"{runs} runs of {lines} lines")
+    print(f"Evaluator per run:     {evaluator / runs * 1000:8.2f} ms")
+    print(f"compile once:          {compiled * 1000:8.2f} ms")
+    print(f"compiled program run:  {cached / runs * 1000:8.2f} ms")
+    print(f"speedup per run:       {evaluator / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,56 @@
+"""
+Edit one line of a large document: full re-evaluation vs incremental
+recomputation of the affected statements.
+
+Run from the project root:
+
+    python -m benchmarks.bench_incremental [lines]
+"""
+
+import sys
+import time
+from parser import Parser
+
+from benchmarks.bench_vm import make_document
+from evaluator import Evaluator
+from incremental import Document
+
+
+def main(lines: int = 50_000) -> None:
+    source = make_document(lines).split("\n")
+
+    start = time.perf_counter()
+    document = Document(source)
+    build = time.perf_counter() - start
+
+    # Each edit is followed by a full evaluation of the edited document,
+    # as /evaluate would do
+    timings = []
+    for line in (lines // 2, lines - 10, 2):
+        text = f"v{line - 1} = {line}"
+        source[line - 1] = text
+
+        start = time.perf_counter()
+        updated = document.edit([(line, 1, [text])])
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        symbol_table = {}
+        for statement in Parser.parse_program("\n".join(source)):
+            Evaluator(statement.ast, symbol_table).execute()
+        full = time.perf_counter() - start
+
+        assert symbol_table == document.symbol_table
+        timings.append((line, len(updated), incremental, full))
+
+    print(f"lines: {lines} (initial build {build:.2f}s)")
+    for line, updated, incremental, full in timings:
+        print(
+            f"edit line {line:>6}: {updated:>6} lines changed,"
+            f" incremental {incremental * 1000:7.1f} ms,"
+            f" full {full * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
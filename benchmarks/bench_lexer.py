@@ -0,0 +1,68 @@
+"""
+Compare the single-pass lexer against the previous two-pass implementation.
+
+Run from the project root:
+
+    python -m benchmarks.bench_lexer [lines]
+"""
+
+import re
+import sys
+import timeit
+
+from lexer import Lexer, Token, TokenType
+
+
+def legacy_tokenize(text: str) -> list[Token]:
+    """The previous lexer: recompile per call, then re-match every token."""
+    number, variable = Lexer.NUMBER, Lexer.VARIABLE
+    operator, paren = r"[=+\-*/%]", Lexer.PAREN
+    pattern = re.compile("|".join([number, variable, operator, paren, r"\S"]))
+
+    def helper(token):
+        if re.fullmatch(number, token):
+            return Token(TokenType.NUMBER, token)
+        elif re.fullmatch(variable, token):
+            return Token(TokenType.VAR, token)
+        elif re.fullmatch(operator, token):
+            if token in "+-":
+                return Token(TokenType.PRED1, token)
+            elif token in "*/%":
+                return Token(TokenType.PRED2, token)
+            return Token(TokenType.ASSIGNMENT, None)
+        elif re.fullmatch(paren, token):
+            return Token(TokenType.PRED3, token)
+        raise ValueError(f"Invalid character: {token}")
+
+    token_list = [helper(token) for token in re.findall(pattern, text)]
+    token_list.append(Token(TokenType.EOF, None))
+    return token_list
+
+
+def make_lines(count: int) -> list[str]:
+    return [f"v{i} = (v{i - 1} + {i}.5) * 3 % 7 - -x" for i in range(count)]
+
+
+def main(count: int = 100_000) -> None:
+    lines = make_lines(count)
+    assert [Lexer(line).tokenize() for line in lines[:100]] == [
+        legacy_tokenize(line) for line in lines[:100]
+    ]
+
+    def run_legacy():
+        return [legacy_tokenize(line) for line in lines]
+
+    def run_current():
+        return [Lexer(line).tokenize() for line in lines]
+
+    legacy = min(timeit.repeat(run_legacy, number=1))
+    current = min(timeit.repeat(run_current, number=1))
+
+    print(f"lines:   {count}")
+    print(f"legacy:  {legacy:.3f}s")
+    print(f"current: {current:.3f}s")
+    print(f"speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""
+Time parsing and walking deeply nested expressions at growing depths.
+
+Run from the project root:
+
+    python -m benchmarks.bench_nesting [max_depth]
+"""
+
+import sys
+import time
+from parser import Parser
+
+from evaluator import Evaluator
+from lexer import Lexer
+
+SHAPES = {
+    "parentheses": lambda depth: "(" * depth + "1" + ")" * depth,
+    "unary": lambda depth: "- " * depth + "1",
+    "right-nested": lambda depth: "1 - (" * depth + "2" + ")" * depth,
+}
+
+
+def main(max_depth: int = 1_000_000) -> None:
+    depth = 10_000
+    while depth <= max_depth:
+        for name, shape in SHAPES.items():
+            buffer = Lexer("x = " + shape(depth)).tokenize_buffer()
+
+            start = time.perf_counter()
+            ast = Parser(buffer).parse()
+            parsed = time.perf_counter()
+            Evaluator(ast, {}).evaluate()
+            walked = time.perf_counter()
+
+            print(
+                f"{name:>12} depth {depth:>9}: "
+                f"parse {parsed - start:7.3f}s, walk {walked - parsed:7.3f}s"
+            )
+        depth *= 10
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""
+Time documents full of constant subtrees and repeated subexpressions, with
+and without the optimizer pass.
+
+Run from the project root:
+
+    python -m benchmarks.bench_optimizer [statements]
+"""
+
+import random
+import sys
+import timeit
+from parser import Parser
+
+from evaluator import compile_statement, run
+from optimizer import optimize
+
+
+def make_document(count: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["v0 = 1"]
+    for i in range(1, count):
+        a, b = f"v{rng.randrange(i)}", f"v{rng.randrange(i)}"
+        lines.append(
+            f"v{i} = ({a} + {b}) * ({a} + {b}) % (3600 * 24 * 7)"
+            f" + {a} * 1 - ({b} * 60 * 60 + 0) % ({a} + {b} + 1)"
+        )
+    return "\n".join(lines)
+
+
+def main(count: int = 20_000) -> None:
+    statements = Parser.parse_program(make_document(count))
+    asts = [statement.ast for statement in statements]
+
+    optimize_time = min(
+        timeit.repeat(lambda: [optimize(ast) for ast in asts], number=1)
+    )
+    optimized = [optimize(ast)[0] for ast in asts]
+
+    plain_code = [compile_statement(ast) for ast in asts]
+    optimized_code = [compile_statement(ast) for ast in optimized]
+
+    def execute(codes):
+        symbol_table = {}
+        for code in codes:
+            symbol_table[code.target] = run(code, symbol_table)
+        return symbol_table
+
+    assert execute(plain_code) == execute(optimized_code)
+
+    plain = min(timeit.repeat(lambda: execute(plain_code), number=1))
+    fast = min(timeit.repeat(lambda: execute(optimized_code), number=1))
+    ops = sum(len(code.ops) for code in plain_code)
+    optimized_ops = sum(len(code.ops) for code in optimized_code)
+
+    print(f"statements: {count}")
+    print(f"optimize:   {optimize_time:.3f}s")
+    print(f"bytecode:   {ops} -> {optimized_ops} instructions")
+    print(f"plain run:     {plain:.3f}s")
+    print(f"optimized run: {fast:.3f}s ({plain / fast:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
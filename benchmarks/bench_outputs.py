@@ -0,0 +1,44 @@
+"""
+Evaluate a whole document vs only the backward slice behind one output.
+
+Run from the project root:
+
+    python -m benchmarks.bench_outputs [chains] [lines_per_chain]
+"""
+
+import sys
+import timeit
+from parser import Parser
+
+from benchmarks.bench_parallel import make_document
+from evaluator import compile_slots
+
+
+def main(chains: int = 64, lines: int = 300) -> None:
+    statements = Parser.parse_program(make_document(chains, lines))
+    program = compile_slots([statement.ast for statement in statements])
+    output = f"c0v{lines - 1}"
+
+    def run_all():
+        symbol_table = {}
+        program.run(symbol_table)
+        return symbol_table
+
+    def run_slice():
+        symbol_table = {}
+        program.run(symbol_table, program.needed([output]))
+        return symbol_table
+
+    assert run_slice()[output] == run_all()[output]
+
+    needed = sum(program.needed([output]))
+    full = min(timeit.repeat(run_all, number=1, repeat=5))
+    sliced = min(timeit.repeat(run_slice, number=1, repeat=5))
+
+    print(f"statements: {len(statements)}, needed for {output}: {needed}")
+    print(f"all statements: {full * 1000:.1f} ms")
+    print(f"backward slice: {sliced * 1000:.1f} ms ({full / sliced:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""
+Scaling of `run_parallel` over 1-16 workers on a document made of many
+independent chains, against plain sequential evaluation.
+
+Run from the project root:
+
+    python -m benchmarks.bench_parallel [chains] [lines_per_chain]
+"""
+
+import os
+import random
+import sys
+import time
+from parser import Parser
+
+from evaluator import Evaluator
+from parallel import default_executor, free_threaded, run_parallel
+
+WORKERS = (1, 2, 4, 8, 16)
+
+
+def make_document(chains: int, lines: int, seed: int = 0) -> str:
+    """Interleave `chains` chains that never read each other's variables."""
+    rng = random.Random(seed)
+    document = [f"c{chain}v0 = {chain + 2}" for chain in range(chains)]
+    for i in range(1, lines):
+        for chain in range(chains):
+            terms = [f"c{chain}v{rng.randrange(i)}" for _ in range(4)]
+            body = " + ".join(f"({t} * {rng.randrange(1, 9)} - 1) % 997" for t in terms)
+            document.append(f"c{chain}v{i} = {body}")
+    return "\n".join(document)
+
+
+def main(chains: int = 64, lines: int = 300) -> None:
+    document = make_document(chains, lines)
+
+    start = time.perf_counter()
+    expected = {}
+    for statement in Parser.parse_program(document):
+        Evaluator(statement.ast, expected).execute()
+    sequential = time.perf_counter() - start
+
+    pool = "threads" if free_threaded() else "processes"
+    print(f"statements: {chains * lines} in {chains} chains, {pool}")
+    print(f"cpus: {os.cpu_count()}")
+    print(f"sequential: {sequential:.3f}s")
+
+    for workers in WORKERS:
+        # Pool start-up is left out: a server keeps its pool around
+        with default_executor(workers) as executor:
+            run_parallel("a = 1\nb = 2", {}, workers, executor)
+
+            start = time.perf_counter()
+            symbol_table = {}
+            run_parallel(document, symbol_table, workers, executor)
+            elapsed = time.perf_counter() - start
+
+        assert list(symbol_table.items()) == list(expected.items())
+        speedup = sequential / elapsed
+        print(f"{workers:>2} workers: {elapsed:.3f}s ({speedup:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""
+Resubmit the same document to /evaluate: evaluated, from the result cache
+and revalidated with If-None-Match.
+
+Run from the project root:
+
+    python -m benchmarks.bench_result_cache [lines]
+"""
+
+import sys
+import timeit
+
+import main as server
+from benchmarks.bench_vm import make_document
+from result_cache import ResultCache
+
+
+def main(lines: int = 5_000) -> None:
+    client = server.app.test_client()
+    json = {"expressions": make_document(lines).split("\n")}
+
+    def evaluated():
+        server.result_cache = ResultCache()
+        return client.post("/evaluate", json=json)
+
+    etag = evaluated().headers["ETag"]
+
+    def cached():
+        return client.post("/evaluate", json=json)
+
+    def revalidated():
+        return client.post("/evaluate", json=json, headers={"If-None-Match": etag})
+
+    assert revalidated().status_code == 304
+
+    print(f"lines: {lines}")
+    timings = {
+        name: min(timeit.repeat(request, number=1, repeat=5))
+        for name, request in (
+            ("evaluated", evaluated),
+            ("cached", cached),
+            ("304", revalidated),
+        )
+    }
+    for name, seconds in timings.items():
+        print(f"{name:>9}: {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,40 @@
+"""
+Add one line to a long document: resend it all to /evaluate vs append it
+to a session.
+
+Run from the project root:
+
+    python -m benchmarks.bench_sessions [lines]
+"""
+
+import sys
+import timeit
+
+from benchmarks.bench_vm import make_document
+from main import app
+
+
+def main(lines: int = 10_000) -> None:
+    expressions = make_document(lines).split("\n")
+    client = app.test_client()
+    session_id = client.post("/sessions", json={"expressions": expressions}).get_json()[
+        "id"
+    ]
+    line = f"total = v{lines - 1} + v0"
+
+    def resend():
+        client.post("/evaluate", json={"expressions": [*expressions, line]})
+
+    def append():
+        client.post(f"/sessions/{session_id}/statements", json={"expressions": [line]})
+
+    full = min(timeit.repeat(resend, number=1, repeat=3))
+    appended = min(timeit.repeat(append, number=10, repeat=3)) / 10
+
+    print(f"lines: {lines}")
+    print(f"resend document: {full * 1000:8.2f} ms")
+    print(f"session append:  {appended * 1000:8.2f} ms ({full / appended:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
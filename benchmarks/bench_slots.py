@@ -0,0 +1,49 @@
+"""
+Variable lookups by name in a dict vs by slot in a list, on documents
+with many distinct variables.
+
+Run from the project root:
+
+    python -m benchmarks.bench_slots [statements]
+"""
+
+import sys
+import timeit
+from parser import Parser
+
+from benchmarks.bench_vm import make_document
+from evaluator import Opcode, compile_slots, compile_statement, run
+
+
+def main(count: int = 50_000) -> None:
+    asts = [statement.ast for statement in Parser.parse_program(make_document(count))]
+    codes = [compile_statement(ast) for ast in asts]
+    program = compile_slots(asts)
+
+    def run_dict():
+        symbol_table = {}
+        for code in codes:
+            symbol_table[code.target] = run(code, symbol_table)
+        return symbol_table
+
+    def run_program():
+        symbol_table = {}
+        program.run(symbol_table)
+        return symbol_table
+
+    assert list(run_dict().items()) == list(run_program().items())
+
+    loads = sum(code.ops.count(Opcode.LOAD) for code in codes)
+    by_name = min(timeit.repeat(run_dict, number=1, repeat=5))
+    by_slot = min(timeit.repeat(run_program, number=1, repeat=5))
+    saved = (by_name - by_slot) / loads * 1e9
+
+    print(f"statements: {count}, variables: {len(program.names)}")
+    print(f"variable reads per statement: {loads / count:.1f}")
+    print(f"dict symbol table: {by_name:.3f}s")
+    print(f"slot list:         {by_slot:.3f}s ({by_name / by_slot:.2f}x)")
+    print(f"saved per load:    {saved:.0f} ns")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+Evaluate documents sharing a long preamble, each ending in a different
+line, with and without snapshots of the preamble.
+
+Run from the project root:
+
+    python -m benchmarks.bench_snapshots [lines]
+"""
+
+import sys
+import timeit
+
+from benchmarks.bench_vm import make_document
+from pipeline import Pipeline
+from snapshots import SnapshotStore
+from statement_cache import StatementCache
+
+
+def main(lines: int = 20_000) -> None:
+    preamble = make_document(lines).split("\n")
+    cache = StatementCache()
+    store = SnapshotStore()
+    tails = iter(range(10**9))
+
+    def document():
+        return preamble + [f"tail = {next(tails)}"]
+
+    def full():
+        return Pipeline(cache=cache).evaluate(document())
+
+    def resumed():
+        return Pipeline(cache=cache, snapshots=store).evaluate(document())
+
+    expected = full()
+    assert resumed().symbol_table.keys() == expected.symbol_table.keys()
+    assert resumed().outcomes[:-1] == expected.outcomes[:-1]
+
+    print(f"lines: {lines}")
+    for name, run in (("full", full), ("resumed", resumed)):
+        seconds = min(timeit.repeat(run, number=1, repeat=3))
+        print(f"{name:>8}: {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
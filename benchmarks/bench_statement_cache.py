@@ -0,0 +1,40 @@
+"""
+Evaluate a document through the pipeline without the statement cache,
+with a cold cache and with the cache already holding its lines.
+
+Run from the project root:
+
+    python -m benchmarks.bench_statement_cache [lines]
+"""
+
+import sys
+import timeit
+
+from benchmarks.bench_vm import make_document
+from pipeline import Pipeline
+from statement_cache import StatementCache
+
+
+def main(lines: int = 20_000) -> None:
+    expressions = make_document(lines).split("\n")
+    cache = StatementCache()
+
+    def uncached():
+        return Pipeline().evaluate(expressions)
+
+    def cold():
+        return Pipeline(cache=StatementCache()).evaluate(expressions)
+
+    def warm():
+        return Pipeline(cache=cache).evaluate(expressions)
+
+    assert warm().symbol_table == uncached().symbol_table
+
+    print(f"lines: {lines}")
+    for name, run in (("no cache", uncached), ("cold", cold), ("warm", warm)):
+        seconds = min(timeit.repeat(run, number=1, repeat=3))
+        print(f"{name:>9}: {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
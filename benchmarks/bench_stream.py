@@ -0,0 +1,64 @@
+"""
+/evaluate on a large batch: one JSON response vs the NDJSON stream, by
+time to first byte, total time and peak memory while serving it.
+
+Run from the project root:
+
+    python -m benchmarks.bench_stream [lines]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_vm import make_document
+from main import app
+
+
+def serve(client, expressions: list[str], headers: dict) -> tuple:
+    """Time to first chunk, total time and bytes sent."""
+    start = time.perf_counter()
+    response = client.post(
+        "/evaluate",
+        json={"expressions": expressions},
+        headers=headers,
+        buffered=False,
+    )
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)  # read and dropped, as a client would
+    total = time.perf_counter() - start
+    response.close()
+    return first, total, size
+
+
+def peak_memory(client, expressions: list[str], headers: dict) -> int:
+    """Peak memory traced while serving, in a separate run as tracing is slow."""
+    tracemalloc.start()
+    serve(client, expressions, headers)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(lines: int = 20_000) -> None:
+    expressions = make_document(lines).split("\n")
+    client = app.test_client()
+
+    for name, headers in (
+        ("json", {}),
+        ("ndjson", {"Accept": "application/x-ndjson"}),
+    ):
+        first, total, size = serve(client, expressions, headers)
+        peak = peak_memory(client, expressions, headers)
+        print(
+            f"{name:>6}: first byte {first * 1000:8.1f} ms,"
+            f" total {total * 1000:8.1f} ms,"
+            f" peak memory {peak / 2**20:6.1f} MiB, {size / 2**20:.1f} MiB sent"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""
+Compare `list[Token]` against `TokenBuffer` for memory and throughput.
+
+Run from the project root:
+
+    python -m benchmarks.bench_tokens [lines]
+"""
+
+import sys
+import timeit
+import tracemalloc
+from parser import Parser
+
+from lexer import Lexer
+
+
+def make_lines(count: int) -> list[str]:
+    return [f"v{i} = (v{i - 1} + {i}.5) * 3 % 7 - -x" for i in range(count)]
+
+
+def peak_memory(build) -> int:
+    tracemalloc.start()
+    result = build()  # noqa: F841 - keep the tokens alive for the peak
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(count: int = 100_000) -> None:
+    lines = make_lines(count)
+    document = "\n".join(lines)
+
+    list_bytes = peak_memory(lambda: Lexer(document).tokenize())
+    buffer_bytes = peak_memory(lambda: Lexer(document).tokenize_buffer())
+    tokens = len(Lexer(document).tokenize_buffer())
+
+    def run_list():
+        return [Parser(Lexer(line).tokenize()).parse() for line in lines]
+
+    def run_buffer():
+        return [Parser(Lexer(s).tokenize_buffer()).parse() for s in lines]
+
+    list_time = min(timeit.repeat(run_list, number=1, repeat=3))
+    buffer_time = min(timeit.repeat(run_buffer, number=1, repeat=3))
+
+    print(f"lines: {count}, tokens: {tokens}")
+    print(f"list[Token]  peak: {list_bytes / tokens:6.1f} B/token")
+    print(f"TokenBuffer  peak: {buffer_bytes / tokens:6.1f} B/token")
+    print(f"list[Token]  lex+parse: {list_time:.3f}s")
+    print(f"TokenBuffer  lex+parse: {buffer_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""
+Run one document over many input rows: a scalar evaluation per row vs one
+vectorized evaluation over whole columns.
+
+Run from the project root:
+
+    python -m benchmarks.bench_vectorize [rows]
+"""
+
+import random
+import sys
+import time
+from parser import Parser
+
+import numpy as np
+
+from evaluator import Evaluator
+from vectorize import evaluate_columns
+
+DOCUMENT = "\n".join(
+    [
+        "b = a + 2",
+        "c = b * 3 - a % 7",
+        "d = (c - b) / (a % 5 + 1)",
+        "e = -d * d + c % 11 - b / 3",
+    ]
+)
+
+
+def main(rows: int = 1_000_000) -> None:
+    rng = random.Random(0)
+    column = [rng.randrange(-(10**6), 10**6) for _ in range(rows)]
+    statements = Parser.parse_program(DOCUMENT)
+
+    # Per-row evaluation is timed on a sample and scaled up
+    sample = min(rows, 20_000)
+    start = time.perf_counter()
+    for value in column[:sample]:
+        symbol_table = {"a": value}
+        for statement in statements:
+            Evaluator(statement.ast, symbol_table).execute()
+    per_row = (time.perf_counter() - start) * rows / sample
+    expected = symbol_table["e"]
+
+    start = time.perf_counter()
+    symbol_table = {"a": np.array(column)}
+    evaluate_columns(DOCUMENT, symbol_table)
+    columns = time.perf_counter() - start
+
+    assert symbol_table["e"][sample - 1] == expected
+
+    print(f"rows: {rows}")
+    print(f"per row: {per_row:.3f}s (estimated from {sample} rows)")
+    print(f"columns: {columns:.3f}s ({per_row / columns:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
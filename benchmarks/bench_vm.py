@@ -0,0 +1,87 @@
+"""
+Compare the bytecode VM against the previous eval()-based postfix loop.
+
+Run from the project root:
+
+    python -m benchmarks.bench_vm [statements]
+"""
+
+import random
+import sys
+import timeit
+from parser import Parser
+
+from evaluator import Evaluator
+
+
+def legacy_execute(postfix: list, symbol_table: dict):
+    """The previous `Evaluator.execute`: one eval() per binary operator."""
+    stack = []
+    for node in postfix[1:-1]:
+        if type(node) in (int, float):
+            stack.append(node)
+        elif node.startswith("u"):
+            operand = stack.pop()
+            stack.append(-operand if node == "u-" else operand)
+        elif node not in "+/*%-":
+            if node not in symbol_table:
+                raise NameError(f"Variable `{node}` is not defined.")
+            stack.append(symbol_table[node])
+        else:
+            b, a = stack.pop(), stack.pop()
+            stack.append(eval(f"{a}{node}{b}"))
+    symbol_table[postfix[0]] = stack[0]
+
+
+def make_document(count: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["v0 = 1"]
+    for i in range(1, count):
+        terms = [f"v{rng.randrange(i)}" for _ in range(6)]
+        consts = [str(rng.randrange(1, 9)) for _ in range(6)]
+        body = " + ".join(f"({t} * {c} - -{c}) % 97" for t, c in zip(terms, consts))
+        lines.append(f"v{i} = {body}")
+    return "\n".join(lines)
+
+
+def main(count: int = 20_000) -> None:
+    statements = Parser.parse_program(make_document(count))
+    evaluators = [Evaluator(s.ast, {}) for s in statements]
+    for evaluator in evaluators:
+        evaluator.evaluate()
+
+    def run_legacy():
+        symbol_table = {}
+        for evaluator in evaluators:
+            legacy_execute(evaluator.postfix, symbol_table)
+        return symbol_table
+
+    def run_vm():
+        symbol_table = {}
+        for evaluator in evaluators:
+            evaluator.symbol_table = symbol_table
+            evaluator.code = None  # include compilation in the timing
+            evaluator.execute()
+        return symbol_table
+
+    def run_cached():
+        symbol_table = {}
+        for evaluator in evaluators:
+            evaluator.symbol_table = symbol_table
+            evaluator.execute()
+        return symbol_table
+
+    assert run_legacy() == run_vm()
+
+    legacy = min(timeit.repeat(run_legacy, number=1, repeat=3))
+    vm = min(timeit.repeat(run_vm, number=1, repeat=3))
+    cached = min(timeit.repeat(run_cached, number=1, repeat=3))
+
+    print(f"statements: {count}")
+    print(f"eval():  {legacy:.3f}s")
+    print(f"VM:      {vm:.3f}s ({legacy / vm:.1f}x, compile + run)")
+    print(f"VM:      {cached:.3f}s ({legacy / cached:.1f}x, run only)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,153 @@
+"""
+Time every pipeline stage on every workload, and compare runs.
+
+Run from the project root:
+
+    python -m benchmarks.suite run [--scale 1.0] [--repeat 3] [--only NAME]
+                                   [--save results.json]
+    python -m benchmarks.suite compare baseline.json results.json
+                                       [--threshold 0.2]
+
+`run` times lexing, parsing, compiling and executing each workload from
+`benchmarks.workloads` on its own, then /evaluate end to end through the
+Flask test client. `compare` lists each timing against a baseline saved by
+`run --save` and exits with status 1 if any is slower by more than the
+threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from parser import Parser
+
+import main as server
+from benchmarks.workloads import WORKLOADS
+from evaluator import compile_slots
+from lexer import Lexer
+from result_cache import ResultCache
+from snapshots import SnapshotStore
+from statement_cache import StatementCache
+
+STAGES = ("lex", "parse", "compile", "execute", "end_to_end")
+
+
+def time_stages(lines: list[str], repeat: int) -> dict[str, float]:
+    """Best time of `repeat` runs of each stage, each fed the one before."""
+    document = "\n".join(lines)
+    tokens = Lexer(document).tokenize_buffer(program=True)
+    statements = Parser.parse_tokens(tokens)
+    program = compile_slots([statement.ast for statement in statements])
+    client = server.app.test_client()
+
+    def end_to_end():
+        response = client.post("/evaluate", json={"expressions": lines})
+        assert response.status_code == 200
+
+    stages = {
+        "lex": lambda: Lexer(document).tokenize_buffer(program=True),
+        "parse": lambda: Parser.parse_tokens(tokens),
+        "compile": lambda: compile_slots([s.ast for s in statements]),
+        "execute": lambda: program.run({}),
+        "end_to_end": end_to_end,
+    }
+    return {
+        stage: min(timeit.repeat(run, number=1, repeat=repeat))
+        for stage, run in stages.items()
+    }
+
+
+def run(scale: float, repeat: int, only: list[str] | None) -> dict:
+    # Every repeat must evaluate, not be answered from the result cache,
+    # parse from the statement cache or resume from a snapshot
+    server.result_cache = ResultCache(max_bytes=0)
+    server.statement_cache = StatementCache(max_bytes=0)
+    server.snapshots = SnapshotStore(max_bytes=0)
+
+    timings = {}
+    for name, (generate, size) in WORKLOADS.items():
+        if only and name not in only:
+            continue
+        lines = generate(max(1, int(size * scale)))
+        for stage, seconds in time_stages(lines, repeat).items():
+            timings[f"{name}/{stage}"] = seconds
+            print(f"{name:>18} {stage:>10}: {seconds * 1000:10.2f} ms", flush=True)
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "scale": scale,
+        "repeat": repeat,
+        "timings": timings,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print each timing against the baseline; whether none regressed."""
+    if baseline.get("scale") != current.get("scale"):
+        print(f"warning: scale {baseline.get('scale')} vs {current.get('scale')}")
+
+    regressed = False
+    before, after = baseline["timings"], current["timings"]
+    for key in sorted(before.keys() | after.keys()):
+        if key not in before or key not in after:
+            where = "baseline" if key not in before else "current run"
+            print(f"{key:>30}: missing from the {where}")
+            continue
+
+        ratio = after[key] / before[key]
+        if ratio > 1 + threshold:
+            verdict = "REGRESSION"
+            regressed = True
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = ""
+        print(
+            f"{key:>30}: {before[key] * 1000:10.2f} ms -> "
+            f"{after[key] * 1000:10.2f} ms ({ratio:5.2f}x) {verdict}"
+        )
+    return not regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time every workload")
+    run_parser.add_argument("--scale", type=float, default=1.0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument(
+        "--only", action="append", choices=list(WORKLOADS), help="workloads to run"
+    )
+    run_parser.add_argument("--save", help="write the results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="compare against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown flagged as a regression, as a fraction (default 0.2)",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run(args.scale, args.repeat, args.only)
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(results, file, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    return 0 if compare(baseline, current, args.threshold) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
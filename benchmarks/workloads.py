@@ -0,0 +1,82 @@
+"""
+Synthetic documents for the benchmark suite, each a list of lines.
+
+Every generator takes a size and a seed, so a workload is the same from
+run to run and scales with the size.
+"""
+
+import random
+
+from benchmarks.bench_bigint import make_document as make_bigint_document
+
+
+def operator_chain(terms: int, seed: int = 0) -> list[str]:
+    """One long line mixing every operator, over a few variables."""
+    rng = random.Random(seed)
+    lines = [f"v{i} = {i + 1}" for i in range(10)]
+    parts = ["v0"]
+    for i in range(terms):
+        operand = f"v{rng.randrange(10)}" if i % 2 else str(rng.randrange(1, 50))
+        parts.append(f"{rng.choice('+-*/%')} {operand}")
+    lines.append("x = " + " ".join(parts))
+    return lines
+
+
+def deep_nesting(depth: int, seed: int = 0) -> list[str]:
+    """Parentheses, unary minus and right-nested subtraction, `depth` deep."""
+    return [
+        "p = " + "(" * depth + "1" + ")" * depth,
+        "u = " + "- " * depth + "1",
+        "r = " + "1 - (" * depth + "2" + ")" * depth,
+    ]
+
+
+def many_variables(count: int, seed: int = 0) -> list[str]:
+    """`count` short assignments, each reading a few earlier variables."""
+    rng = random.Random(seed)
+    lines = ["v0 = 1"]
+    for i in range(1, count):
+        a, b = rng.randrange(i), rng.randrange(i)
+        lines.append(f"v{i} = v{a} + v{b} % 7")
+    return lines
+
+
+def dependency_chain(length: int, seed: int = 0) -> list[str]:
+    """Each line reads the one before it."""
+    lines = ["c0 = 1"]
+    for i in range(1, length):
+        lines.append(f"c{i} = (c{i - 1} * 3 + {i}) % 1000003")
+    return lines
+
+
+def bigint_growth(digits: int, seed: int = 0) -> list[str]:
+    """Repeated squaring up to ints of about `digits` digits."""
+    return make_bigint_document(digits).split("\n")
+
+
+def error_heavy(count: int, seed: int = 0) -> list[str]:
+    """Mostly failing lines: parse, name and division errors, some valid."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        kind = rng.randrange(4)
+        if kind == 0:
+            lines.append(f"e{i} = (v{i} +")
+        elif kind == 1:
+            lines.append(f"n{i} = missing{i} * 2")
+        elif kind == 2:
+            lines.append(f"z{i} = {i} / (3 - 3)")
+        else:
+            lines.append(f"ok{i} = {i} * 2 $" if i % 8 == 3 else f"ok{i} = {i} * 2")
+    return lines
+
+
+# Name, generator and its size at scale 1
+WORKLOADS = {
+    "operator_chain": (operator_chain, 20_000),
+    "deep_nesting": (deep_nesting, 5_000),
+    "many_variables": (many_variables, 20_000),
+    "dependency_chain": (dependency_chain, 20_000),
+    "bigint_growth": (bigint_growth, 50_000),
+    "error_heavy": (error_heavy, 20_000),
+}
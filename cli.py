@@ -0,0 +1,221 @@
+"""
+Evaluate `.in` files from the command line, without the web app.
+
+    python cli.py [-f text|ndjson|csv] [-j JOBS] [--progress] [FILE ...]
+
+Each file is one document, evaluated line by line as it is read, so files
+of any size run in constant memory. With no files, or `-`, the document
+is read from stdin. Several files are spread across worker processes and
+their output is written in the order they were given.
+
+The exit status is 0 if every statement was evaluated, 1 if any statement
+failed and 2 if a file could not be read.
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from parser import Parser
+from typing import Iterable, Iterator, TextIO
+
+from errors import error_message
+from evaluator import format_number, stream_slots, to_postfix
+from parallel import default_executor
+
+FORMATS = ("text", "ndjson", "csv")
+CSV_COLUMNS = ("file", "line", "input", "postfix", "result", "error")
+
+# How often, in statements, to report progress on a single document
+PROGRESS_EVERY = 100_000
+
+
+def evaluate_lines(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    Evaluate a document one line at a time, yielding `(line, expression,
+    ast, outcome)` for every statement as soon as it has run.
+    """
+    current = []  # the statement being run, with its text
+
+    def asts():
+        for number, text in enumerate(lines, 1):
+            text = text.rstrip("\n").replace("\r", "")
+            for statement in Parser.parse_program(text):
+                outcome = statement.error
+                current.append((number, text.strip(), statement.ast, outcome))
+                yield statement.ast
+
+    for outcome in stream_slots(asts(), {}):
+        line, expression, ast, error = current.pop()
+        yield line, expression, ast, outcome if error is None else error
+
+
+def write_outcomes(
+    outcomes: Iterable[tuple], out: TextIO, output: str, name: str, progress=None
+) -> tuple[int, int]:
+    """
+    Write outcomes from `evaluate_lines` to `out` in the `output` format,
+    returning how many statements there were and how many failed.
+    """
+    writer = csv.writer(out) if output == "csv" else None
+    statements = errors = 0
+
+    for line, expression, ast, outcome in outcomes:
+        statements += 1
+        if isinstance(outcome, Exception):
+            errors += 1
+            record = {"line": line, "error": error_message(line, outcome)}
+        else:
+            record = {
+                "line": line,
+                "input": expression,
+                "postfix": " ".join(map(format_number, to_postfix(ast))),
+                "result": f"{ast[1]} = {format_number(outcome)}",
+            }
+
+        if output == "text":
+            out.write(record.get("error") or f"Line {line}: {record['result']}")
+            out.write("\n")
+        elif output == "ndjson":
+            out.write(json.dumps({"file": name, **record}) + "\n")
+        else:
+            writer.writerow([name, *(record.get(key, "") for key in CSV_COLUMNS[1:])])
+
+        if progress is not None and statements % PROGRESS_EVERY == 0:
+            progress(f"{name}: {statements} statements, {errors} errors")
+
+    return statements, errors
+
+
+def evaluate_file(path: str, output: str, out_path: str) -> tuple[int, int]:
+    """Evaluate one file in a worker, writing its output to `out_path`."""
+    with open(path) as document, open(out_path, "w", newline="") as out:
+        return write_outcomes(evaluate_lines(document), out, output, path)
+
+
+def open_document(path: str):
+    """The document at `path`, or stdin for `-`, which is left open."""
+    return nullcontext(sys.stdin) if path == "-" else open(path)
+
+
+def unreadable(path: str, error: Exception):
+    print(f"cli.py: cannot read {path}: {error}", file=sys.stderr)
+
+
+def run_in_process(paths: list[str], output: str, out: TextIO, progress) -> tuple:
+    """
+    Evaluate each file in turn, streaming its output to `out`. Returns
+    how many statements there were, how many failed and how many files
+    could not be read.
+    """
+    statements = errors = unread = 0
+    for path in paths:
+        if output == "text" and len(paths) > 1:
+            out.write(f"==> {path} <==\n")
+        name = "<stdin>" if path == "-" else path
+        try:
+            with open_document(path) as document:
+                done, failed = write_outcomes(
+                    evaluate_lines(document), out, output, name, progress
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            unreadable(name, e)
+            unread += 1
+            continue
+        statements += done
+        errors += failed
+        if progress is not None:
+            progress(f"{name}: done, {done} statements, {failed} errors")
+    return statements, errors, unread
+
+
+def run_in_workers(
+    paths: list[str], output: str, out: TextIO, progress, executor: Executor
+) -> tuple:
+    """
+    Evaluate files on `executor`, each into a temporary file, and copy the
+    outputs to `out` in order as they finish. Returns the same counts as
+    `run_in_process`.
+    """
+    statements = errors = unread = 0
+    with tempfile.TemporaryDirectory() as directory:
+        outputs = [os.path.join(directory, str(i)) for i in range(len(paths))]
+        futures = [
+            executor.submit(evaluate_file, path, output, out_path)
+            for path, out_path in zip(paths, outputs)
+        ]
+
+        for index, (path, future, out_path) in enumerate(
+            zip(paths, futures, outputs), 1
+        ):
+            if output == "text":
+                out.write(f"==> {path} <==\n")
+            try:
+                done, failed = future.result()
+            except (OSError, UnicodeDecodeError) as e:
+                unreadable(path, e)
+                unread += 1
+                done = failed = 0
+            # What was written before a file turned out unreadable
+            if os.path.exists(out_path):
+                with open(out_path, newline="") as result:
+                    shutil.copyfileobj(result, out)
+            statements += done
+            errors += failed
+            if progress is not None:
+                progress(
+                    f"[{index}/{len(paths)}] {path}: {done} statements,"
+                    f" {failed} errors"
+                )
+    return statements, errors, unread
+
+
+def main(argv: list[str] | None = None, out: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "files", nargs="*", default=["-"], help="documents to evaluate, - for stdin"
+    )
+    parser.add_argument("-f", "--format", choices=FORMATS, default="text")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes for several files",
+    )
+    parser.add_argument(
+        "--progress", action="store_true", help="report progress on stderr"
+    )
+    args = parser.parse_args(argv)
+
+    def progress(message: str):
+        print(message, file=sys.stderr, flush=True)
+
+    missing = [path for path in args.files if path != "-" and not os.path.isfile(path)]
+    for path in missing:
+        print(f"cli.py: cannot read {path}", file=sys.stderr)
+    paths = [path for path in args.files if path not in missing]
+
+    if args.format == "csv":
+        csv.writer(out).writerow(CSV_COLUMNS)
+    report = progress if args.progress else None
+    if args.jobs > 1 and len(paths) > 1 and "-" not in paths:
+        with default_executor(min(args.jobs, len(paths))) as executor:
+            _, errors, unread = run_in_workers(
+                paths, args.format, out, report, executor
+            )
+    else:
+        _, errors, unread = run_in_process(paths, args.format, out, report)
+
+    if missing or unread:
+        return 2
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
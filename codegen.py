@@ -0,0 +1,192 @@
+"""
+Compile whole documents to native Python functions.
+
+Each document becomes a single function in which every variable is a fast
+local. Statements are emitted as three-address code in postfix order, so
+errors are raised in the same order as `Evaluator.execute` would raise
+them and nesting depth never reaches Python's own parser limits.
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from parser import Parser, Statement
+
+from evaluator import UNARY_POSTFIX, UNDEFINED, exceeds_str_limit, to_postfix
+
+BINARY_OPERATORS = frozenset("+-*/%")
+
+
+def _undefined(name: str):
+    raise NameError(f"Variable `{name}` is not defined.")
+
+
+def _is_literal(value) -> bool:
+    """Whether `repr(value)` is valid source that evaluates to `value`."""
+    if type(value) is int:
+        return not exceeds_str_limit(value)
+    return math.isfinite(value)
+
+
+class CompiledProgram:
+    """
+    A parsed document compiled to one Python function.
+
+    `statements` are the parsed lines. `run` executes them all against a
+    symbol table and returns one outcome per statement: the assigned value,
+    or the exception that statement raised (including parse errors).
+    """
+
+    def __init__(self, statements: list[Statement]):
+        self.statements = statements
+        # assigned variable per statement, `None` where parsing failed
+        self.targets = [s.ast and s.ast[1] for s in statements]
+        self.source, namespace = self._generate()
+
+        code = compile(self.source, "<document>", "exec")
+        exec(code, namespace)
+        self.function = namespace["_program"]
+
+    def _generate(self) -> tuple[str, dict]:
+        names = {}  # every variable in the document, in order of appearance
+        namespace = {"_U": UNDEFINED, "_undefined": _undefined}
+        body = []
+
+        for index, statement in enumerate(self.statements):
+            if statement.error is not None:
+                continue
+
+            postfix = to_postfix(statement.ast)
+            body.append("    try:")
+            body += self._statement(postfix, names, namespace)
+            body.append(f"        _out[{index}] = v_{postfix[0]}")
+            body.append("    except Exception as _e:")
+            body.append(f"        _out[{index}] = _e")
+
+        lines = ["def _program(_get, _out):"]
+        lines += [f"    v_{name} = _get({name!r}, _U)" for name in names]
+        lines += body
+        lines.append(f"    return ({''.join(f'v_{n}, ' for n in names)})")
+
+        self.names = list(names)
+        return "\n".join(lines) + "\n", namespace
+
+    @staticmethod
+    def _statement(postfix: list, names: dict, namespace: dict) -> list[str]:
+        """
+        Emit one assignment. Leaves stay inline as operand expressions;
+        every operation is stored to a register named after its stack
+        depth as soon as it is reached.
+        """
+        lines = []
+        checked = set()
+        stack = []
+
+        names.setdefault(postfix[0], None)
+
+        # ignore first and last symbol
+        for i in range(1, len(postfix) - 1):
+            item = postfix[i]
+
+            if type(item) is not str:
+                if _is_literal(item):
+                    stack.append(repr(item))
+                else:
+                    constant = f"_k{len(namespace)}"
+                    namespace[constant] = item
+                    stack.append(constant)
+
+            elif item in BINARY_OPERATORS:
+                b, a = stack.pop(), stack.pop()
+                register = f"_r{len(stack)}"
+                lines.append(f"        {register} = {a} {item} {b}")
+                stack.append(register)
+
+            elif item == UNARY_POSTFIX["-"]:
+                a = stack.pop()
+                register = f"_r{len(stack)}"
+                lines.append(f"        {register} = -{a}")
+                stack.append(register)
+
+            elif item[0] == "$":
+                stack.append(f"_t{item[1:]}")
+
+            elif item[:2] == "=$":
+                temp = f"_t{item[2:]}"
+                lines.append(f"        {temp} = {stack.pop()}")
+                stack.append(temp)
+
+            elif item != UNARY_POSTFIX["+"]:
+                # Check a variable is defined where the VM would load it
+                names.setdefault(item, None)
+                if item not in checked:
+                    checked.add(item)
+                    check = f"if v_{item} is _U: _undefined({item!r})"
+                    lines.append(f"        {check}")
+                stack.append(f"v_{item}")
+
+        lines.append(f"        v_{postfix[0]} = {stack[0]}")
+        return lines
+
+    def run(self, symbol_table: dict) -> list:
+        """
+        Execute the document, updating `symbol_table` in place exactly as
+        running each statement through `Evaluator` in order would.
+        """
+        outcomes = [s.error for s in self.statements]
+        values = self.function(symbol_table.get, outcomes)
+        final = dict(zip(self.names, values))
+
+        # Assign in statement order so new keys are inserted in the order
+        # of their first successful assignment
+        for target, outcome in zip(self.targets, outcomes):
+            if target is not None and not isinstance(outcome, Exception):
+                symbol_table[target] = final[target]
+
+        return outcomes
+
+
+class ProgramCache:
+    """Thread-safe LRU cache of `CompiledProgram`s keyed by document hash."""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.programs = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(document: str) -> bytes:
+        return hashlib.blake2b(document.encode()).digest()
+
+    def get(self, document: str) -> CompiledProgram:
+        key = self.key(document)
+
+        with self.lock:
+            program = self.programs.get(key)
+            if program is not None:
+                self.programs.move_to_end(key)
+                self.hits += 1
+                return program
+            self.misses += 1
+
+        # Compile outside the lock; a racing duplicate is harmless
+        program = CompiledProgram(Parser.parse_program(document))
+
+        with self.lock:
+            self.programs[key] = program
+            self.programs.move_to_end(key)
+            while len(self.programs) > self.maxsize:
+                self.programs.popitem(last=False)
+
+        return program
+
+
+program_cache = ProgramCache()
+
+
+def compile_program(document: str) -> CompiledProgram:
+    """Compile a document, reusing a cached compilation when possible."""
+    return program_cache.get(document)
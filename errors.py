@@ -0,0 +1,22 @@
+"""
+How evaluation errors are worded, shared by the web app and the CLI.
+"""
+
+from parser import ParseError
+
+# How each kind of error is labelled in messages
+LABELS = {"ParseError": "Parse Error", "NameError": "Name Error", "other": "Error"}
+
+
+def error_kind(error: Exception) -> str:
+    """`ParseError`, `NameError` or `other`, as errors are counted."""
+    if isinstance(error, ParseError):
+        return "ParseError"
+    elif isinstance(error, NameError):
+        return "NameError"
+    return "other"
+
+
+def error_message(line: int, error: Exception) -> str:
+    """The error of a statement on `line`, as reported to users."""
+    return f"Line {line}: {LABELS[error_kind(error)]}: {error}"
@@ -1,103 +1,544 @@
-from enum import Enum
+import sys
+from dataclasses import dataclass
+from decimal import Decimal
+from enum import IntEnum
+from operator import add, mod, mul, sub, truediv
+from typing import Iterable, Iterator
 
+from metrics import timed
 
-class NodeType(Enum):
-    BINARY_OP = "binary_op"
-    UNARY_OP = "unary_op"
-    ASSIGNMENT = "assignment"
-    NUMBER = "number"
-    VARIABLE = "variable"
 
+class NodeType(IntEnum):
+    """
+    Kind of an AST node, stored as its first element.
 
-class Evaluator:
+    Nodes are plain tuples headed by their kind, e.g. `(NodeType.NUMBER, 42)`.
+    Kinds are small ints so consumers can dispatch on them by identity or
+    use them to index a table.
     """
-    To evaluate an AST, first call `.evaluate` to populate the stack and then
-    you can either:
 
-    - `.execute()` to add the value to the symbol_table.
-    - call `str()` to return a string representation of the stack.
+    BINARY_OP = 0
+    UNARY_OP = 1
+    ASSIGNMENT = 2
+    NUMBER = 3
+    VARIABLE = 4
+
+    # Only produced by `optimizer.optimize`: `(BIND, slot, expr)` evaluates
+    # `expr` and keeps its value in temporary `slot`, which a later
+    # `(REF, slot)` in the same statement reuses
+    BIND = 5
+    REF = 6
+
+
+def exceeds_str_limit(value: int) -> bool:
+    """Whether `str()` would refuse `value` for having too many digits."""
+    limit = sys.get_int_max_str_digits()
+    # log10(2) digits per bit, erring towards too many
+    return bool(limit) and value.bit_length() * 0.30103 >= limit - 1
+
+
+def parse_number(text: str) -> int | float:
     """
+    Convert a NUMBER token to an int or float.
 
-    def __init__(self, ast, symbol_table) -> None:
-        self.ast = ast
-        self.postfix = []
-        self.symbol_table = symbol_table
+    Integer literals longer than Python's int/str conversion limit are
+    converted exactly through `Decimal`, which has no such limit.
+    """
+    if "." in text:
+        return float(text)
+    elif len(text) >= sys.get_int_max_str_digits() > 0:
+        return int(Decimal(text))
+    return int(text)
+
+
+def format_number(value) -> str:
+    """
+    Format a value exactly, like `str()`.
+
+    Ints longer than Python's int/str conversion limit are formatted
+    through `Decimal` rather than raising `ValueError`.
+    """
+    if type(value) is int and exceeds_str_limit(value):
+        return str(Decimal(value))
+    return str(value)
+
+
+class Opcode(IntEnum):
+    """Instructions of the stack machine run by `run`."""
+
+    # Binary operators, numbered to index `BINARY_OPERATIONS`
+    ADD = 0
+    SUB = 1
+    MUL = 2
+    DIV = 3
+    MOD = 4
+
+    NEG = 5  # negate the top of the stack
+    CONST = 6  # push consts[arg]
+    LOAD = 7  # push the value of the variable names[arg]
+    STORE = 8  # copy the top of the stack to temporary arg
+    FETCH = 9  # push temporary arg
+
+
+BINARY_OPCODES = {
+    "+": Opcode.ADD,
+    "-": Opcode.SUB,
+    "*": Opcode.MUL,
+    "/": Opcode.DIV,
+    "%": Opcode.MOD,
+}
+BINARY_OPERATIONS = (add, sub, mul, truediv, mod)
+
+
+@dataclass(frozen=True)
+class Code:
+    """
+    Bytecode for one assignment statement.
+
+    `ops` and `args` are parallel: `args[i]` indexes `consts` for CONST,
+    `names` for LOAD, one of `temps` temporaries for STORE and FETCH and
+    is unused otherwise. Code never holds variable values, so it can be
+    re-run against any symbol table.
+    """
+
+    target: str
+    ops: bytes
+    args: tuple[int, ...]
+    consts: tuple
+    names: tuple[str, ...]
+    temps: int = 0
+    # Slot of each of `names` in a `SlotProgram`, if compiled for one
+    slots: tuple[int, ...] = ()
+
+
+UNARY_POSTFIX = {"+": "u+", "-": "u-"}
+
+# Opcode for each operator in postfix notation; `None` for unary '+',
+# which is a no-op
+POSTFIX_OPCODES = {
+    **BINARY_OPCODES,
+    UNARY_POSTFIX["-"]: Opcode.NEG,
+    UNARY_POSTFIX["+"]: None,
+}
+
+
+def to_postfix(ast) -> list:
+    """
+    Flatten an AST from `Parser` to postfix notation.
+
+    Numbers and names are emitted as they are, unary operators with a 'u'
+    prefix and an assignment as `name ... =`. A BIND node is emitted as
+    `... =$slot` and a REF node as `$slot`.
+    """
+    # Post-order walk with an explicit stack. Pending work is either a
+    # node (a tuple) to expand or a postfix item to emit as is.
+    stack = [ast]
+    postfix = []
+    emit = postfix.append
+    binary_op, unary_op = NodeType.BINARY_OP, NodeType.UNARY_OP
+    number, variable = NodeType.NUMBER, NodeType.VARIABLE
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is not tuple:
+            emit(node)
+            continue
 
-    def _walk(self, node):
         node_type = node[0]
 
-        if node_type == NodeType.ASSIGNMENT:
-            _, identifier, expr = node
-            self.postfix.append(identifier)
-            self._walk(expr)
-            self.postfix.append("=")
+        # Leaves are the most common nodes, so test for them first
+        if node_type is number or node_type is variable:
+            emit(node[1])
 
-        elif node_type == NodeType.BINARY_OP:
+        elif node_type is binary_op:
             _, operator, left, right = node
-            self._walk(left)
-            self._walk(right)
-            self.postfix.append(operator)
+            stack += (operator, right, left)
 
-        elif node_type == NodeType.UNARY_OP:
+        elif node_type is unary_op:
             _, operator, operand = node
-            self._walk(operand)
-            self.postfix.append(f"u{operator}")  # prefix with 'u' for unary
+            # prefix with 'u' for unary
+            stack += (UNARY_POSTFIX[operator], operand)
+
+        elif node_type is NodeType.ASSIGNMENT:
+            _, identifier, expr = node
+            stack += ("=", expr)
+            emit(identifier)
 
-        elif node_type == NodeType.NUMBER:
-            _, value = node
-            self.postfix.append(value)
+        elif node_type is NodeType.BIND:
+            _, slot, expr = node
+            stack += (f"=${slot}", expr)
 
-        elif node_type == NodeType.VARIABLE:
-            _, name = node
-            self.postfix.append(name)
+        elif node_type is NodeType.REF:
+            emit(f"${node[1]}")
 
         else:
             raise ValueError(f"Unknown AST node: {node_type}")
 
-    def evaluate(self):
-        self._walk(self.ast)
+    return postfix
 
-    def execute(self):
+
+def compile_postfix(postfix: list, slots: dict | None = None) -> Code:
+    """
+    Compile an assignment in postfix notation (`name ... =`) to `Code`.
+
+    Given `slots`, a dict shared by every statement of a program, each
+    variable is also given a slot there, numbered in order of appearance.
+    """
+    ops, args = bytearray(), []
+    consts, names = {}, {}
+    temps = 0
+    opcodes, load = POSTFIX_OPCODES, Opcode.LOAD
+
+    # ignore first and last symbol
+    for i in range(1, len(postfix) - 1):
+        item = postfix[i]
+
+        if type(item) is not str:
+            # keyed by type too, as 1 == 1.0 but they must stay distinct
+            index = consts.setdefault((type(item), item), len(consts))
+            ops.append(Opcode.CONST)
+            args.append(index)
+            continue
+
+        opcode = opcodes.get(item, load)
+        if opcode is load and item[0] == "$":
+            ops.append(Opcode.FETCH)
+            args.append(int(item[1:]))
+        elif opcode is load and item[:2] == "=$":
+            slot = int(item[2:])
+            temps = max(temps, slot + 1)
+            ops.append(Opcode.STORE)
+            args.append(slot)
+        elif opcode is load:
+            ops.append(load)
+            args.append(names.setdefault(item, len(names)))
+        elif opcode is not None:
+            ops.append(opcode)
+            args.append(0)
+
+    if slots is not None:
+        slots = tuple(slots.setdefault(name, len(slots)) for name in names)
+
+    return Code(
+        postfix[0],
+        bytes(ops),
+        tuple(args),
+        tuple(value for _, value in consts),
+        tuple(names),
+        temps,
+        slots or (),
+    )
+
+
+def compile_statement(ast, slots: dict | None = None) -> Code:
+    """Compile an assignment AST from `Parser` to `Code`."""
+    return compile_postfix(to_postfix(ast), slots)
+
+
+def run(code: Code, symbol_table):
+    """
+    Execute `code` and return the value of its expression.
+
+    `symbol_table` may be any mapping supporting `in` and `[]`; it is only
+    read from.
+    """
+    consts, names = code.consts, code.names
+    operations = BINARY_OPERATIONS
+    neg, const = Opcode.NEG.value, Opcode.CONST.value
+    load, store = Opcode.LOAD.value, Opcode.STORE.value
+
+    stack = []
+    temps = [None] * code.temps
+    push, pop = stack.append, stack.pop
+
+    for op, arg in zip(code.ops, code.args):
+        if op < neg:
+            b = pop()
+            stack[-1] = operations[op](stack[-1], b)
+
+        elif op == const:
+            push(consts[arg])
+
+        elif op == neg:
+            stack[-1] = -stack[-1]
+
+        elif op == load:
+            name = names[arg]
+            if name not in symbol_table:
+                raise NameError(f"Variable `{name}` is not defined.")
+            push(symbol_table[name])
+
+        elif op == store:
+            temps[arg] = stack[-1]
+
+        else:
+            push(temps[arg])
+
+    return stack[0]
+
+
+class _Undefined:
+    """Value of a variable that has not been assigned yet."""
+
+    def __repr__(self) -> str:
+        return "<undefined>"
+
+
+UNDEFINED = _Undefined()
+
+
+def run_slots(code: Code, values: list):
+    """
+    Like `run`, but read variables from `values` by slot rather than from
+    a symbol table by name. Unassigned slots hold `UNDEFINED`.
+    """
+    consts, names, slots = code.consts, code.names, code.slots
+    operations = BINARY_OPERATIONS
+    neg, const = Opcode.NEG.value, Opcode.CONST.value
+    load, store = Opcode.LOAD.value, Opcode.STORE.value
+    undefined = UNDEFINED
+
+    stack = []
+    push, pop = stack.append, stack.pop
+    temps = [None] * code.temps
+
+    for op, arg in zip(code.ops, code.args):
+        if op < neg:
+            b = pop()
+            stack[-1] = operations[op](stack[-1], b)
+
+        elif op == const:
+            push(consts[arg])
+
+        elif op == neg:
+            stack[-1] = -stack[-1]
+
+        elif op == load:
+            value = values[slots[arg]]
+            if value is undefined:
+                raise NameError(f"Variable `{names[arg]}` is not defined.")
+            push(value)
+
+        elif op == store:
+            temps[arg] = stack[-1]
+
+        else:
+            push(temps[arg])
+
+    return stack[0]
+
+
+@dataclass(frozen=True)
+class SlotProgram:
+    """
+    Statements compiled against one flat list of variable slots.
+
+    Every identifier in the program is interned to a dense slot index at
+    compile time, so running it reads and writes a list instead of
+    hashing names into a dict. `targets[i]` is the slot `codes[i]`
+    assigns; a `None` code (a statement that failed to parse) is skipped.
+    """
+
+    codes: tuple[Code | None, ...]
+    targets: tuple[int, ...]
+    names: tuple[str, ...]
+
+    def needed(self, outputs) -> list[bool]:
         """
-        Assigns the expression value to a variable in the symbol table.
+        Which statements the values of the variables in `outputs` depend
+        on, found by walking the program backwards (a backward slice).
 
-        Returns the name of the variable assigned to.
+        An assignment only hides earlier ones to the same variable when it
+        is known to succeed: it reads no variables and evaluating it here
+        raises nothing. Otherwise an earlier value may still show through.
+        """
+        slots = {name: slot for slot, name in enumerate(self.names)}
+        live = {slots[name] for name in outputs if name in slots}
+        needed = [False] * len(self.codes)
+
+        for i in reversed(range(len(self.codes))):
+            code, target = self.codes[i], self.targets[i]
+            if code is None or target not in live:
+                continue
+
+            needed[i] = True
+            if not code.names and _succeeds(code):
+                live.discard(target)
+            live.update(code.slots)
+
+        return needed
+
+    def stream(self, symbol_table: dict, needed: list[bool] | None = None) -> Iterator:
         """
+        Run every statement, or only those marked in `needed`, yielding
+        one outcome per statement as soon as it is computed: the assigned
+        value, the exception it raised or `None` for a skipped statement.
+
+        Once exhausted, `symbol_table` is updated in place exactly as
+        running each statement through `Evaluator` in order would.
+        """
+        values = [symbol_table.get(name, UNDEFINED) for name in self.names]
+        compiled = zip(self.codes, self.targets)
+        if needed is not None:
+            compiled = (
+                (code, target) if keep else (None, -1)
+                for (code, target), keep in zip(compiled, needed)
+            )
+        return _execute(compiled, values, self.names, symbol_table)
+
+    def run(self, symbol_table: dict, needed: list[bool] | None = None) -> list:
+        """Like `stream`, but return all the outcomes as a list."""
+        with timed("execute"):
+            return list(self.stream(symbol_table, needed))
+
+
+def _succeeds(code: Code) -> bool:
+    """Whether code that reads no variables runs without raising."""
+    try:
+        run_slots(code, [])
+    except Exception:
+        return False
+    return True
+
+
+def _execute(compiled: Iterable, values: list, names, symbol_table: dict):
+    """
+    Run `(code, target slot)` pairs against `values`, yielding outcomes,
+    then copy every assigned slot to `symbol_table`.
+    """
+    assigned = {}  # slots in order of first assignment
+
+    for code, target in compiled:
+        if code is None:
+            yield None
+            continue
+        try:
+            value = run_slots(code, values)
+        except Exception as e:
+            outcome = e
+        else:
+            values[target] = outcome = value
+            assigned.setdefault(target)
+        yield outcome
+
+    for slot in assigned:
+        symbol_table[names[slot]] = values[slot]
+
+
+def compile_slots(asts: list) -> SlotProgram:
+    """Compile assignment ASTs from `Parser`, or `None`s, to a `SlotProgram`."""
+    slots = {}
+    codes, targets = [], []
+
+    with timed("compile"):
+        for ast in asts:
+            if ast is None:
+                codes.append(None)
+                targets.append(-1)
+                continue
+            code = compile_statement(ast, slots)
+            codes.append(code)
+            targets.append(slots.setdefault(code.target, len(slots)))
+
+    return SlotProgram(tuple(codes), tuple(targets), tuple(slots))
+
+
+def link_slots(codes: list) -> SlotProgram:
+    """
+    Like `compile_slots`, but from statements already compiled, without
+    slots, by `compile_statement`. Each is copied with its slots.
+    """
+    slots = {}
+    linked, targets = [], []
 
-        var_name = self.postfix[0]
+    with timed("compile"):
+        for code in codes:
+            if code is None:
+                linked.append(None)
+                targets.append(-1)
+                continue
+            # Same slot order as `compile_postfix`: reads, then the target
+            code_slots = tuple(
+                slots.setdefault(name, len(slots)) for name in code.names
+            )
+            linked.append(
+                Code(
+                    code.target,
+                    code.ops,
+                    code.args,
+                    code.consts,
+                    code.names,
+                    code.temps,
+                    code_slots,
+                )
+            )
+            targets.append(slots.setdefault(code.target, len(slots)))
 
-        stack = []
+    return SlotProgram(tuple(linked), tuple(targets), tuple(slots))
 
-        # ignore first and last symbol
-        for i in range(1, len(self.postfix) - 1):
-            node = self.postfix[i]
 
-            if type(node) in (int, float):
-                stack.append(node)
+def stream_slots(asts: Iterable, symbol_table: dict) -> Iterator:
+    """
+    Like `compile_slots(asts).stream(symbol_table)`, but compile each
+    statement only when it is reached, so `asts` can be a lazy iterable
+    and nothing is held per statement once it has run.
+    """
+    slots, values, names = {}, [], []
+
+    def compiled():
+        for ast in asts:
+            if ast is None:
+                yield None, -1
+                continue
 
-            elif isinstance(node, str) and node.startswith('u'):
-                # Handle unary operations (e.g., 'u-' for unary minus)
-                operator = node[1:]  # Remove 'u' prefix
-                operand = stack.pop()
-                if operator == '-':
-                    stack.append(-operand)
-                elif operator == '+':
-                    stack.append(operand)
-                else:
-                    raise ValueError(f"Unknown unary operator: {operator}")
+            code = compile_statement(ast, slots)
+            target = slots.setdefault(code.target, len(slots))
+            # New slots are numbered in this order, after all existing ones
+            for name, slot in zip((*code.names, code.target), (*code.slots, target)):
+                if slot == len(values):
+                    values.append(symbol_table.get(name, UNDEFINED))
+                    names.append(name)
+            yield code, target
 
-            elif node not in "+/*%-":
-                if node not in self.symbol_table:
-                    raise NameError(f"Variable `{node}` is not defined.")
+    return _execute(compiled(), values, names, symbol_table)
 
-                stack.append(self.symbol_table[node])
 
-            else:
-                b, a = stack.pop(), stack.pop()
-                stack.append(eval(f"{a}{node}{b}"))
+class Evaluator:
+    """
+    To evaluate an AST, first call `.evaluate` to populate the stack and then
+    you can either:
+
+    - `.execute()` to add the value to the symbol_table.
+    - call `str()` to return a string representation of the stack.
+
+    `.execute()` compiles the postfix stack to bytecode and runs it. It
+    flattens the AST itself if `.evaluate` has not been called.
+    """
+
+    def __init__(self, ast, symbol_table) -> None:
+        self.ast = ast
+        self.postfix = []
+        self.symbol_table = symbol_table
+        self.code = None
+
+    def _walk(self, node):
+        self.postfix += to_postfix(node)
+
+    def evaluate(self):
+        self._walk(self.ast)
+
+    def execute(self):
+        """
+        Assigns the expression value to a variable in the symbol table.
+
+        Returns the name of the variable assigned to.
+        """
+        if self.code is None:
+            self.code = compile_postfix(self.postfix or to_postfix(self.ast))
 
-        self.symbol_table[var_name] = stack[0]
-        return var_name
+        self.symbol_table[self.code.target] = run(self.code, self.symbol_table)
+        return self.code.target
 
     def __str__(self) -> str:
-        return " ".join(str(e) for e in self.postfix)
+        return " ".join(map(format_number, self.postfix))
@@ -0,0 +1,196 @@
+"""
+Spreadsheet-style incremental evaluation of a document.
+
+A `Document` keeps every line's parsed statement, the variables it reads
+and writes, and its last outcome. After an edit only the edited lines and
+the statements downstream of a changed value are evaluated again; every
+other line reuses its previous outcome.
+"""
+
+import sys
+import threading
+from dataclasses import dataclass, field
+
+from evaluator import Code, run
+from statement_cache import StatementCache, compile_line, normalize
+
+# Approximate memory of one cell besides its text and outcome, with its
+# AST and bytecode (measured with tracemalloc on typical lines)
+CELL_BYTES = 2048
+
+
+def succeeded(outcome) -> bool:
+    """Whether a line's outcome is an assigned value."""
+    return outcome is not None and not isinstance(outcome, Exception)
+
+
+def same_outcome(a, b) -> bool:
+    """
+    Whether two outcomes are indistinguishable. Values must match in type
+    as well (1 == 1.0) and errors in type and message.
+    """
+    if isinstance(a, Exception) or isinstance(b, Exception):
+        return type(a) is type(b) and a.args == b.args
+    return type(a) is type(b) and a == b
+
+
+@dataclass(eq=False)
+class Cell:
+    """One line of a `Document`."""
+
+    text: str
+    ast: tuple | None = None
+    code: Code | None = None
+    # Variables the statement reads and the one it assigns, if any
+    reads: frozenset[str] = frozenset()
+    target: str | None = None
+    # The assigned value, the exception raised or `None` for a blank line
+    outcome: object = None
+    # Target and outcome this line last contributed, to tell whether its
+    # new outcome changes anything downstream
+    previous: tuple = (None, None)
+    dirty: bool = True
+    # Variables whose binding changed because lines before this one were
+    # deleted
+    invalidates: set = field(default_factory=set)
+
+    @classmethod
+    def parse(cls, text: str, cache: StatementCache | None = None) -> "Cell":
+        cell = cls(text)
+        entry = compile_line(normalize(text)) if cache is None else cache.get(text)
+        if entry is None:
+            return cell
+
+        if entry.error is not None:
+            cell.outcome = entry.error
+            return cell
+
+        cell.ast = entry.ast
+        cell.code = entry.code
+        cell.reads = frozenset(cell.code.names)
+        cell.target = cell.code.target
+        return cell
+
+    def evaluate(self, symbol_table: dict):
+        if self.code is None:
+            return  # blank lines and parse errors never change
+        try:
+            self.outcome = run(self.code, symbol_table)
+        except Exception as e:
+            self.outcome = e
+
+
+class Document:
+    """
+    A document evaluated incrementally, one statement per line.
+
+    `symbol_table` always matches evaluating every line in order.
+    Variables can be reassigned: each read sees the latest assignment
+    above it, as in a full evaluation.
+    """
+
+    def __init__(self, lines: list[str] = (), cache: StatementCache | None = None):
+        # Parses and compiles lines once for every document that shares it
+        self.cache = cache
+        self.cells = []
+        self.symbol_table = {}
+        # Approximate memory used, and bookkeeping for a `SessionStore`
+        self.size = 0
+        self.accounted = 0
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+        self.edit([(1, 0, lines)])
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def edit(self, edits: list[tuple[int, int, list[str]]]) -> list[int]:
+        """
+        Apply a line-level diff and recompute what it affects.
+
+        Each edit is `(start, delete, insert)`: delete `delete` lines from
+        1-based line `start` and insert the `insert` lines in their place.
+        Edits apply in order, each to the document the previous one left.
+
+        Returns the 0-based indexes of the lines whose outcome changed,
+        including every edited or inserted line. Raises `IndexError`,
+        leaving the document as it was, if an edit is out of range.
+        """
+        length = len(self.cells)
+        for start, delete, insert in edits:
+            if not 1 <= start <= length + 1:
+                raise IndexError(f"Line {start} is out of range")
+            if not 0 <= delete <= length - start + 1:
+                raise IndexError(f"Cannot delete {delete} lines from line {start}")
+            length += len(insert) - delete
+
+        for start, delete, insert in edits:
+            self._splice(start - 1, delete, list(insert))
+        updated = self._recompute()
+        self.size = sum(
+            CELL_BYTES + sys.getsizeof(cell.text) + sys.getsizeof(cell.outcome)
+            for cell in self.cells
+        )
+        return updated
+
+    def _splice(self, start: int, delete: int, insert: list[str]):
+        removed = self.cells[start : start + delete]
+        added = [Cell.parse(text, self.cache) for text in insert]
+
+        # A replaced line is compared against what it replaced, and lines
+        # removed outright change whatever they had assigned
+        for old, new in zip(removed, added):
+            new.previous = old.previous if old.dirty else (old.target, old.outcome)
+            new.invalidates = old.invalidates
+        lost = set()
+        for old in removed[len(added) :]:
+            lost |= old.invalidates
+            target, outcome = old.previous if old.dirty else (old.target, old.outcome)
+            if succeeded(outcome):
+                lost.add(target)
+
+        self.cells[start : start + delete] = added
+        if lost:
+            index = start + len(added)
+            if index < len(self.cells):
+                self.cells[index].invalidates |= lost
+
+    def _recompute(self) -> list[int]:
+        symbol_table = {}
+        changed = set()  # variables bound differently than before the edit
+        updated = []
+
+        for index, cell in enumerate(self.cells):
+            if cell.invalidates:
+                changed |= cell.invalidates
+                cell.invalidates = set()
+
+            if cell.dirty or (changed and not changed.isdisjoint(cell.reads)):
+                if not cell.dirty:
+                    cell.previous = (cell.target, cell.outcome)
+                cell.evaluate(symbol_table)
+                old_target, old_outcome = cell.previous
+
+                same = old_target == cell.target and same_outcome(
+                    old_outcome, cell.outcome
+                )
+                if cell.dirty or not same:
+                    updated.append(index)
+                if same and succeeded(cell.outcome):
+                    changed.discard(cell.target)
+                elif not same:
+                    if succeeded(old_outcome):
+                        changed.add(old_target)
+                    if succeeded(cell.outcome):
+                        changed.add(cell.target)
+                cell.dirty = False
+
+            elif succeeded(cell.outcome):
+                # Rebinds the same value as before
+                changed.discard(cell.target)
+
+            if succeeded(cell.outcome):
+                symbol_table[cell.target] = cell.outcome
+
+        self.symbol_table = symbol_table
+        return updated
@@ -0,0 +1,164 @@
+"""
+Evaluate large documents in the background.
+
+A `JobQueue` runs submitted documents on a fixed pool of worker threads,
+one document per worker at a time. Each `Job` records its outcomes as it
+goes, so its progress and the results so far can be read while it runs,
+and it can be cancelled between any two statements.
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from parser import Parser
+
+from evaluator import compile_slots, link_slots
+from statement_cache import StatementCache
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+FINISHED = frozenset({DONE, CANCELLED, FAILED})
+
+
+class QueueFull(Exception):
+    """Raised when submitting to a `JobQueue` with every slot taken."""
+
+
+class Job:
+    """One document evaluated in the background."""
+
+    def __init__(self, expressions: list[str], cache: StatementCache | None = None):
+        self.id = uuid.uuid4().hex
+        self.expressions = expressions
+        self.cache = cache
+        self.state = QUEUED
+        # `(line, expression, ast, outcome)` per statement run so far, as
+        # from `Session.append`
+        self.outcomes = []
+        self.lines_done = 0
+        self.errors = 0
+        self.symbol_table = {}
+        # Why the job failed, if it did
+        self.failure = None
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def run(self):
+        if self.cancelled.is_set():
+            self.state = CANCELLED
+            return
+        self.state = RUNNING
+
+        expressions = self.expressions
+        if self.cache is not None:
+            statements, codes = self.cache.parse(expressions)
+            program = link_slots(codes)
+        else:
+            document = "\n".join(e.replace("\n", " ") for e in expressions)
+            statements = Parser.parse_program(document)
+            program = compile_slots([s.ast for s in statements])
+        symbol_table = {}
+        # The stream goes first, so it runs to the end and fills in the
+        # symbol table
+        stream = program.stream(symbol_table)
+
+        for outcome, statement in zip(stream, statements):
+            if self.cancelled.is_set():
+                self.state = CANCELLED
+                return
+
+            line = statement.line
+            if statement.error is not None:
+                outcome = statement.error
+            if isinstance(outcome, Exception):
+                self.errors += 1
+            expression = expressions[line - 1].strip()
+            self.outcomes.append((line, expression, statement.ast, outcome))
+            self.lines_done = line
+
+        self.lines_done = len(expressions)
+        self.symbol_table = symbol_table
+        self.state = DONE
+
+
+class JobQueue:
+    """
+    Jobs run by `workers` threads, with at most `max_pending` queued or
+    running at once. The last `max_finished` finished jobs are kept so
+    their results can still be fetched. Jobs parse through `cache`, if
+    given.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_pending: int = 16,
+        max_finished: int = 64,
+        cache: StatementCache | None = None,
+    ):
+        self.cache = cache
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self.jobs = OrderedDict()  # in order of submission
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit(self, expressions: list[str]) -> Job:
+        job = Job(expressions, self.cache)
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise QueueFull(f"{self.pending} jobs are already pending")
+            self.pending += 1
+            self.jobs[job.id] = job
+            self._forget_finished()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+        Cancel a job, which stops before its next statement. A job that
+        has finished keeps its state.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        job.cancelled.set()
+        # A job that has not started yet frees its slot right away
+        if job.future is not None and job.future.cancel():
+            job.state = CANCELLED
+            with self.lock:
+                self.pending -= 1
+        return job
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancelled.set()
+        self.executor.shutdown()
+
+    def _run(self, job: Job):
+        try:
+            job.run()
+        except Exception as e:
+            job.failure = f"{type(e).__name__}: {e}"
+            job.state = FAILED
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def _forget_finished(self):
+        finished = [
+            job_id for job_id, job in self.jobs.items() if job.state in FINISHED
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
@@ -1,6 +1,8 @@
 import re
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from enum import Enum
+from typing import Iterator
 
 
 class TokenType(Enum):
@@ -10,6 +12,8 @@ class TokenType(Enum):
     PRED2 = "PRED2"  # * / %
     PRED3 = "PRED3"  # ( )
     ASSIGNMENT = "ASSIGNMENT"  # =
+    NEWLINE = "NEWLINE"  # statement boundary (streams only)
+    INVALID = "INVALID"  # unrecognised character (streams only)
     EOF = "EOF"
 
 
@@ -17,53 +21,177 @@ class TokenType(Enum):
 class Token:
     type: TokenType
     value: str | None
+    # 1-based source position, only filled in by `Lexer.stream`
+    line: int | None = field(default=None, compare=False)
+    column: int | None = field(default=None, compare=False)
+
+
+# Small integer code for each token type, as stored in a `TokenBuffer`
+TOKEN_TYPES = tuple(TokenType)
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+class TokenBuffer:
+    """
+    Compact token sequence backed by parallel arrays.
+
+    `types` holds one `TOKEN_CODES` entry per token and `starts`/`ends` hold
+    its span in `text`. Token values are only sliced out of `text` when
+    asked for, so building the buffer allocates no per-token objects.
+    Indexing still returns a `Token` for callers that expect one.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.types = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+
+    def append(self, code: int, start: int, end: int):
+        self.types.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def value(self, index: int) -> str | None:
+        """Slice the value of a token, `None` for value-less tokens."""
+        start, end = self.starts[index], self.ends[index]
+        return self.text[start:end] or None
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        return Token(self.type(index), self.value(index))
 
 
 class Lexer:
     NUMBER = r"\d+\.?\d*|\.\d+"
     VARIABLE = r"[a-zA-Z]+[0-9a-zA-Z]*"
-    OPERATOR = r"[=+-/*%]"
+    OPERATOR = r"[=+\-*/%]"
     PAREN = r"[()]"
 
+    # One capturing group per token class, in priority order. The index of
+    # the group that matched (`match.lastindex`) classifies the token, so
+    # each token is recognised in a single regex pass. `None` marks any
+    # other non-whitespace character.
+    GROUPS = (
+        (TokenType.NUMBER, NUMBER),
+        (TokenType.VAR, VARIABLE),
+        (TokenType.PRED1, r"[+\-]"),
+        (TokenType.PRED2, r"[*/%]"),
+        (TokenType.ASSIGNMENT, r"="),
+        (TokenType.PRED3, PAREN),
+        (None, r"\S"),
+    )
+    PATTERN = re.compile("|".join(f"({regex})" for _, regex in GROUPS))
+    TYPES = (None,) + tuple(token_type for token_type, _ in GROUPS)
+    CODES = tuple(TOKEN_CODES.get(token_type) for token_type in TYPES)
+
+    # Whole documents additionally split statements on newlines and keep
+    # going past invalid characters
+    PROGRAM_PATTERN = re.compile(PATTERN.pattern + r"|(\n)")
+    PROGRAM_CODES = tuple(
+        TOKEN_CODES[TokenType.INVALID] if code is None else code for code in CODES
+    ) + (TOKEN_CODES[TokenType.NEWLINE],)
+
     def __init__(self, text: str):
         self.text = text
 
     @classmethod
     def helper(cls, token):
-        if re.fullmatch(cls.NUMBER, token):
-            return Token(TokenType.NUMBER, token)
-        elif re.fullmatch(cls.VARIABLE, token):
-            return Token(TokenType.VAR, token)
-        elif re.fullmatch(cls.OPERATOR, token):
-            if token in "+-":
-                return Token(TokenType.PRED1, token)
-            elif token in "*/%":
-                return Token(TokenType.PRED2, token)
-            else:
-                return Token(TokenType.ASSIGNMENT, None)
+        match = cls.PATTERN.fullmatch(token)
+        token_type = cls.TYPES[match.lastindex] if match else None
 
-        elif re.fullmatch(cls.PAREN, token):
-            return Token(TokenType.PRED3, token)
-        else:
+        if token_type is None:
             raise ValueError(f"Invalid character: {token}")
+        elif token_type is TokenType.ASSIGNMENT:
+            return Token(TokenType.ASSIGNMENT, None)
+        return Token(token_type, token)
 
     def tokenize(self) -> list[Token]:
-        # Set valid definitions for different token types
-        definitions = "|".join(
-            [
-                self.NUMBER,
-                self.VARIABLE,
-                self.OPERATOR,
-                self.PAREN,
-                r"\S",
-            ]
-        )
-        pattern = re.compile(definitions)
+        types = self.TYPES
+        token_list = []
 
-        # Find all tokens in the input text
-        tokens = re.findall(pattern, self.text)
+        # Classify each token by the group it matched
+        for match in self.PATTERN.finditer(self.text):
+            token_type = types[match.lastindex]
+
+            if token_type is TokenType.ASSIGNMENT:
+                token_list.append(Token(token_type, None))
+            elif token_type is None:
+                raise ValueError(f"Invalid character: {match.group()}")
+            else:
+                token_list.append(Token(token_type, match.group()))
 
-        # Map tokens to their respective types
-        token_list = [self.helper(token) for token in tokens]
         token_list.append(Token(TokenType.EOF, None))
         return token_list
+
+    def tokenize_buffer(self, program: bool = False) -> TokenBuffer:
+        """
+        Like `tokenize`, but return the tokens as a `TokenBuffer`.
+
+        With `program=True` the text is a whole document: every newline is
+        emitted as a NEWLINE token and invalid characters as INVALID tokens
+        rather than raising.
+        """
+        if program:
+            pattern, codes = self.PROGRAM_PATTERN, self.PROGRAM_CODES
+        else:
+            pattern, codes = self.PATTERN, self.CODES
+        valueless = (
+            TOKEN_CODES[TokenType.ASSIGNMENT],
+            TOKEN_CODES[TokenType.NEWLINE],
+        )
+        buffer = TokenBuffer(self.text)
+        types, starts, ends = buffer.types, buffer.starts, buffer.ends
+
+        for match in pattern.finditer(self.text):
+            code = codes[match.lastindex]
+            start, end = match.span()
+
+            if code is None:
+                raise ValueError(f"Invalid character: {match.group()}")
+            elif code in valueless:
+                end = start  # like `Token(ASSIGNMENT, None)`
+
+            types.append(code)
+            starts.append(start)
+            ends.append(end)
+
+        end = len(self.text)
+        buffer.append(TOKEN_CODES[TokenType.EOF], end, end)
+        return buffer
+
+    @classmethod
+    def stream(cls, source) -> Iterator[Token]:
+        """
+        Lazily tokenize a file-like object or `mmap`, one line at a time.
+
+        Every token carries its (line, column) position. A NEWLINE token is
+        emitted at the end of each line and invalid characters are yielded
+        as INVALID tokens instead of raising, so a consumer can skip a bad
+        statement and carry on with the next one.
+        """
+        types = cls.TYPES
+        readline = source.readline
+        line_num = 0
+
+        while line := readline():
+            line_num += 1
+            if isinstance(line, bytes):
+                line = line.decode()
+            line = line.rstrip("\r\n")
+
+            for match in cls.PATTERN.finditer(line):
+                token_type = types[match.lastindex] or TokenType.INVALID
+                value = match.group()
+                if token_type is TokenType.ASSIGNMENT:
+                    value = None
+                yield Token(token_type, value, line_num, match.start() + 1)
+
+            yield Token(TokenType.NEWLINE, None, line_num, len(line) + 1)
+
+        yield Token(TokenType.EOF, None, line_num + 1, 1)
@@ -1,10 +1,269 @@
-from flask import Flask, render_template, request, jsonify
-from lexer import Lexer
-from parser import Parser, ParseError
-from evaluator import Evaluator
+import os
+import uuid
+
+from flask import (
+    Flask, Response, render_template, request, jsonify, stream_with_context
+)
+from parser import Statement
+from errors import error_kind, error_message as format_error
+from evaluator import (
+    compile_slots,
+    exceeds_str_limit,
+    format_number,
+    stream_slots,
+    to_postfix,
+)
+from incremental import Document
+from jobs import DONE, FINISHED, JobQueue, QueueFull
+from metrics import ERRORS, REGISTRY, REQUEST_LINES, Reading, timed
+from optimizer import optimize
+from pipeline import CProfileHook, Pipeline, TracemallocHook
+from result_cache import ResultCache
+from sessions import Session, SessionStore
+from snapshots import SnapshotStore
+from statement_cache import StatementCache
 
 app = Flask(__name__)
-symbol_table = {}
+# Where to write profiles of requests, see `profiling_hooks`
+app.config['PROFILE_DIR'] = os.environ.get('EVALUATOR_PROFILE_DIR')
+app.config['PROFILE'] = None
+
+# Profilers a request can ask for, with the extension of their output
+PROFILERS = {
+    'cprofile': (CProfileHook, 'pstats'),
+    'tracemalloc': (TracemallocHook, 'snapshot'),
+}
+
+# Parsed and compiled lines, shared by every endpoint but profiled
+# requests; read through the module, as benchmarks may replace it
+statement_cache = StatementCache()
+
+# Documents being edited through /documents, by id
+documents = SessionStore(factory=lambda lines: Document(lines, statement_cache))
+
+# Symbol tables built up through /sessions
+sessions = SessionStore(factory=lambda: Session(statement_cache))
+
+# Serialized /evaluate responses, by request content
+result_cache = ResultCache()
+
+# Symbol tables part way through documents, for documents that start alike
+snapshots = SnapshotStore()
+
+# Large documents evaluated in the background through /jobs
+jobs = JobQueue(cache=statement_cache)
+
+# Read through the module, as tests and benchmarks may replace the objects
+REGISTRY.register(Reading(
+    'evaluator_result_cache_hits_total', 'Responses served from the cache.',
+    lambda: result_cache.hits, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_result_cache_misses_total', 'Responses not found in the cache.',
+    lambda: result_cache.misses, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_result_cache_bytes', 'Size of the cached responses.',
+    lambda: result_cache.size
+))
+REGISTRY.register(Reading(
+    'evaluator_statement_cache_hits_total', 'Lines found parsed in the cache.',
+    lambda: statement_cache.hits, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_statement_cache_misses_total', 'Lines parsed and compiled.',
+    lambda: statement_cache.misses, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_statement_cache_bytes', 'Approximate size of the parsed lines.',
+    lambda: statement_cache.size
+))
+REGISTRY.register(Reading(
+    'evaluator_snapshot_hits_total', 'Documents resumed from a snapshot.',
+    lambda: snapshots.hits, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_snapshot_misses_total', 'Documents run from the start.',
+    lambda: snapshots.misses, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_snapshot_resumed_statements_total',
+    'Statements not run thanks to a snapshot.',
+    lambda: snapshots.resumed, kind='counter'
+))
+REGISTRY.register(Reading(
+    'evaluator_snapshot_bytes', 'Approximate size of the snapshots.',
+    lambda: snapshots.size
+))
+REGISTRY.register(Reading(
+    'evaluator_sessions', 'Sessions held by the server.', lambda: len(sessions)
+))
+REGISTRY.register(Reading(
+    'evaluator_documents', 'Documents held by the server.',
+    lambda: len(documents)
+))
+REGISTRY.register(Reading(
+    'evaluator_pending_jobs', 'Jobs queued or running.', lambda: jobs.pending
+))
+
+NDJSON = 'application/x-ndjson'
+
+
+def json_value(value):
+    """
+    Ints too long for Python's int/str conversion limit cannot be encoded
+    as JSON numbers, so they are sent as exact decimal strings instead.
+    """
+    if type(value) is int and exceeds_str_limit(value):
+        return format_number(value)
+    return value
+
+
+def error_message(line_num, error):
+    """`errors.error_message`, counting the error in the metrics."""
+    ERRORS.inc(error_kind(error))
+    return format_error(line_num, error)
+
+
+def report_lines(document, indexes):
+    """Results and errors of the given lines of a `Document`."""
+    results = []
+    errors = []
+
+    for index in indexes:
+        cell = document.cells[index]
+        if isinstance(cell.outcome, Exception):
+            errors.append(error_message(index + 1, cell.outcome))
+        elif cell.outcome is not None:
+            results.append({
+                'line': index + 1,
+                'input': cell.text.strip(),
+                'postfix': ' '.join(map(format_number, to_postfix(cell.ast))),
+                'result': f"{cell.target} = {format_number(cell.outcome)}"
+            })
+
+    return results, errors
+
+
+def statement_result(line_num, expression, ast, outcome, changed, optimized):
+    result = {
+        'line': line_num,
+        'input': expression,
+        'postfix': ' '.join(map(format_number, to_postfix(ast))),
+        'result': f"{ast[1]} = {format_number(outcome)}"
+    }
+    if optimized:
+        result['optimizations'] = [str(change) for change in changed]
+    return result
+
+
+def wants_stream():
+    """Whether the client asked for NDJSON, by `Accept` or `?format=ndjson`."""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON]) == NDJSON
+
+
+def parse_lines(expressions):
+    """
+    Parse one statement per expression, lazily, through the statement
+    cache. Errors read exactly as they do when the whole document is
+    parsed at once.
+    """
+    for line_num, expression in enumerate(expressions, 1):
+        entry = statement_cache.get(expression)
+        if entry is not None:
+            yield Statement(line_num, entry.ast, entry.error)
+
+
+def stream_evaluation(expressions, optimized, outputs):
+    """
+    Evaluate like `evaluate`, yielding one NDJSON line per statement as
+    soon as it has run, then a summary line with the symbol table.
+
+    Without `outputs`, each statement is parsed and compiled only when it
+    is reached and nothing is kept once its line is sent.
+    """
+    dumps = app.json.dumps
+    symbol_table = {}
+    counts = {'results': 0, 'errors': 0, 'skipped': 0}
+
+    def prepare(statement):
+        ast, changed = statement.ast, []
+        if optimized and ast is not None:
+            ast, changed = optimize(ast)
+        return ast, changed
+
+    if outputs is None:
+        needed = None
+        current = []  # the statement being run, with its AST and changes
+
+        def asts():
+            for statement in parse_lines(expressions):
+                ast, changed = prepare(statement)
+                current.append((statement, ast, changed))
+                yield ast
+
+        def statements():
+            for outcome in stream_slots(asts(), symbol_table):
+                yield (*current.pop(), outcome)
+
+    else:
+        # The statements an output depends on are only known from the
+        # whole document, so it is compiled up front
+        parsed = [
+            (statement, *prepare(statement)) for statement in parse_lines(expressions)
+        ]
+        program = compile_slots([ast for _, ast, _ in parsed])
+        needed = program.needed(outputs)
+
+        def statements():
+            # The stream goes first, so it runs to the end and fills in
+            # the symbol table
+            for outcome, item in zip(program.stream(symbol_table, needed), parsed):
+                yield (*item, outcome)
+
+    for i, (statement, ast, changed, outcome) in enumerate(statements()):
+        line_num = statement.line
+
+        if needed is not None and not needed[i]:
+            counts['skipped'] += 1
+            line = {'line': line_num, 'skipped': True}
+        elif statement.error is not None:
+            counts['errors'] += 1
+            error = error_message(line_num, statement.error)
+            line = {'line': line_num, 'error': error}
+        elif isinstance(outcome, Exception):
+            counts['errors'] += 1
+            error = error_message(line_num, outcome)
+            line = {'line': line_num, 'error': error}
+        else:
+            counts['results'] += 1
+            expression = expressions[line_num - 1].strip()
+            line = statement_result(
+                line_num, expression, ast, outcome, changed, optimized
+            )
+        yield dumps(line) + '\n'
+
+    if outputs is not None:
+        assigned = {ast[1] for _, ast, _ in parsed if ast is not None}
+        for name in outputs:
+            if name not in assigned:
+                counts['errors'] += 1
+                error = f'Name Error: Output `{name}` is not defined.'
+                yield dumps({'error': error}) + '\n'
+        symbol_table = {
+            name: symbol_table[name] for name in outputs if name in symbol_table
+        }
+
+    yield dumps({
+        'success': True,
+        **counts,
+        'symbol_table': {
+            name: json_value(value) for name, value in symbol_table.items()
+        }
+    }) + '\n'
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -13,67 +272,390 @@ def index():
 def evaluate():
     data = request.get_json()
     expressions = data.get('expressions', [])
+    optimized = data.get('optimize', False)
+    outputs = data.get('outputs')
     
     if not expressions:
         return jsonify({'error': 'Please provide expressions'})
-    
-    # Create a local symbol table for this request to ensure isolation
-    symbol_table = {}
-    
+    if outputs is not None and not (
+        isinstance(outputs, list)
+        and all(isinstance(name, str) for name in outputs)
+    ):
+        return jsonify({'error': 'Outputs must be a list of variable names'}), 400
+
+    REQUEST_LINES.observe(len(expressions))
+    if wants_stream():
+        return Response(
+            stream_with_context(stream_evaluation(expressions, optimized, outputs)),
+            mimetype=NDJSON
+        )
+
+    # A profiled request must really be evaluated, lexing and parsing
+    # included, so skips every cache and snapshots
+    profile, hooks = profiling_hooks()
+    if profile is not None:
+        with Pipeline(hooks) as pipeline:
+            body = evaluate_body(pipeline, expressions, optimized, outputs)
+        response = Response(body, mimetype='application/json')
+        # Not written if another profiler was already running
+        if os.path.exists(profile):
+            response.headers['X-Profile-File'] = profile
+        return response
+
+    # Identical requests get identical responses, so a cached response
+    # is sent as is, or not at all if the client already has it
+    etag = result_cache.key(expressions, optimize=optimized, outputs=outputs)
+    body = result_cache.get(etag)
+    if body is None:
+        pipeline = Pipeline(cache=statement_cache, snapshots=snapshots)
+        body = evaluate_body(pipeline, expressions, optimized, outputs)
+        result_cache.put(etag, body)
+    elif request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def profiling_hooks():
+    """
+    The profile to write for this request, if any, and the hooks that
+    write it.
+
+    Set `PROFILE_DIR` to allow profiling, then either send an
+    `X-Profile: cprofile` or `X-Profile: tracemalloc` header with one
+    request, or set `PROFILE` to one of those to profile every request.
+    """
+    directory = app.config.get('PROFILE_DIR')
+    kind = request.headers.get('X-Profile') or app.config.get('PROFILE')
+    if not directory or kind not in PROFILERS:
+        return None, []
+
+    hook, extension = PROFILERS[kind]
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.{extension}')
+    return path, [hook(path)]
+
+def evaluate_body(pipeline, expressions, optimized, outputs):
+    response = evaluate_document(pipeline, expressions, optimized, outputs)
+    with pipeline.stage('serialize'), timed('serialize'):
+        return jsonify(response).get_data()
+
+def evaluate_document(pipeline, expressions, optimized, outputs):
+    """The JSON response of /evaluate, as a dict."""
     results = []
     errors = []
+    skipped = []
+
+    # Each request evaluates against its own symbol table
+    evaluation = pipeline.evaluate(expressions, optimized, outputs)
+    statements, asts = evaluation.statements, evaluation.asts
+    changes, outcomes = evaluation.changes, evaluation.outcomes
+    needed = evaluation.needed
+
+    for i, (statement, ast, changed, outcome) in enumerate(
+        zip(statements, asts, changes, outcomes)
+    ):
+        line_num = statement.line
+        expression = expressions[line_num - 1].strip()
+
+        if needed is not None and not needed[i]:
+            skipped.append(line_num)
+        elif statement.error is not None:
+            errors.append(error_message(line_num, statement.error))
+        elif isinstance(outcome, Exception):
+            errors.append(error_message(line_num, outcome))
+        else:
+            results.append(
+                statement_result(line_num, expression, ast, outcome, changed, optimized)
+            )
     
-    for i, expression in enumerate(expressions):
-        line_num = i + 1
-        expression = expression.strip()
-        
-        if not expression:
-            continue
-            
-        try:
-            # Lexical analysis
-            lexer = Lexer(expression)
-            tokens = lexer.tokenize()
-            
-            # Parsing
-            parser = Parser(tokens)
-            ast = parser.parse()
-            
-            if ast is None:
-                errors.append(f'Line {line_num}: Empty expression')
-                continue
-            
-            # Evaluation
-            evaluator = Evaluator(ast, symbol_table)
-            evaluator.evaluate()
-            
-            # Get postfix notation
-            postfix_str = str(evaluator)
-            
-            # Execute the assignment
-            assigned_var = evaluator.execute()
-            result_value = symbol_table[assigned_var]
-            
-            results.append({
-                'line': line_num,
-                'input': expression,
-                'postfix': postfix_str,
-                'result': f"{assigned_var} = {result_value}"
-            })
-            
-        except ParseError as e:
-            errors.append(f'Line {line_num}: Parse Error: {str(e)}')
-        except NameError as e:
-            errors.append(f'Line {line_num}: Name Error: {str(e)}')
-        except Exception as e:
-            errors.append(f'Line {line_num}: Error: {str(e)}')
-    
+    if outputs is not None:
+        # Outputs that failed to compute already have a line's error
+        assigned = {ast[1] for ast in asts if ast is not None}
+        for name in outputs:
+            if name not in assigned:
+                errors.append(f'Name Error: Output `{name}` is not defined.')
+
+    response = {
+        'success': True,
+        'results': results,
+        'errors': errors,
+        'symbol_table': {
+            name: json_value(value)
+            for name, value in evaluation.symbol_table.items()
+        }
+    }
+    if outputs is not None:
+        response['skipped'] = skipped
+
+    return response
+
+@app.route('/documents', methods=['POST'])
+def create_document():
+    data = request.get_json()
+    expressions = data.get('expressions', [])
+
+    document_id, document = documents.create(expressions)
+
+    with document.lock:
+        results, errors = report_lines(document, range(len(document)))
+        response = {
+            'success': True,
+            'id': document_id,
+            'results': results,
+            'errors': errors,
+            'symbol_table': {
+                name: json_value(value)
+                for name, value in document.symbol_table.items()
+            }
+        }
+    return jsonify(response)
+
+@app.route('/documents/<document_id>', methods=['PATCH'])
+def edit_document(document_id):
+    """
+    Apply a line-level diff, `edits: [{start, delete, insert}]`, and return
+    only what changed: results and errors of the lines whose outcome
+    changed, and the variables whose value changed or that were removed.
+    """
+    data = request.get_json()
+    edits = parse_edits(data.get('edits', []))
+    if edits is None:
+        return jsonify({'error': 'Invalid edits'}), 400
+
+    # Under the document's lock, as another request may be editing it
+    def apply(document):
+        before = document.symbol_table
+        updated = document.edit(edits)
+        results, errors = report_lines(document, updated)
+        return before, document.symbol_table, updated, results, errors, len(document)
+
+    try:
+        applied = documents.use(document_id, apply)
+    except IndexError as e:
+        return jsonify({'error': str(e)}), 400
+    if applied is None:
+        return jsonify({'error': 'Unknown document'}), 404
+
+    before, after, updated, results, errors, lines = applied
+    return jsonify({
+        'success': True,
+        'lines': lines,
+        'updated': [index + 1 for index in updated],
+        'results': results,
+        'errors': errors,
+        'symbol_table': {
+            name: json_value(value)
+            for name, value in after.items()
+            if name not in before or before[name] is not value
+        },
+        'removed': [name for name in before if name not in after]
+    })
+
+@app.route('/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id):
+    if not documents.delete(document_id):
+        return jsonify({'error': 'Unknown document'}), 404
+    return jsonify({'success': True})
+
+def parse_edits(edits):
+    """
+    `(start, delete, insert)` tuples for `Document.edit`, or `None` if
+    any edit is malformed. Ranges are checked by the document itself.
+    """
+    if not isinstance(edits, list):
+        return None
+
+    parsed = []
+    for edit in edits:
+        if not isinstance(edit, dict):
+            return None
+        start = edit.get('start')
+        delete = edit.get('delete', 0)
+        insert = edit.get('insert', [])
+        if (
+            type(start) is not int or start < 1
+            or type(delete) is not int or delete < 0
+            or not isinstance(insert, list)
+            or not all(isinstance(line, str) for line in insert)
+        ):
+            return None
+        parsed.append((start, delete, insert))
+    return parsed
+
+def report_outcomes(outcomes):
+    """Results and errors of `(line, expression, ast, outcome)` tuples."""
+    results = []
+    errors = []
+
+    for line_num, expression, ast, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            errors.append(error_message(line_num, outcome))
+        else:
+            results.append(
+                statement_result(line_num, expression, ast, outcome, [], False)
+            )
+
+    return results, errors
+
+def append_response(session_id, expressions):
+    """
+    Append to a session, returning the new lines' results and errors and
+    the variables they assigned.
+    """
+    outcomes = sessions.append(session_id, expressions)
+    if outcomes is None:
+        return jsonify({'error': 'Unknown session'}), 404
+
+    results, errors = report_outcomes(outcomes)
+    assigned = {
+        ast[1]: outcome for _, _, ast, outcome in outcomes
+        if not isinstance(outcome, Exception)
+    }
     return jsonify({
         'success': True,
+        'id': session_id,
         'results': results,
         'errors': errors,
-        'symbol_table': dict(symbol_table)
+        'symbol_table': {
+            name: json_value(value) for name, value in assigned.items()
+        }
     })
 
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    data = request.get_json(silent=True) or {}
+    session_id, _ = sessions.create()
+    return append_response(session_id, data.get('expressions', []))
+
+@app.route('/sessions/<session_id>/statements', methods=['POST'])
+def append_statements(session_id):
+    """
+    Evaluate `expressions` after every statement already in the session.
+    Only they are evaluated, and only what they assigned is returned.
+    """
+    data = request.get_json()
+    return append_response(session_id, data.get('expressions', []))
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """The session's variables, or only those named by `?name=` args."""
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown session'}), 404
+
+    with session.lock:
+        symbol_table = session.symbol_table
+        names = request.args.getlist('name') or list(symbol_table)
+        errors = [
+            f'Name Error: Variable `{name}` is not defined.'
+            for name in names if name not in symbol_table
+        ]
+        response = {
+            'success': True,
+            'lines': session.lines,
+            'errors': errors,
+            'symbol_table': {
+                name: json_value(symbol_table[name])
+                for name in names if name in symbol_table
+            }
+        }
+    return jsonify(response)
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not sessions.delete(session_id):
+        return jsonify({'error': 'Unknown session'}), 404
+    return jsonify({'success': True})
+
+def job_status(job):
+    status = {
+        'id': job.id,
+        'state': job.state,
+        'lines': len(job.expressions),
+        'lines_done': job.lines_done,
+        'statements_done': len(job.outcomes),
+        'errors': job.errors
+    }
+    if job.failure is not None:
+        status['failure'] = job.failure
+    return status
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a document to be evaluated in the background."""
+    data = request.get_json()
+    expressions = data.get('expressions', [])
+    if not expressions:
+        return jsonify({'error': 'Please provide expressions'}), 400
+
+    try:
+        job = jobs.submit(expressions)
+    except QueueFull as e:
+        response = jsonify({'error': f'Too many jobs, try again later: {e}'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify(job_status(job)), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Progress of a job: its state and the lines and errors so far."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """
+    Results and errors of the statements from `offset`, at most `limit`
+    of them. `next` is the offset of the following page, or `null` once
+    the job has finished and there is nothing more. The symbol table is
+    included once the job is done.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', 1000, type=int), 10000)
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'Invalid offset or limit'}), 400
+
+    # Read the state first: outcomes only grow, so a finished job's page
+    # is complete
+    state = job.state
+    page = job.outcomes[offset:offset + limit]
+    results, errors = report_outcomes(page)
+    end = offset + len(page)
+
+    response = {
+        **job_status(job),
+        'state': state,
+        'results': results,
+        'errors': errors,
+        'next': end if end < len(job.outcomes) or state not in FINISHED else None
+    }
+    if state == DONE:
+        response['symbol_table'] = {
+            name: json_value(value) for name, value in job.symbol_table.items()
+        }
+    return jsonify(response)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job; it stops before its next statement."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/metrics')
+def metrics():
+    """Pipeline metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, port=8000)
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Lightweight metrics, rendered in the Prometheus text format by /metrics.
+
+The pipeline times its own stages with `timed`, so documents evaluated
+from library code are measured the same way as those sent to the web app:
+
+    with metrics.timed("parse"):
+        ...
+
+Recording a value takes a lock and a few list operations, cheap enough to
+leave on all the time.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the stage latency buckets
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+)
+LINE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _labels(label: str | None, value: str, le: str | None = None) -> str:
+    pairs = []
+    if label is not None:
+        pairs.append(f'{label}="{value}"')
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A count that only goes up, optionally split by one label."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: str | None = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value: str = "", amount: float = 1):
+        with self.lock:
+            self.values[value] = self.values.get(value, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            values = dict(self.values)
+        return [
+            f"{self.name}{_labels(self.label, value)} {count}"
+            for value, count in values.items()
+        ]
+
+
+class Reading:
+    """
+    A value read when metrics are rendered, e.g. a cache's size, or as a
+    counter one it already keeps, e.g. its hits.
+    """
+
+    def __init__(self, name: str, help: str, read, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> list[str]:
+        return [f"{self.name} {self.read()}"]
+
+
+class Histogram:
+    """Observed values counted into buckets, optionally split by one label."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: tuple,
+        label: str | None = None,
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.label = label
+        # Per label value: count in each bucket (not cumulative, the last
+        # for values above every bound), then sum and count
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, amount: float, value: str = ""):
+        index = bisect_left(self.buckets, amount)
+        with self.lock:
+            state = self.values.get(value)
+            if state is None:
+                state = self.values[value] = [[0] * (len(self.buckets) + 1), 0, 0]
+            state[0][index] += 1
+            state[1] += amount
+            state[2] += 1
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            values = {
+                value: (list(counts), total, count)
+                for value, (counts, total, count) in self.values.items()
+            }
+
+        lines = []
+        for value, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket
+                le = _labels(self.label, value, str(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.label, value)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """Add `metric`, replacing any with the same name."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += metric.samples()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "evaluator_stage_seconds",
+        "Time spent in each stage of evaluating a document.",
+        LATENCY_BUCKETS,
+        label="stage",
+    )
+)
+REQUEST_LINES = REGISTRY.register(
+    Histogram(
+        "evaluator_request_lines",
+        "Lines per /evaluate request.",
+        LINE_BUCKETS,
+    )
+)
+ERRORS = REGISTRY.register(
+    Counter(
+        "evaluator_errors_total",
+        "Errors reported for evaluated statements, by type.",
+        label="type",
+    )
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the time spent in the block as one run of `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
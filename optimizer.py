@@ -0,0 +1,240 @@
+"""
+Optional optimizer pass between `Parser` and evaluation.
+
+`optimize` rewrites an assignment AST without changing what it evaluates
+to or which error it raises:
+
+- constant subtrees are folded to a single number, unless evaluating them
+  raises (e.g. division by zero), so the error still happens at run time
+- the identities `x * 1`, `1 * x`, `x + 0`, `0 + x`, `x - 0`, `--x` and
+  `+x` are simplified to `x` (the one difference: `-0.0 + 0` was `0.0`)
+- an operation that appears more than once in the statement is evaluated
+  once and its value reused, through BIND and REF nodes
+"""
+
+from dataclasses import dataclass
+
+from evaluator import (
+    BINARY_OPCODES,
+    BINARY_OPERATIONS,
+    NodeType,
+    format_number,
+    to_postfix,
+)
+from metrics import timed
+
+FOLDED = "folded"
+SIMPLIFIED = "simplified"
+SHARED = "shared"
+
+
+@dataclass(frozen=True)
+class Change:
+    """One rewrite made by `optimize`: `before` was replaced by `after`."""
+
+    kind: str
+    before: tuple
+    after: tuple
+
+    def __str__(self) -> str:
+        before = " ".join(map(format_number, to_postfix(self.before)))
+        after = " ".join(map(format_number, to_postfix(self.after)))
+        return f"{self.kind} `{before}` to `{after}`"
+
+
+def _is_int(node, value: int) -> bool:
+    # Only int identities are exact: `x * 1.0` would turn an int into a float
+    return node[0] is NodeType.NUMBER and type(node[1]) is int and node[1] == value
+
+
+def _rebuild(node, children: list):
+    """`node` with its children replaced, or `node` itself if none changed."""
+    if all(new is old for new, old in zip(children, node[2:])):
+        return node
+    return (*node[:2], *children)
+
+
+def _simplify(node, children: list, changes: list, mark: int):
+    """
+    Fold or simplify `node`, whose children have already been rewritten to
+    `children`. `mark` is the length `changes` had before any of them were.
+    """
+    kind = node[0]
+    number = NodeType.NUMBER
+
+    if kind is NodeType.UNARY_OP:
+        operand = children[0]
+        if node[1] == "+":
+            changes.append(Change(SIMPLIFIED, node, operand))
+            return operand
+        elif operand[0] is number:
+            # A constant subtree reports one fold rather than every step
+            del changes[mark:]
+            folded = (number, -operand[1])
+            changes.append(Change(FOLDED, node, folded))
+            return folded
+        elif operand[0] is NodeType.UNARY_OP and operand[1] == "-":
+            changes.append(Change(SIMPLIFIED, node, operand[2]))
+            return operand[2]
+
+    elif kind is NodeType.BINARY_OP:
+        operator = node[1]
+        left, right = children
+
+        if left[0] is number and right[0] is number:
+            operation = BINARY_OPERATIONS[BINARY_OPCODES[operator]]
+            try:
+                value = operation(left[1], right[1])
+            except ArithmeticError:
+                # Leave it to raise when the statement is run
+                pass
+            else:
+                del changes[mark:]
+                folded = (number, value)
+                changes.append(Change(FOLDED, node, folded))
+                return folded
+
+        simplified = None
+        if (
+            operator == "*"
+            and _is_int(right, 1)
+            or (operator in "+-" and _is_int(right, 0))
+        ):
+            simplified = left
+        elif (
+            operator == "*"
+            and _is_int(left, 1)
+            or (operator == "+" and _is_int(left, 0))
+        ):
+            simplified = right
+
+        if simplified is not None:
+            changes.append(Change(SIMPLIFIED, node, simplified))
+            return simplified
+
+    return _rebuild(node, children)
+
+
+def _fold(ast, changes: list):
+    """Fold constants and simplify identities, bottom-up."""
+    number, variable = NodeType.NUMBER, NodeType.VARIABLE
+    # Pending nodes, with the length of `changes` once they were expanded
+    stack = [(ast, None)]
+    done = []
+
+    while stack:
+        node, mark = stack.pop()
+
+        if node[0] is number or node[0] is variable:
+            done.append(node)
+        elif mark is None:
+            stack.append((node, len(changes)))
+            stack += [(child, None) for child in reversed(node[2:])]
+        else:
+            count = len(node) - 2
+            children = done[-count:]
+            del done[-count:]
+            done.append(_simplify(node, children, changes, mark))
+
+    return done[0]
+
+
+def _key_ids(ast) -> dict:
+    """
+    Number every distinct subexpression, by identity of its nodes.
+
+    Equal subtrees get the same number. Keys are built from the numbers of
+    the children, so no subtree is ever hashed or compared as a whole.
+    """
+    keys, ids = {}, {}
+    stack = [(ast, False)]
+
+    while stack:
+        node, expanded = stack.pop()
+        kind = node[0]
+
+        if id(node) in ids:
+            continue
+        elif kind is NodeType.NUMBER:
+            # keyed by type too, as 1 == 1.0 but they must stay distinct
+            key = (kind, type(node[1]), node[1])
+        elif kind is NodeType.VARIABLE:
+            key = (kind, node[1])
+        elif not expanded:
+            stack.append((node, True))
+            stack += [(child, False) for child in node[2:]]
+            continue
+        else:
+            key = (kind, node[1], *(ids[id(child)] for child in node[2:]))
+
+        ids[id(node)] = keys.setdefault(key, len(keys))
+
+    return ids
+
+
+def _share(ast, changes: list):
+    """Evaluate repeated operations once and reuse their value."""
+    ids = _key_ids(ast)
+
+    # Count occurrences in evaluation order, not looking inside repeats:
+    # those are never evaluated, so what they contain is not repeated
+    counts = {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if node[0] is NodeType.NUMBER or node[0] is NodeType.VARIABLE:
+            continue
+        key = ids[id(node)]
+        counts[key] = counts.get(key, 0) + 1
+        if counts[key] == 1:
+            stack += reversed(node[2:])
+
+    if all(count == 1 for count in counts.values()):
+        return ast
+
+    # Same traversal, so the first occurrence of each repeat is bound and
+    # the rest refer to it
+    slots = {}
+    stack = [(ast, None)]
+    done = []
+    while stack:
+        node, slot = stack.pop()
+
+        if node[0] is NodeType.NUMBER or node[0] is NodeType.VARIABLE:
+            done.append(node)
+            continue
+
+        if slot is not None:
+            count = len(node) - 2
+            children = done[-count:]
+            del done[-count:]
+            node = _rebuild(node, children)
+            done.append(node if slot < 0 else (NodeType.BIND, slot, node))
+            continue
+
+        key = ids[id(node)]
+        if key in slots:
+            ref = (NodeType.REF, slots[key])
+            changes.append(Change(SHARED, node, ref))
+            done.append(ref)
+        else:
+            if counts[key] > 1:
+                slot = slots[key] = len(slots)
+            stack.append((node, -1 if slot is None else slot))
+            stack += [(child, None) for child in reversed(node[2:])]
+
+    return done[0]
+
+
+def optimize(ast) -> tuple[tuple, list[Change]]:
+    """
+    Optimize an assignment AST from `Parser`.
+
+    Returns the new AST and the changes made, in the order they were made.
+    The AST is returned as is when nothing could be optimized.
+    """
+    changes = []
+    with timed("optimize"):
+        ast = _fold(ast, changes)
+        ast = _share(ast, changes)
+    return ast, changes
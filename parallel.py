@@ -0,0 +1,167 @@
+"""
+Evaluate independent parts of a document in parallel.
+
+Statements that share no variable, directly or through other statements,
+can never affect each other. `run_parallel` splits a document into these
+independent chains (the connected components of its read/write dependency
+graph), evaluates each chain in order on a worker, and merges the outcomes
+back in line order. Within a chain evaluation is strictly sequential, so
+reassignment, errors and last-writer-wins behave exactly as they do when
+the whole document is evaluated line by line.
+"""
+
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from parser import Parser
+
+from evaluator import compile_statement, run
+from lexer import Lexer
+
+# Finds every name the lexer could read as a variable; matching a few too
+# many (e.g. in a line that fails to parse) only merges chains
+NAME = re.compile(Lexer.VARIABLE)
+
+
+def chains(lines: list[str]) -> list[list[int]]:
+    """
+    Group line indexes into chains that share no variable with each other.
+
+    Each chain is in line order and chains are ordered by their first line.
+    """
+    parent = {}
+
+    def find(name):
+        root = name
+        while parent[root] != root:
+            root = parent[root]
+        while parent[name] != root:  # path compression
+            parent[name], name = root, parent[name]
+        return root
+
+    line_names = []
+    for line in lines:
+        names = NAME.findall(line)
+        line_names.append(names)
+        for name in names:
+            parent.setdefault(name, name)
+        for name in names[1:]:
+            parent[find(name)] = find(names[0])
+
+    groups = {}
+    for index, names in enumerate(line_names):
+        # Lines without names still run, e.g. to report their parse error
+        key = find(names[0]) if names else ("line", index)
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def run_chain(lines: list[tuple[int, str]], symbol_table: dict) -> list:
+    """
+    Evaluate `(index, line)` pairs in order against `symbol_table`.
+
+    Returns `(index, target, outcome)` for every statement, where outcome
+    is the assigned value or the exception raised.
+    """
+    outcomes = []
+    for index, line in lines:
+        for statement in Parser.parse_program(line):
+            if statement.error is not None:
+                outcomes.append((index, None, statement.error))
+                continue
+
+            code = compile_statement(statement.ast)
+            try:
+                value = run(code, symbol_table)
+            except Exception as e:
+                outcomes.append((index, code.target, e))
+            else:
+                symbol_table[code.target] = value
+                outcomes.append((index, code.target, value))
+    return outcomes
+
+
+def _run_batch(batch: list[tuple[list, dict]]) -> list:
+    outcomes = []
+    for lines, symbol_table in batch:
+        outcomes += run_chain(lines, symbol_table)
+    return outcomes
+
+
+def _batches(tasks: list[tuple[list, dict]], count: int) -> list[list]:
+    """Pack chains into `count` batches of similar size, largest first."""
+    batches = [[] for _ in range(count)]
+    sizes = [0] * count
+    for task in sorted(tasks, key=lambda task: len(task[0]), reverse=True):
+        smallest = sizes.index(min(sizes))
+        batches[smallest].append(task)
+        sizes[smallest] += len(task[0])
+    return [batch for batch in batches if batch]
+
+
+def free_threaded() -> bool:
+    """Whether this interpreter runs Python threads in parallel."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def default_executor(workers: int) -> Executor:
+    """Threads on free-threaded builds, otherwise processes."""
+    if free_threaded():
+        return ThreadPoolExecutor(workers)
+    # Forking a process that runs other threads, e.g. the web app's job
+    # workers, can deadlock the children
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        return ProcessPoolExecutor(workers, mp_context=context)
+    return ProcessPoolExecutor(workers)
+
+
+def run_parallel(
+    document: str,
+    symbol_table: dict,
+    workers: int | None = None,
+    executor: Executor | None = None,
+) -> list[tuple[int, object]]:
+    """
+    Evaluate `document`, one statement per line, with independent chains
+    running on `workers` workers at once.
+
+    `symbol_table` is updated in place exactly as sequential evaluation
+    would update it. Returns `(line, outcome)` for every statement in line
+    order (1-based lines, blank lines skipped), where outcome is the
+    assigned value or the exception raised.
+
+    Pass an `executor` to reuse a pool across calls; by default one is
+    created for the call. With one worker everything runs in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    lines = document.split("\n")
+
+    tasks = []
+    for chain in chains(lines):
+        chain_lines = [(index, lines[index]) for index in chain]
+        names = {name for _, line in chain_lines for name in NAME.findall(line)}
+        initial = {name: symbol_table[name] for name in names if name in symbol_table}
+        tasks.append((chain_lines, initial))
+
+    if workers == 1 or len(tasks) == 1:
+        outcomes = _run_batch(tasks)
+    else:
+        batches = _batches(tasks, workers * 4)
+        if executor is None:
+            with default_executor(workers) as executor:
+                results = list(executor.map(_run_batch, batches))
+        else:
+            results = list(executor.map(_run_batch, batches))
+        outcomes = [outcome for result in results for outcome in result]
+
+    # Merge in line order, so the symbol table's keys end up in the order
+    # sequential evaluation would have inserted them
+    outcomes.sort(key=lambda outcome: outcome[0])
+    for _, target, outcome in outcomes:
+        if not isinstance(outcome, Exception):
+            symbol_table[target] = outcome
+    return [(index + 1, outcome) for index, _, outcome in outcomes]
@@ -1,7 +1,10 @@
-from typing import List
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List
 
-from evaluator import NodeType
-from lexer import Token, TokenType
+from evaluator import NodeType, parse_number
+from lexer import TOKEN_CODES, TOKEN_TYPES, Lexer, Token, TokenBuffer, TokenType
+from metrics import timed
 
 
 class ParseError(Exception):
@@ -10,9 +13,18 @@ class ParseError(Exception):
     pass
 
 
+@dataclass
+class Statement:
+    """A parsed line of a program, or the error that stopped it parsing."""
+
+    line: int
+    ast: tuple | None
+    error: Exception | None = None
+
+
 class Parser:
     """
-    Recursive descent parser for the grammar:
+    Parser for the grammar:
 
     program    → statement*
     statement  → IDENTIFIER '=' expression
@@ -24,16 +36,47 @@ class Parser:
     Note: All statements are assignment statements.
     """
 
-    def __init__(self, tokens: List[Token]):
+    # Binding strength of binary operators; unary operators bind tighter
+    # than any of them and are applied as soon as their factor is complete
+    PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "%": 2}
+    UNARY = {"+": "u+", "-": "u-"}
+    UNARY_OPERATORS = frozenset(UNARY.values())
+
+    def __init__(self, tokens: List[Token] | TokenBuffer):
         self.tokens = tokens
         self.current = 0
 
+        # Token types are matched by code so that a `TokenBuffer` is read
+        # without building a `Token` per lookahead
+        if isinstance(tokens, TokenBuffer):
+            self.buffer = tokens
+            self.types = tokens.types
+        else:
+            self.buffer = None
+            self.types = array("B", [TOKEN_CODES[t.type] for t in tokens])
+        self.length = len(tokens)
+
+        # Leaf nodes are immutable, so each distinct literal or variable is
+        # built once and shared by every statement this parser reads
+        self.numbers = {}
+        self.variables = {}
+
     def peek(self) -> Token:
         """Return the current token without consuming it."""
         if self.current < len(self.tokens):
             return self.tokens[self.current]
         return Token(TokenType.EOF, None)
 
+    def error_token(self) -> Token:
+        """
+        The current token as parse errors name it. The end of a line in a
+        document is reported as EOF, as it is when the line is parsed on
+        its own.
+        """
+        if self.match(TokenType.NEWLINE):
+            return Token(TokenType.EOF, None)
+        return self.peek()
+
     def advance(self) -> Token:
         """Consume and return the current token."""
         token = self.peek()
@@ -41,9 +84,27 @@ class Parser:
             self.current += 1
         return token
 
+    def value(self) -> str | None:
+        """Return the value of the current token."""
+        if self.buffer is not None:
+            return self.buffer.value(self.current)
+        return self.tokens[self.current].value
+
+    def consume(self) -> str | None:
+        """Consume the current token and return only its value."""
+        value = self.value()
+        self.current += 1
+        return value
+
     def match(self, token_type: TokenType) -> bool:
         """Check if current token matches the given type."""
-        return self.peek().type == token_type
+        if self.current < self.length:
+            return TOKEN_TYPES[self.types[self.current]] is token_type
+        return token_type == TokenType.EOF
+
+    def match_value(self, token_type: TokenType, value: str) -> bool:
+        """Check if current token has the given type and value."""
+        return self.match(token_type) and self.value() == value
 
     def parse_statement(self):
         """
@@ -52,98 +113,123 @@ class Parser:
         """
         # Must start with an identifier
         if not self.match(TokenType.VAR):
-            current_token = self.peek()
+            current_token = self.error_token()
             raise ParseError(
                 f"Expected variable name,\
                               got {current_token.type.value}"
             )
 
-        identifier = self.advance()
+        identifier = self.consume()
 
         # Must be followed by assignment operator
         if not self.match(TokenType.ASSIGNMENT):
-            current_token = self.peek()
+            current_token = self.error_token()
             raise ParseError(
                 f"Expected '=' after variable name, \
                     got {current_token.type.value}"
             )
 
-        self.advance()  # consume '='
+        self.consume()  # consume '='
 
         expr = self.parse_expression()
 
-        return (NodeType.ASSIGNMENT, identifier.value, expr)
+        return (NodeType.ASSIGNMENT, identifier, expr)
 
     def parse_expression(self):
         """
         expression → term (( '+' | '-' ) term)*
-        Returns: ('binary_op', operator, left, right) or term
-        """
-        left = self.parse_term()
-
-        while self.match(TokenType.PRED1):  # + or -
-            operator = self.advance()
-            right = self.parse_term()
-            left = (NodeType.BINARY_OP, operator.value, left, right)
+        term       → factor (( '*' | '/' | '%' ) factor)*
+        factor     → unary | NUMBER | IDENTIFIER | '(' expression ')'
+        unary      → ( '+' | '-' ) factor
 
-        return left
+        Parsed with explicit operator and operand stacks (shunting-yard)
+        rather than one Python call per grammar level, so parenthesis and
+        unary nesting depth is limited by memory, not the recursion limit.
 
-    def parse_term(self):
-        """
-        term → factor (( '*' | '/' | '%' ) factor)*
-        Returns: ('binary_op', operator, left, right) or factor
+        Returns: ('binary_op', operator, left, right) | ('unary_op',
+        operator, operand) | ('number', value) | ('variable', name)
         """
-        left = self.parse_factor()
+        operators = []  # "(", unary "u+"/"u-" or a binary operator
+        operands = []
+        depth = 0  # number of unclosed '('
+
+        while True:
+            # Expecting an operand: open any prefixes, then read a factor
+            while True:
+                if self.match(TokenType.PRED1):  # unary + or -
+                    operators.append(self.UNARY[self.consume()])
+                elif self.match_value(TokenType.PRED3, "("):
+                    self.consume()  # consume '('
+                    operators.append("(")
+                    depth += 1
+                else:
+                    break
+
+            if self.match(TokenType.NUMBER):
+                text = self.consume()
+                node = self.numbers.get(text)
+                if node is None:
+                    value = parse_number(text)
+                    node = self.numbers[text] = (NodeType.NUMBER, value)
+                operands.append(node)
+
+            elif self.match(TokenType.VAR):
+                name = self.consume()
+                node = self.variables.get(name)
+                if node is None:
+                    node = self.variables[name] = (NodeType.VARIABLE, name)
+                operands.append(node)
 
-        while self.match(TokenType.PRED2):  # *, /, %
-            operator = self.advance()
-            right = self.parse_factor()
-            left = (NodeType.BINARY_OP, operator.value, left, right)
+            else:
+                current_token = self.error_token()
+                raise ParseError(
+                    f"Unexpected token: {current_token.type.value} \
+                    with value '{current_token.value}'"
+                )
+
+            # Expecting an operator: close parentheses and apply unary
+            # operators to each factor that is now complete
+            while True:
+                while operators and operators[-1] in self.UNARY_OPERATORS:
+                    operator = operators.pop()[1]
+                    operand = operands.pop()
+                    operands.append((NodeType.UNARY_OP, operator, operand))
+
+                if depth and self.match_value(TokenType.PRED3, ")"):
+                    self.consume()  # consume ')'
+                    self._reduce(operators, operands, 0)
+                    operators.pop()  # discard '('
+                    depth -= 1
+                else:
+                    break
+
+            if self.match(TokenType.PRED1) or self.match(TokenType.PRED2):
+                operator = self.consume()
+                self._reduce(operators, operands, self.PRECEDENCE[operator])
+                operators.append(operator)
+                continue
+
+            if depth:
+                raise ParseError("Expected closing parenthesis ')'")
 
-        return left
+            self._reduce(operators, operands, 0)
+            return operands[0]
 
-    def parse_factor(self):
+    @classmethod
+    def _reduce(cls, operators, operands, precedence):
         """
-        factor → unary | NUMBER | IDENTIFIER | '(' expression ')'
-        unary  → ( '+' | '-' ) factor
-        Returns: ('number', value) | ('variable', name) | ('unary_op', operator, operand) | expression
+        Pop binary operators binding at least as tightly as `precedence`
+        (all of them down to the nearest '(' for 0) into AST nodes.
         """
-        # Handle unary operators (+ and -)
-        if self.match(TokenType.PRED1):  # + or -
-            operator = self.advance()
-            operand = self.parse_factor()  # recursively parse the operand
-            return (NodeType.UNARY_OP, operator.value, operand)
-        
-        elif self.match(TokenType.NUMBER):
-            token = self.advance()
-            # Convert to appropriate numeric type
-            if "." in token.value:
-                value = float(token.value)
-            else:
-                value = int(token.value)
-            return (NodeType.NUMBER, value)
-
-        elif self.match(TokenType.VAR):
-            token = self.advance()
-            return (NodeType.VARIABLE, token.value)
+        while operators:
+            bound = cls.PRECEDENCE.get(operators[-1])
+            if bound is None or bound < precedence:
+                break
 
-        elif self.match(TokenType.PRED3) and self.peek().value == "(":
-            self.advance()  # consume '('
-            expr = self.parse_expression()
-
-            # Consume closing paren
-            if not (self.match(TokenType.PRED3) and self.peek().value == ")"):
-                raise ParseError("Expected closing parenthesis ')'")
-            self.advance()
-
-            return expr
-
-        else:
-            current_token = self.peek()
-            raise ParseError(
-                f"Unexpected token: {current_token.type.value} \
-                    with value '{current_token.value}'"
-            )
+            operator = operators.pop()
+            right = operands.pop()
+            left = operands.pop()
+            operands.append((NodeType.BINARY_OP, operator, left, right))
 
     def parse(self):
         """
@@ -163,3 +249,107 @@ class Parser:
             )
 
         return ast
+
+    @classmethod
+    def parse_program(cls, text: str) -> List[Statement]:
+        """
+        program → statement*
+
+        Lex a whole document once and parse it one line per statement.
+        Blank lines are skipped. A line that fails to lex or parse yields a
+        `Statement` holding the error and parsing resumes on the next line.
+        """
+        with timed("lex"):
+            tokens = Lexer(text).tokenize_buffer(program=True)
+        return cls.parse_tokens(tokens)
+
+    @classmethod
+    def parse_tokens(cls, tokens: TokenBuffer) -> List[Statement]:
+        """
+        Parse a document already lexed by `Lexer.tokenize_buffer` with
+        `program=True`, as `parse_program` does.
+        """
+        with timed("parse"):
+            parser = cls(tokens)
+            statements = []
+            line = 1
+
+            while not parser.match(TokenType.EOF):
+                if parser.match(TokenType.NEWLINE):
+                    parser.consume()
+                    line += 1
+                    continue
+
+                start = parser.current
+                try:
+                    ast = parser.parse_statement()
+
+                    # Ensure the statement runs to the end of its line
+                    if not parser.match(TokenType.NEWLINE):
+                        if not parser.match(TokenType.EOF):
+                            current_token = parser.peek()
+                            raise ParseError(
+                                "Unexpected token after statement: "
+                                f"{current_token.type.value}"
+                            )
+
+                    statements.append(Statement(line, ast))
+                except ParseError as e:
+                    error = parser._recover(start, e)
+                    statements.append(Statement(line, None, error))
+
+        return statements
+
+    def _recover(self, start: int, error: ParseError) -> Exception:
+        """
+        Skip the rest of the line that starts at token `start`, returning
+        the error to report for it. As with a single `Lexer`, an invalid
+        character on the line takes priority over the parse error.
+        """
+        ends = (TOKEN_CODES[TokenType.NEWLINE], TOKEN_CODES[TokenType.EOF])
+        invalid = TOKEN_CODES[TokenType.INVALID]
+        types = self.types
+
+        self.current = start
+        while types[self.current] not in ends:
+            if types[self.current] == invalid:
+                error = ValueError(f"Invalid character: {self.value()}")
+                invalid = None  # report the first one only
+            self.current += 1
+
+        return error
+
+    @classmethod
+    def parse_stream(cls, tokens: Iterable[Token]) -> Iterator[Statement]:
+        """
+        Parse a token stream from `Lexer.stream` one statement at a time.
+
+        Only the tokens of the current line are buffered. Blank lines are
+        skipped and a line that fails to parse yields a `Statement` holding
+        the error, so the remaining lines are still parsed.
+        """
+        line_tokens = []
+
+        for token in tokens:
+            if token.type not in (TokenType.NEWLINE, TokenType.EOF):
+                line_tokens.append(token)
+                continue
+
+            if line_tokens:
+                yield cls._parse_line(line_tokens)
+                line_tokens = []
+
+    @classmethod
+    def _parse_line(cls, tokens: List[Token]) -> Statement:
+        line = tokens[0].line
+
+        for token in tokens:
+            if token.type == TokenType.INVALID:
+                error = ValueError(f"Invalid character: {token.value}")
+                return Statement(line, None, error)
+
+        tokens.append(Token(TokenType.EOF, None))
+        try:
+            return Statement(line, cls(tokens).parse())
+        except ParseError as e:
+            return Statement(line, None, e)
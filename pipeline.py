@@ -0,0 +1,291 @@
+"""
+The evaluation pipeline behind /evaluate, with hooks to observe it.
+
+A `Pipeline` lexes, parses, optionally optimizes, compiles and executes a
+document, calling its hooks at the start and end of every stage and after
+every statement. Hooks can time stages, count allocations or profile a
+whole run:
+
+    with Pipeline([CProfileHook("run.pstats")]) as pipeline:
+        evaluation = pipeline.evaluate(["a = 1", "b = a * 2"])
+
+Without hooks a pipeline adds nothing but a few calls per stage.
+"""
+
+import cProfile
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from parser import Parser, Statement
+
+from evaluator import SlotProgram, compile_slots, link_slots
+from lexer import Lexer
+from metrics import timed
+from optimizer import optimize
+from snapshots import SnapshotStore, prefix_keys
+from statement_cache import StatementCache
+
+# cProfile and tracemalloc each profile the whole process, so only one
+# profiled run at a time
+PROFILE_LOCK = threading.RLock()
+
+
+class Hook:
+    """Base class for pipeline hooks; every method does nothing by default."""
+
+    def run_started(self):
+        pass
+
+    def run_finished(self):
+        pass
+
+    def stage_started(self, stage: str):
+        pass
+
+    def stage_finished(self, stage: str, seconds: float, blocks: int):
+        """`blocks` is the net change in memory blocks allocated."""
+
+    def statement_finished(self, line: int, seconds: float, outcome):
+        pass
+
+
+class StageTimer(Hook):
+    """Records the time, allocations and slowest statements of a run."""
+
+    def __init__(self, slowest: int = 10):
+        self.stages = {}
+        self.slowest = slowest
+        self.statements = []  # (seconds, line), slowest first
+
+    def stage_finished(self, stage: str, seconds: float, blocks: int):
+        total, allocated = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total + seconds, allocated + blocks)
+
+    def statement_finished(self, line: int, seconds: float, outcome):
+        statements = self.statements
+        if len(statements) < self.slowest or seconds > statements[-1][0]:
+            statements.append((seconds, line))
+            statements.sort(reverse=True)
+            del statements[self.slowest :]
+
+
+class CProfileHook(Hook):
+    """
+    Profiles a whole run with `cProfile`, writing pstats to `path`. Runs
+    wait for each other; if some other profiler is already active, the
+    run is not profiled and nothing is written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.enabled = False
+
+    def run_started(self):
+        PROFILE_LOCK.acquire()
+        try:
+            self.profile.enable()
+        except ValueError:
+            PROFILE_LOCK.release()
+        else:
+            self.enabled = True
+
+    def run_finished(self):
+        if not self.enabled:
+            return
+        self.profile.disable()
+        self.enabled = False
+        PROFILE_LOCK.release()
+        self.profile.dump_stats(self.path)
+
+
+class TracemallocHook(Hook):
+    """
+    Traces allocations during a whole run, writing a `tracemalloc`
+    snapshot to `path`. Tracing is left alone if it was already on. Runs
+    wait for each other, as one stopping would end the other's trace.
+    """
+
+    def __init__(self, path: str, frames: int = 10):
+        self.path = path
+        self.frames = frames
+        self.started = False
+
+    def run_started(self):
+        PROFILE_LOCK.acquire()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started = True
+
+    def run_finished(self):
+        try:
+            tracemalloc.take_snapshot().dump(self.path)
+        finally:
+            if self.started:
+                tracemalloc.stop()
+                self.started = False
+            PROFILE_LOCK.release()
+
+
+@dataclass
+class Evaluation:
+    """Everything a pipeline run produced, one entry per statement."""
+
+    statements: list[Statement]
+    # ASTs as compiled, after optimization, and the changes made to each
+    asts: list
+    changes: list[list]
+    program: SlotProgram
+    # Per statement as from `SlotProgram.run`, `None` where it was skipped
+    outcomes: list
+    # Which statements ran, or `None` if all of them did
+    needed: list[bool] | None
+    symbol_table: dict
+
+
+class Pipeline:
+    """
+    Evaluates documents, calling `hooks` along the way. Entering it as a
+    context manager marks one run for the hooks, e.g. to profile it.
+    """
+
+    def __init__(
+        self,
+        hooks: list[Hook] = (),
+        cache: StatementCache | None = None,
+        snapshots: SnapshotStore | None = None,
+    ):
+        self.hooks = list(hooks)
+        # Parses and compiles lines once for every pipeline that shares it
+        self.cache = cache
+        # Lets documents resume from the state after a shared prefix
+        self.snapshots = snapshots
+
+    def __enter__(self) -> "Pipeline":
+        for hook in self.hooks:
+            hook.run_started()
+        return self
+
+    def __exit__(self, *exc_info):
+        for hook in reversed(self.hooks):
+            hook.run_finished()
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Run the block as `stage`, calling the hooks around it."""
+        hooks = self.hooks
+        if not hooks:
+            yield
+            return
+
+        for hook in hooks:
+            hook.stage_started(stage)
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            blocks = sys.getallocatedblocks() - blocks
+            for hook in hooks:
+                hook.stage_finished(stage, seconds, blocks)
+
+    def evaluate(
+        self,
+        expressions: list[str],
+        optimized: bool = False,
+        outputs: list[str] | None = None,
+    ) -> Evaluation:
+        """
+        Evaluate `expressions`, one statement each, against a new symbol
+        table. With `outputs`, only the statements those variables depend
+        on are run and the symbol table holds only them.
+        """
+        codes = None
+        if self.cache is not None:
+            # Lines are lexed and parsed one by one, and only on a miss
+            with self.stage("parse"):
+                statements, codes = self.cache.parse(expressions)
+        else:
+            document = "\n".join(e.replace("\n", " ") for e in expressions)
+            # `Parser.parse_program` would record lexing in the metrics itself
+            with self.stage("lex"), timed("lex"):
+                tokens = Lexer(document).tokenize_buffer(program=True)
+            with self.stage("parse"):
+                statements = Parser.parse_tokens(tokens)
+
+        asts = [statement.ast for statement in statements]
+        changes = [[] for _ in statements]
+        if optimized:
+            with self.stage("optimize"):
+                for i, ast in enumerate(asts):
+                    if ast is not None:
+                        asts[i], changes[i] = optimize(ast)
+
+        with self.stage("compile"):
+            # Cached code is of the statements as parsed, not optimized
+            if codes is not None and not optimized:
+                program = link_slots(codes)
+            else:
+                program = compile_slots(asts)
+            needed = None if outputs is None else program.needed(outputs)
+
+        symbol_table = {}
+        keys = start = None
+        run = needed
+        # A snapshot holds the state after every statement up to it, which
+        # running only those `outputs` depend on would not leave behind
+        if self.snapshots is not None and outputs is None:
+            with self.stage("resume"):
+                texts = [expressions[s.line - 1] for s in statements]
+                keys = prefix_keys(texts, b"optimized" if optimized else b"")
+                start = self.snapshots.resume(keys)
+                if start is not None:
+                    symbol_table = start.symbol_table()
+                    run = [False] * start.length
+                    run += [True] * (len(statements) - start.length)
+
+        with self.stage("execute"):
+            if any(
+                type(hook).statement_finished is not Hook.statement_finished
+                for hook in self.hooks
+            ):
+                outcomes = self._execute(statements, program, symbol_table, run)
+            else:
+                outcomes = program.run(symbol_table, run)
+
+        if keys is not None:
+            with self.stage("snapshot"):
+                if start is not None:
+                    outcomes[: start.length] = start.all_outcomes()
+                names = [None if ast is None else ast[1] for ast in asts]
+                self.snapshots.record(keys, names, outcomes, start)
+
+        if outputs is not None:
+            symbol_table = {
+                name: symbol_table[name] for name in outputs if name in symbol_table
+            }
+        return Evaluation(
+            statements, asts, changes, program, outcomes, needed, symbol_table
+        )
+
+    def _execute(self, statements, program, symbol_table, needed) -> list:
+        """`program.run`, timing each statement for the hooks."""
+        outcomes = []
+        hooks = self.hooks
+        with timed("execute"):
+            stream = program.stream(symbol_table, needed)
+            for statement in statements:
+                start = time.perf_counter()
+                outcome = next(stream)
+                seconds = time.perf_counter() - start
+                outcomes.append(outcome)
+                for hook in hooks:
+                    hook.statement_finished(statement.line, seconds, outcome)
+            # Runs to the end, filling in the symbol table
+            for _ in stream:
+                pass
+        return outcomes
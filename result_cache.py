@@ -0,0 +1,71 @@
+"""
+Cache of serialized /evaluate responses, keyed by the request's content.
+
+Evaluation is deterministic, so two requests with the same normalized
+expressions and options always get the same response. The key doubles as
+the response's ETag.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def normalize(expressions: list[str]) -> list[str]:
+    """
+    Expressions without surrounding whitespace, which never changes a
+    response. Whitespace within them does, as results echo them back.
+    """
+    return [e.strip() for e in expressions]
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of response bodies, bounded by their total size
+    in bytes and by their number.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, maxsize: int = 4096):
+        self.max_bytes = max_bytes
+        self.maxsize = maxsize
+        self.bodies = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(expressions: list[str], **options) -> str:
+        request = json.dumps([normalize(expressions), options], sort_keys=True)
+        return hashlib.blake2b(request.encode(), digest_size=16).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            return key in self.bodies
+
+    def get(self, key: str) -> bytes | None:
+        """The cached body for `key`, counting a hit or a miss."""
+        with self.lock:
+            body = self.bodies.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.bodies.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return  # would evict everything else and still not fit
+
+        with self.lock:
+            old = self.bodies.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.bodies[key] = body
+            self.size += len(body)
+
+            while self.size > self.max_bytes or len(self.bodies) > self.maxsize:
+                _, evicted = self.bodies.popitem(last=False)
+                self.size -= len(evicted)
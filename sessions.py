@@ -0,0 +1,207 @@
+"""
+Evaluation sessions: a symbol table held by the server between requests.
+
+A client creates a `Session`, then appends statements to it a few at a
+time. Each append evaluates only the new statements against the
+session's symbol table, as if they had been added to the end of one long
+document, so its cost does not grow with the lines already evaluated.
+
+A `SessionStore` bounds how many sessions it keeps and the memory their
+symbol tables use, evicting the least recently used first, and drops
+sessions left unused for longer than its TTL. It can hold any other kind
+of server-side state with the same `size`, `accounted`, `last_used` and
+`lock` attributes, such as incremental documents.
+"""
+
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from parser import Parser
+
+from evaluator import compile_statement, run
+from statement_cache import StatementCache
+
+
+def value_size(name: str, value) -> int:
+    """Approximate memory held by one symbol table entry."""
+    return sys.getsizeof(name) + sys.getsizeof(value)
+
+
+class Session:
+    """A symbol table built up by appending statements."""
+
+    def __init__(self, cache: StatementCache | None = None):
+        # Parses and compiles lines once for every session that shares it
+        self.cache = cache
+        self.symbol_table = {}
+        # Statements appended so far, including blank lines, so line
+        # numbers carry on across appends
+        self.lines = 0
+        self.size = 0
+        # What the store has counted of `size`, kept up to date under its lock
+        self.accounted = 0
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+    def append(self, expressions: list[str]) -> list[tuple]:
+        """
+        Evaluate `expressions`, one statement each, after those already in
+        the session.
+
+        Returns `(line, expression, ast, outcome)` for every statement
+        (1-based line within the session, blank lines skipped), where
+        outcome is the assigned value or the exception raised and `ast` is
+        `None` if the statement failed to parse.
+        """
+        symbol_table = self.symbol_table
+        outcomes = []
+        if self.cache is not None:
+            statements, codes = self.cache.parse(expressions)
+        else:
+            document = "\n".join(e.replace("\n", " ") for e in expressions)
+            statements = Parser.parse_program(document)
+            codes = [s.ast and compile_statement(s.ast) for s in statements]
+
+        for statement, code in zip(statements, codes):
+            line = self.lines + statement.line
+            expression = expressions[statement.line - 1].strip()
+            if statement.error is not None:
+                outcomes.append((line, expression, None, statement.error))
+                continue
+
+            try:
+                value = run(code, symbol_table)
+            except Exception as e:
+                outcomes.append((line, expression, statement.ast, e))
+                continue
+
+            target = code.target
+            if target in symbol_table:
+                self.size -= value_size(target, symbol_table[target])
+            symbol_table[target] = value
+            self.size += value_size(target, value)
+            outcomes.append((line, expression, statement.ast, value))
+
+        self.lines += len(expressions)
+        return outcomes
+
+
+class SessionStore:
+    """
+    Sessions by id, bounded by count and by the approximate memory of
+    their symbol tables, with least recently used evicted first.
+
+    Sessions not used for `ttl` seconds expire. Safe to share between
+    threads; changes to one session are serialized by its own lock.
+    `factory` makes new sessions from the arguments to `create`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30 * 60,
+        max_sessions: int = 1000,
+        max_bytes: int = 256 * 2**20,
+        clock=time.monotonic,
+        factory=Session,
+    ):
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.evictions = 0
+        self._sessions = OrderedDict()  # least recently used first
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._sessions)
+
+    def create(self, *args) -> tuple[str, Session]:
+        session = self.factory(*args)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            session.last_used = self.clock()
+            session.accounted = session.size
+            self._size += session.size
+            self._sessions[session_id] = session
+            self._evict(keep=session_id)
+        return session_id, session
+
+    def get(self, session_id: str) -> Session | None:
+        """The session with `session_id`, marking it used, or `None`."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = self.clock()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._size -= session.accounted
+            return True
+
+    def append(self, session_id: str, expressions: list[str]) -> list | None:
+        """
+        Run `Session.append` on a session, returning its outcomes, or
+        `None` if there is no such session.
+        """
+        return self.use(session_id, lambda session: session.append(expressions))
+
+    def use(self, session_id: str, action):
+        """
+        Call `action` with a session under its lock, then account for the
+        memory the session now uses. Returns what `action` returned, or
+        `None` if there is no such session.
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+
+        try:
+            with session.lock:
+                return action(session)
+        finally:
+            with self._lock:
+                # Unless it was deleted or evicted meanwhile
+                if self._sessions.get(session_id) is session:
+                    self._size += session.size - session.accounted
+                    session.accounted = session.size
+                    self._evict(keep=session_id)
+
+    def _expire(self):
+        deadline = self.clock() - self.ttl
+        sessions = self._sessions
+        while sessions:
+            session_id, session = next(iter(sessions.items()))
+            if session.last_used > deadline:
+                break
+            del sessions[session_id]
+            self._size -= session.accounted
+
+    def _evict(self, keep: str):
+        """
+        Evict least recently used sessions until within the limits. The
+        session `keep` is in use by this request, so it is never evicted,
+        even if it exceeds the memory budget on its own.
+        """
+        sessions = self._sessions
+        while len(sessions) > 1 and (
+            len(sessions) > self.max_sessions or self._size > self.max_bytes
+        ):
+            session_id = next(iter(sessions))
+            if session_id == keep:
+                sessions.move_to_end(keep)
+                session_id = next(iter(sessions))
+            self._size -= sessions.pop(session_id).accounted
+            self.evictions += 1
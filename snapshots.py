@@ -0,0 +1,191 @@
+"""
+Snapshots of the symbol table part way through documents, shared between
+requests that start with the same statements.
+
+Documents often share a long preamble and differ only in their last few
+lines. A `SnapshotStore` remembers, every `interval` statements and at
+the end of each document, the outcomes so far and the symbol table they
+left behind, keyed by a rolling hash of the statements before that
+point. A request with the same statements up to there resumes from the
+snapshot instead of running them again.
+
+A snapshot holds only what its own statements assigned and refers to the
+one before it for the rest, so snapshots along a document share their
+prefix instead of each copying the whole symbol table. Nothing in a
+snapshot is ever changed once stored.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+
+from statement_cache import normalize
+
+# Approximate memory of one outcome and its symbol table entry, besides
+# the value itself, for the budget
+OUTCOME_BYTES = 100
+
+
+@dataclass(frozen=True, eq=False)
+class Snapshot:
+    """
+    The state after the first `length` statements of a document: their
+    outcomes, and the symbol table as `changes` on top of `parent`.
+    """
+
+    key: bytes
+    parent: "Snapshot | None"
+    length: int
+    # (name, value) pairs assigned since `parent`, in order
+    changes: tuple[tuple[str, object], ...]
+    # Outcomes of the statements since `parent`
+    outcomes: tuple
+    size: int
+
+    def chain(self) -> list["Snapshot"]:
+        """This snapshot and the ones before it, first one first."""
+        chain = []
+        snapshot = self
+        while snapshot is not None:
+            chain.append(snapshot)
+            snapshot = snapshot.parent
+        chain.reverse()
+        return chain
+
+    def symbol_table(self) -> dict:
+        """A new symbol table, as running the statements would leave it."""
+        symbol_table = {}
+        for snapshot in self.chain():
+            for name, value in snapshot.changes:
+                symbol_table[name] = value
+        return symbol_table
+
+    def all_outcomes(self) -> list:
+        """Outcomes of all `length` statements."""
+        return [outcome for snapshot in self.chain() for outcome in snapshot.outcomes]
+
+
+def prefix_keys(texts: list[str], seed: bytes = b"") -> list[bytes]:
+    """
+    The key of every prefix of a document's statements: `keys[i]` hashes
+    `texts[: i + 1]`, normalized as for `StatementCache`.
+    """
+    keys = []
+    key = blake2b(seed, digest_size=16).digest()
+    for text in texts:
+        key = blake2b(key + normalize(text).encode(), digest_size=16).digest()
+        keys.append(key)
+    return keys
+
+
+class SnapshotStore:
+    """
+    Thread-safe store of `Snapshot`s, bounded by their approximate total
+    memory. The least recently used that no other snapshot builds on go
+    first, as those others would keep it alive anyway.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, interval: int = 256):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.snapshots = OrderedDict()
+        self.children = {}  # key to the keys of snapshots built on it
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Statements not run thanks to a snapshot
+        self.resumed = 0
+
+    def __len__(self) -> int:
+        return len(self.snapshots)
+
+    def resume(self, keys: list[bytes]) -> Snapshot | None:
+        """The snapshot of the longest prefix of `keys` held, if any."""
+        with self.lock:
+            snapshots = self.snapshots
+            for key in reversed(keys):
+                snapshot = snapshots.get(key)
+                if snapshot is not None:
+                    break
+            else:
+                self.misses += 1
+                return None
+
+            snapshots.move_to_end(key)
+            self.hits += 1
+            self.resumed += snapshot.length
+            return snapshot
+
+    def record(
+        self,
+        keys: list[bytes],
+        names: list[str | None],
+        outcomes: list,
+        start: Snapshot | None = None,
+    ):
+        """
+        Store snapshots of a document run from `start`, given the key,
+        assigned name and outcome of each of its statements. `names[i]`
+        is `None` where statement `i` did not parse.
+        """
+        length = len(keys)
+        if length < self.interval:
+            return
+
+        ends = list(range(self.interval, length, self.interval)) + [length]
+        parent = start
+        begin = 0 if start is None else start.length
+        for end in ends:
+            if end <= begin:
+                continue
+            parent = self._add(keys, names, outcomes, parent, begin, end)
+            if parent is None:
+                return
+            begin = end
+
+    def _add(self, keys, names, outcomes, parent, begin, end) -> Snapshot | None:
+        """Store the snapshot of statements `begin` to `end` on `parent`."""
+        key = keys[end - 1]
+        chunk = tuple(outcomes[begin:end])
+        changes = tuple(
+            (name, outcome)
+            for name, outcome in zip(names[begin:end], chunk)
+            if name is not None and not isinstance(outcome, Exception)
+        )
+        size = OUTCOME_BYTES * len(chunk) + sum(
+            sys.getsizeof(value) for _, value in changes
+        )
+        if size > self.max_bytes:
+            return None
+
+        with self.lock:
+            existing = self.snapshots.get(key)
+            if existing is not None:
+                return existing
+            # Its parent may have been evicted by another request meanwhile
+            if parent is not None and parent.key not in self.snapshots:
+                return None
+
+            snapshot = Snapshot(key, parent, end, changes, chunk, size)
+            self.snapshots[key] = snapshot
+            self.size += size
+            if parent is not None:
+                self.children.setdefault(parent.key, []).append(key)
+            while self.size > self.max_bytes:
+                self._evict()
+
+            return snapshot if key in self.snapshots else None
+
+    def _evict(self):
+        """Drop the least recently used leaf snapshot; holds the lock."""
+        for key, snapshot in self.snapshots.items():
+            if not self.children.get(key):
+                break
+        del self.snapshots[key]
+        self.size -= snapshot.size
+        self.children.pop(key, None)
+        if snapshot.parent is not None:
+            self.children[snapshot.parent.key].remove(key)
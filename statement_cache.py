@@ -0,0 +1,116 @@
+"""
+Cache of parsed and compiled statements, keyed by their normalized text.
+
+The same lines turn up in request after request, and often several times
+in one. A `StatementCache` parses and compiles each distinct line once.
+Entries hold only the AST, any parse error and slot-free `Code`, none of
+which ever changes or refers to a symbol table, so they are shared freely
+between requests and threads: the server's one cache serves `/evaluate`,
+streaming, sessions, documents and jobs alike.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from parser import Parser, Statement
+
+from evaluator import Code, compile_statement
+
+# Approximate memory of one AST node with its bytecode, for the budget
+# (measured with tracemalloc on typical lines)
+NODE_BYTES = 72
+
+
+@dataclass(frozen=True)
+class CachedStatement:
+    """A line parsed and compiled, or the error it failed to parse with."""
+
+    ast: tuple | None
+    error: Exception | None
+    code: Code | None
+    size: int
+
+
+def normalize(text: str) -> str:
+    """Runs of whitespace never change what a statement means."""
+    return " ".join(text.split())
+
+
+def compile_line(text: str) -> CachedStatement | None:
+    """Parse and compile one line, or return `None` if it is blank."""
+    statements = Parser.parse_program(text)
+    if not statements:
+        return None
+
+    statement = statements[0]
+    size = sys.getsizeof(text)
+    if statement.error is not None:
+        return CachedStatement(None, statement.error, None, size)
+
+    code = compile_statement(statement.ast)
+    size += NODE_BYTES * len(code.ops)
+    return CachedStatement(statement.ast, None, code, size)
+
+
+class StatementCache:
+    """
+    Thread-safe LRU cache of `CachedStatement`s, bounded by their
+    approximate total memory and by their number.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, maxsize: int = 100_000):
+        self.max_bytes = max_bytes
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> CachedStatement | None:
+        """The statement on a line, as `compile_line` would return it."""
+        key = normalize(text)
+        if not key:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Compile outside the lock; a racing duplicate is harmless
+        entry = compile_line(key)
+        if entry is None or entry.size > self.max_bytes:
+            return entry
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self.entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes or len(self.entries) > self.maxsize:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+
+        return entry
+
+    def parse(self, expressions: list[str]) -> tuple[list[Statement], list]:
+        """
+        Like `Parser.parse_program` on the expressions joined into one
+        document, but through the cache. Also returns the compiled `Code`
+        of each statement, `None` where it failed to parse.
+        """
+        statements, codes = [], []
+
+        for line, text in enumerate(expressions, 1):
+            entry = self.get(text)
+            if entry is not None:
+                statements.append(Statement(line, entry.ast, entry.error))
+                codes.append(entry.code)
+
+        return statements, codes
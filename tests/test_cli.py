@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from cli import main, run_in_workers
+
+
+def write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_text_output_and_exit_status(tmp_path):
+    path = write(tmp_path, "a.in", "a = 5\nb = a + 2\n\nc = (\nd = q\ne = b * 3")
+    out = io.StringIO()
+
+    assert main([path], out) == 1
+    lines = out.getvalue().splitlines()
+    assert lines[:2] == ["Line 1: a = 5", "Line 2: b = 7"]
+    assert lines[2].startswith("Line 4: Parse Error: Unexpected token: EOF")
+    assert lines[3:] == [
+        "Line 5: Name Error: Variable `q` is not defined.",
+        "Line 6: e = 21",
+    ]
+
+
+def test_ndjson_and_csv(tmp_path):
+    path = write(tmp_path, "a.in", "x = 10\r\ny = x % 3\n")
+
+    out = io.StringIO()
+    assert main(["-f", "ndjson", path], out) == 0
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[1] == {
+        "file": path,
+        "line": 2,
+        "input": "y = x % 3",
+        "postfix": "y x 3 % =",
+        "result": "y = 1",
+    }
+
+    out = io.StringIO()
+    assert main(["-f", "csv", path], out) == 0
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ["file", "line", "input", "postfix", "result", "error"]
+    assert rows[1] == [path, "1", "x = 10", "x 10 =", "x = 10", ""]
+
+
+def test_workers_keep_file_order(tmp_path):
+    paths = [write(tmp_path, f"{i}.in", f"v = {i}\nw = v * 2") for i in range(4)]
+    paths.append(write(tmp_path, "bad.in", "z = 1 / 0"))
+    out = io.StringIO()
+
+    with ThreadPoolExecutor(2) as executor:
+        counts = run_in_workers(paths, "text", out, None, executor)
+
+    assert counts == (9, 1, 0)
+    lines = out.getvalue().splitlines()
+    assert lines[:3] == [f"==> {paths[0]} <==", "Line 1: v = 0", "Line 2: w = 0"]
+    assert lines[-1] == "Line 1: Error: division by zero"
+
+
+def test_missing_file(tmp_path, capsys):
+    path = write(tmp_path, "a.in", "a = 1")
+
+    assert main([path, str(tmp_path / "missing.in")], io.StringIO()) == 2
+    assert "cannot read" in capsys.readouterr().err
+
+
+def test_undecodable_file(tmp_path, capsys):
+    good = write(tmp_path, "a.in", "a = 1")
+    bad = tmp_path / "b.in"
+    bad.write_bytes(b"b = 1\n\xff\xfe = 2\n")
+
+    assert main([str(bad), good], io.StringIO()) == 2
+    assert "cannot read" in capsys.readouterr().err
+
+    out = io.StringIO()
+    with ThreadPoolExecutor(2) as executor:
+        counts = run_in_workers([str(bad), good], "text", out, None, executor)
+    assert counts == (1, 0, 1)
+    assert out.getvalue().endswith("Line 1: a = 1\n")
+
+
+def test_stdin_twice(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("a = 1\n"))
+    out = io.StringIO()
+
+    assert main(["-", "-"], out) == 0
+    assert out.getvalue().splitlines() == ["==> - <==", "Line 1: a = 1", "==> - <=="]
@@ -0,0 +1,98 @@
+from parser import ParseError
+
+import pytest
+
+from codegen import ProgramCache, compile_program
+
+
+def test_run_matches_sequential_evaluation():
+    program = compile_program("a = b + 1\nc = a * (a - -2) / 4\nd = c % 2")
+    symbol_table = {"b": 3}
+
+    outcomes = program.run(symbol_table)
+
+    assert outcomes == [4, 6.0, 0.0]
+    assert symbol_table == {"b": 3, "a": 4, "c": 6.0, "d": 0.0}
+
+
+def test_rerun_with_new_inputs():
+    program = compile_program("total = price * qty\nvat = total / 5")
+
+    first, second = {"price": 2, "qty": 3}, {"price": 1.5, "qty": 4}
+    program.run(first)
+    program.run(second)
+
+    assert first["vat"] == 1.2
+    assert second == {"price": 1.5, "qty": 4, "total": 6.0, "vat": 1.2}
+
+
+def test_errors_are_per_statement():
+    program = compile_program("a = 1\nb = x + 1\nc = a / 0\nd = (\ne = a")
+    symbol_table = {}
+
+    outcomes = program.run(symbol_table)
+
+    assert outcomes[0] == 1
+    assert isinstance(outcomes[1], NameError)
+    assert str(outcomes[1]) == "Variable `x` is not defined."
+    assert isinstance(outcomes[2], ZeroDivisionError)
+    assert isinstance(outcomes[3], ParseError)
+    assert outcomes[4] == 1
+    assert symbol_table == {"a": 1, "e": 1}
+
+
+def test_error_order_follows_evaluation_order():
+    # The VM loads `x` before dividing, so the NameError wins
+    outcomes = compile_program("a = x + 1 / 0\nb = 1 / 0 + x").run({})
+
+    assert isinstance(outcomes[0], NameError)
+    assert isinstance(outcomes[1], ZeroDivisionError)
+
+
+def test_failed_assignment_keeps_previous_value():
+    symbol_table = {}
+    compile_program("a = 1\na = a / 0\nb = a").run(symbol_table)
+
+    assert symbol_table == {"a": 1, "b": 1}
+
+
+def test_variables_named_like_python_keywords():
+    symbol_table = {}
+    compile_program("if = 1\nNone = if + 1").run(symbol_table)
+
+    assert symbol_table == {"if": 1, "None": 2}
+
+
+def test_deep_nesting_and_big_literals():
+    depth, literal = 5_000, "9" * 5000
+    document = "a = " + "(" * depth + literal + ")" * depth + " + 1"
+
+    outcomes = compile_program(document).run({})
+
+    assert outcomes == [10**5000]
+
+
+def test_deep_unary_chain():
+    symbol_table = {"a": 3}
+    compile_program(
+        "b = " + "-" * 1001 + "a\nc = -" + "-(" * 500 + "1" + ")" * 500
+    ).run(symbol_table)
+
+    assert symbol_table == {"a": 3, "b": -3, "c": -1}
+
+
+def test_cache_hits_and_evicts():
+    cache = ProgramCache(maxsize=2)
+
+    first = cache.get("a = 1")
+    assert cache.get("a = 1") is first
+    cache.get("a = 2")
+    cache.get("a = 3")
+
+    assert cache.get("a = 1") is not first
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+@pytest.mark.parametrize("document", ["", "\n\n"])
+def test_empty_document(document):
+    assert compile_program(document).run({}) == []
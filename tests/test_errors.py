@@ -0,0 +1,10 @@
+from parser import ParseError
+
+from errors import error_kind, error_message
+
+
+def test_error_message():
+    assert error_message(3, ParseError("bad")) == "Line 3: Parse Error: bad"
+    assert error_message(1, NameError("x")) == "Line 1: Name Error: x"
+    assert error_message(2, ZeroDivisionError("y")) == "Line 2: Error: y"
+    assert error_kind(ValueError()) == "other"
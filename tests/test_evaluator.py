@@ -2,7 +2,15 @@ from parser import Parser
 
 import pytest
 
-from evaluator import Evaluator
+from evaluator import (
+    Evaluator,
+    Opcode,
+    compile_slots,
+    compile_statement,
+    format_number,
+    run,
+    stream_slots,
+)
 from lexer import Lexer
 
 
@@ -91,3 +99,152 @@ def test_undefined_reference():
 
     with pytest.raises(NameError):
         evaluator.execute()
+
+
+def test_deeply_nested_expression():
+    depth = 20_000
+    evaluator = _eval("a=" + "-(" * depth + "b" + ")" * depth, {"b": 3})
+
+    assert len(str(evaluator).split()) == depth + 3
+
+    evaluator.execute()
+    assert evaluator.symbol_table["a"] == 3
+
+
+@pytest.mark.parametrize(
+    "input_str, expected",
+    [
+        pytest.param("a=7/2", 3.5, id="true_division"),
+        pytest.param("a=6/3", 2.0, id="division_is_float"),
+        pytest.param("a=-7%3", 2, id="modulo_sign_of_divisor"),
+        pytest.param("a=7%-3", -2, id="modulo_negative_divisor"),
+        pytest.param("a=5--3", 8, id="negative_right_operand"),
+        pytest.param("a=0.1+0.2", 0.1 + 0.2, id="float_precision"),
+        pytest.param("a=2*3.0", 6.0, id="int_times_float"),
+    ],
+)
+def test_execute_semantics(input_str, expected):
+    evaluator = _eval(input_str, {})
+    evaluator.execute()
+
+    assert evaluator.symbol_table["a"] == expected
+    assert type(evaluator.symbol_table["a"]) is type(expected)
+
+
+def test_compile_statement():
+    lexer = Lexer("a = (b + 2) * -b % 2")
+    code = compile_statement(Parser(lexer.tokenize()).parse())
+
+    assert code.target == "a"
+    assert list(code.ops) == [
+        Opcode.LOAD,
+        Opcode.CONST,
+        Opcode.ADD,
+        Opcode.LOAD,
+        Opcode.NEG,
+        Opcode.MUL,
+        Opcode.CONST,
+        Opcode.MOD,
+    ]
+    assert code.consts == (2,)
+    assert code.names == ("b",)
+    assert run(code, {"b": 3}) == 1
+
+
+def test_compiled_code_is_reusable():
+    code = compile_statement(_eval("a=b*2", {}).ast)
+
+    assert run(code, {"b": 2}) == 4
+    assert run(code, {"b": 2.5}) == 5.0
+    with pytest.raises(NameError, match="Variable `b` is not defined."):
+        run(code, {})
+
+
+def test_division_by_zero():
+    evaluator = _eval("a=b/0", {"b": 1})
+
+    with pytest.raises(ZeroDivisionError):
+        evaluator.execute()
+    assert "a" not in evaluator.symbol_table
+
+
+def test_big_integer_intermediates():
+    # 10**6000 is past Python's 4300 digit int/str conversion limit
+    evaluator = _eval("a=b*b*b-b*b*b+b*b+1", {"b": 10**3000})
+    evaluator.execute()
+
+    assert evaluator.symbol_table["a"] == 10**6000 + 1
+
+
+def test_big_integer_literal():
+    literal = "9" * 5000
+    evaluator = _eval(f"a={literal}+1", {})
+
+    assert str(evaluator) == f"a {literal} 1 + ="
+
+    evaluator.execute()
+    assert evaluator.symbol_table["a"] == 10**5000
+
+
+def test_format_number():
+    assert format_number(-(10**5000)) == "-1" + "0" * 5000
+    assert format_number(2.5) == "2.5"
+    assert format_number("u-") == "u-"
+
+
+def test_slot_program_matches_evaluator():
+    source = "a = b + 1\nc = a * a\nb = c - a\nd = q\na = b / 2\ne = (a + d"
+    statements = Parser.parse_program(source)
+    expected = {"b": 2}
+    for statement in statements[:-1]:
+        try:
+            Evaluator(statement.ast, expected).execute()
+        except NameError:
+            pass
+
+    program = compile_slots([statement.ast for statement in statements])
+    symbol_table = {"b": 2}
+    outcomes = program.run(symbol_table)
+
+    assert list(symbol_table.items()) == list(expected.items())
+    assert outcomes[:3] == [3, 9, 6]
+    assert str(outcomes[3]) == "Variable `q` is not defined."
+    assert outcomes[5] is None
+    assert program.names == ("b", "a", "c", "q", "d")
+
+
+def test_stream_slots_matches_slot_program():
+    source = "a = b + 1\nc = a * a\nb = c - a\nd = q\na = b / 2\ne = (a + d"
+    asts = [statement.ast for statement in Parser.parse_program(source)]
+    expected = {"b": 2}
+    outcomes = compile_slots(asts).run(expected)
+
+    symbol_table = {"b": 2}
+    stream = stream_slots(iter(asts), symbol_table)
+    assert next(stream) == 3
+    assert symbol_table == {"b": 2}  # only filled in once exhausted
+
+    streamed = [3, *stream]
+    assert list(symbol_table.items()) == list(expected.items())
+    assert streamed[:3] == outcomes[:3] and streamed[4:] == outcomes[4:]
+    assert str(streamed[3]) == str(outcomes[3])
+
+
+@pytest.mark.parametrize(
+    "source, outputs, expected",
+    [
+        ("a = 1\nb = 2\nc = a + 1", ["c"], [True, False, True]),
+        ("x = 1\ny = x\nx = 2\nz = x", ["z"], [False, False, True, True]),
+        # the later assignment may fail, so the earlier one is still needed
+        ("x = 1\nx = 2 / q\nz = x", ["z"], [True, True, True]),
+        ("x = 1\nx = 2 / 0\nz = x", ["z"], [True, True, True]),
+        (f"x = 1\nx = 1{'0' * 400} * 1.5", ["x"], [True, True]),
+        ("a = b\nb = 1", ["a", "b"], [True, True]),
+        ("a = 1", ["missing"], [False]),
+    ],
+)
+def test_slot_program_needed(source, outputs, expected):
+    statements = Parser.parse_program(source)
+    program = compile_slots([statement.ast for statement in statements])
+
+    assert program.needed(outputs) == expected
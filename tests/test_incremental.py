@@ -0,0 +1,113 @@
+from parser import Parser
+
+import pytest
+
+from evaluator import Evaluator
+from incremental import Cell, Document
+
+
+def _full(lines: list[str]) -> dict:
+    """Evaluate every line in order, the non-incremental way."""
+    symbol_table = {}
+    for statement in Parser.parse_program("\n".join(lines)):
+        try:
+            Evaluator(statement.ast, symbol_table).execute()
+        except Exception:
+            pass
+    return symbol_table
+
+
+def _evaluated(monkeypatch) -> list[str]:
+    """Record the lines evaluated from now on."""
+    evaluated = []
+    evaluate = Cell.evaluate
+
+    def record(cell, symbol_table):
+        evaluated.append(cell.text)
+        evaluate(cell, symbol_table)
+
+    monkeypatch.setattr(Cell, "evaluate", record)
+    return evaluated
+
+
+def test_only_downstream_lines_are_recomputed(monkeypatch):
+    document = Document(["a = 1", "b = a + 1", "c = 5", "d = b * c", "e = c"])
+    evaluated = _evaluated(monkeypatch)
+
+    updated = document.edit([(1, 1, ["a = 2"])])
+
+    assert evaluated == ["a = 2", "b = a + 1", "d = b * c"]
+    assert updated == [0, 1, 3]
+    assert document.symbol_table == {"a": 2, "b": 3, "c": 5, "d": 15, "e": 5}
+
+
+def test_unchanged_value_stops_propagation(monkeypatch):
+    document = Document(["a = 1", "b = a * 0", "c = b + 1"])
+    evaluated = _evaluated(monkeypatch)
+
+    updated = document.edit([(1, 1, ["a = 7"])])
+
+    assert evaluated == ["a = 7", "b = a * 0"]
+    assert updated == [0]
+    assert document.symbol_table == {"a": 7, "b": 0, "c": 1}
+
+
+def test_reassignment_in_order():
+    lines = ["x = 1", "y = x + 1", "x = 10", "z = x + 1"]
+    document = Document(lines)
+
+    document.edit([(3, 1, ["x = 20"])])
+    assert document.symbol_table == {"x": 20, "y": 2, "z": 21}
+
+    document.edit([(3, 1, [])])
+    assert document.symbol_table == {"x": 1, "y": 2, "z": 2}
+
+    document.edit([(1, 0, ["w = 0"]), (2, 1, ["x = 5"])])
+    assert document.symbol_table == {"w": 0, "x": 5, "y": 6, "z": 6}
+
+
+def test_errors_and_recovery():
+    document = Document(["b = a + 1", "c = b * 2"])
+    assert isinstance(document.cells[0].outcome, NameError)
+    assert document.symbol_table == {}
+
+    updated = document.edit([(1, 0, ["a = 1"])])
+
+    assert updated == [0, 1, 2]
+    assert document.symbol_table == {"a": 1, "b": 2, "c": 4}
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        [(2, 1, ["b = 1 / 0"])],
+        [(1, 2, [])],
+        [(4, 0, ["a = c", "b = (", ""])],
+        [(3, 2, ["c = a % 0", "d = b"]), (1, 1, ["a = 2.5"])],
+    ],
+)
+def test_matches_full_evaluation(edits):
+    lines = ["a = 3", "b = a * a", "c = b - a", "a = c + b", "d = a / b"]
+    document = Document(lines)
+
+    document.edit(edits)
+    for start, delete, insert in edits:
+        lines[start - 1 : start - 1 + delete] = insert
+
+    assert list(document.symbol_table.items()) == list(_full(lines).items())
+
+
+def test_line_out_of_range():
+    with pytest.raises(IndexError):
+        Document(["a = 1"]).edit([(3, 0, ["b = 2"])])
+
+
+@pytest.mark.parametrize(
+    "edits", [[(1, -1, [])], [(2, 2, [])], [(1, 0, ["b = 2"]), (5, 0, [])]]
+)
+def test_invalid_edit_leaves_document_unchanged(edits):
+    document = Document(["a = 1", "c = a"])
+
+    with pytest.raises(IndexError):
+        document.edit(edits)
+    assert [cell.text for cell in document.cells] == ["a = 1", "c = a"]
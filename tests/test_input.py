@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from main import app
 
@@ -121,6 +123,21 @@ class TestBatchProcessing:
         assert 'Line 2' in data['errors'][0]
         assert 'Error' in data['errors'][0]  # Could be Name Error or other error
 
+    def test_invalid_character(self, client):
+        """Test that an invalid character only fails its own line."""
+        expressions = [
+            'a = 5',
+            'b = a ? 1',
+            'c = a + 1'
+        ]
+        response = client.post('/evaluate', 
+                              json={'expressions': expressions})
+        data = response.get_json()
+        
+        assert data['success'] is True
+        assert data['errors'] == ['Line 2: Error: Invalid character: ?']
+        assert data['symbol_table'] == {'a': 5, 'c': 6}
+
     def test_empty_and_whitespace_lines(self, client):
         """Test handling of empty lines and whitespace-only lines."""
         expressions = [
@@ -190,6 +207,25 @@ class TestBatchProcessing:
         assert data['symbol_table']['big'] == 999999999
         assert data['symbol_table']['bigger'] == 999999999000
 
+    def test_numbers_past_string_conversion_limit(self, client):
+        """Test integers with more digits than Python's str() allows."""
+        expressions = [
+            'a = 10',
+            'b = a * a * a * a * a * a * a * a * a * a',  # 10**10
+            'c = b * b * b * b * b * b * b * b * b * b',  # 10**100
+            'd = c * c * c * c * c * c * c * c * c * c',  # 10**1000
+            'e = d * d * d * d * d - 1'  # 5000 nines
+        ]
+        response = client.post('/evaluate', 
+                              json={'expressions': expressions})
+        data = response.get_json()
+        
+        assert response.status_code == 200
+        assert data['errors'] == []
+        assert data['results'][4]['result'] == 'e = ' + '9' * 5000
+        assert data['symbol_table']['d'] == 10**1000
+        assert data['symbol_table']['e'] == '9' * 5000
+
     def test_division_by_zero(self, client):
         """Test handling division by zero."""
         expressions = [
@@ -246,4 +282,434 @@ class TestPostfixNotation:
         data = response.get_json()
         
         assert response.status_code == 200
-        assert 'result 2 3 + 4 * =' in data['results'][0]['postfix']
\ No newline at end of file
+        assert 'result 2 3 + 4 * =' in data['results'][0]['postfix']
+
+    def test_postfix_optimized(self, client):
+        """Test the optimizer is applied and reported when asked for."""
+        response = client.post('/evaluate',
+                              json={'expressions': ['a = 3600 * 24 * 7',
+                                                    'b = a / (1 - 1)'],
+                                    'optimize': True})
+        data = response.get_json()
+
+        assert data['results'][0]['postfix'] == 'a 604800 ='
+        assert data['results'][0]['optimizations'] == [
+            'folded `3600 24 * 7 *` to `604800`'
+        ]
+        assert data['errors'] == ['Line 2: Error: division by zero']
+
+
+class TestDocuments:
+    """Test cases for incremental evaluation through /documents."""
+
+    def test_edit_returns_only_changes(self, client):
+        """Test an edit reports only the lines and variables it changed."""
+        response = client.post('/documents', json={
+            'expressions': ['a = 1', 'b = a + 1', 'c = 10', 'd = c * 2']
+        })
+        data = response.get_json()
+        assert data['symbol_table'] == {'a': 1, 'b': 2, 'c': 10, 'd': 20}
+
+        response = client.patch(f"/documents/{data['id']}", json={
+            'edits': [{'start': 1, 'delete': 1, 'insert': ['a = 5']}]
+        })
+        data = response.get_json()
+
+        assert data['updated'] == [1, 2]
+        assert [r['result'] for r in data['results']] == ['a = 5', 'b = 6']
+        assert data['symbol_table'] == {'a': 5, 'b': 6}
+        assert data['removed'] == []
+
+    def test_errors_read_as_in_evaluate(self, client):
+        """Test a line that ends early fails the same way in both endpoints."""
+        expressions = ['a = ', 'b = 1']
+        document = client.post('/documents', json={'expressions': expressions})
+        evaluated = client.post('/evaluate', json={'expressions': expressions})
+
+        errors = evaluated.get_json()['errors']
+        assert document.get_json()['errors'] == errors
+        assert errors[0].startswith('Line 1: Parse Error: Unexpected token: EOF')
+
+    def test_invalid_edits(self, client):
+        """Test malformed or out of range edits are rejected untouched."""
+        response = client.post('/documents',
+                               json={'expressions': ['a = 1', 'b = a']})
+        document_id = response.get_json()['id']
+
+        for edits in [
+            [{'delete': 1}],
+            [{'start': '1'}],
+            [{'start': 1, 'delete': -1}],
+            [{'start': 1, 'insert': 'c = 2'}],
+            [{'start': 1, 'delete': 3}],
+            [{'start': 4}],
+            {'start': 1},
+        ]:
+            response = client.patch(f'/documents/{document_id}',
+                                    json={'edits': edits})
+            assert response.status_code == 400
+
+        response = client.patch(f'/documents/{document_id}', json={
+            'edits': [{'start': 3, 'insert': ['c = b']}]
+        })
+        assert response.get_json()['lines'] == 3
+        assert response.get_json()['symbol_table'] == {'c': 1}
+
+    def test_delete_document(self, client):
+        """Test a deleted document is gone."""
+        response = client.post('/documents', json={'expressions': ['a = 1']})
+        document_id = response.get_json()['id']
+
+        assert client.delete(f'/documents/{document_id}').status_code == 200
+        assert client.delete(f'/documents/{document_id}').status_code == 404
+        response = client.patch(f'/documents/{document_id}', json={'edits': []})
+        assert response.status_code == 404
+
+    def test_edit_removes_variables(self, client):
+        """Test deleting an assignment reports the variables it removes."""
+        response = client.post('/documents',
+                               json={'expressions': ['a = 1', 'b = a']})
+        document_id = response.get_json()['id']
+
+        response = client.patch(f'/documents/{document_id}', json={
+            'edits': [{'start': 1, 'delete': 1}]
+        })
+        data = response.get_json()
+
+        assert data['removed'] == ['a', 'b']
+        assert data['errors'] == [
+            'Line 1: Name Error: Variable `a` is not defined.'
+        ]
+
+    def test_unknown_document(self, client):
+        """Test editing a document that does not exist."""
+        response = client.patch('/documents/missing', json={'edits': []})
+
+        assert response.status_code == 404
+
+
+class TestOutputs:
+    """Test cases for evaluating only the requested outputs."""
+
+    def test_only_needed_lines_run(self, client):
+        """Test unneeded lines, including failing ones, are skipped."""
+        response = client.post('/evaluate', json={
+            'expressions': [
+                'a = 2',
+                'b = a * 3',
+                'c = 1 / 0',
+                'd = (',
+                'final = b + 1',
+                'e = final * c',
+            ],
+            'outputs': ['final']
+        })
+        data = response.get_json()
+
+        assert data['symbol_table'] == {'final': 7}
+        assert [r['line'] for r in data['results']] == [1, 2, 5]
+        assert data['errors'] == []
+        assert data['skipped'] == [3, 4, 6]
+
+    def test_needed_errors_and_unknown_outputs(self, client):
+        """Test errors on needed lines and unknown outputs are reported."""
+        response = client.post('/evaluate', json={
+            'expressions': ['x = 1 / 0', 'y = x + 1', 'z = 5'],
+            'outputs': ['y', 'w']
+        })
+        data = response.get_json()
+
+        assert data['symbol_table'] == {}
+        assert data['errors'] == [
+            'Line 1: Error: division by zero',
+            'Line 2: Name Error: Variable `x` is not defined.',
+            'Name Error: Output `w` is not defined.',
+        ]
+        assert data['skipped'] == [3]
+
+    def test_invalid_outputs(self, client):
+        """Test outputs that are not a list of names are rejected."""
+        for outputs in ['final', [['x']], [1], {'x': 1}]:
+            response = client.post('/evaluate', json={
+                'expressions': ['x = 1'], 'outputs': outputs
+            })
+            assert response.status_code == 400
+            assert response.get_json()['error'] == (
+                'Outputs must be a list of variable names'
+            )
+
+    def test_failing_constant_assignment(self, client):
+        """Test a constant assignment that fails does not hide earlier ones."""
+        expressions = ['x = 1', 'x = 1' + '0' * 400 + ' * 1.5']
+        full = client.post('/evaluate', json={'expressions': expressions})
+        sliced = client.post('/evaluate', json={
+            'expressions': expressions, 'outputs': ['x']
+        })
+
+        assert full.get_json()['symbol_table'] == {'x': 1}
+        assert sliced.get_json()['symbol_table'] == {'x': 1}
+        assert sliced.get_json()['skipped'] == []
+
+
+def read_ndjson(response):
+    lines = response.get_data(as_text=True).splitlines()
+    return [json.loads(line) for line in lines]
+
+
+class TestStreaming:
+    """Test cases for the NDJSON streaming response of /evaluate."""
+
+    expressions = [
+        'a = 5',
+        '',
+        'b = (a',
+        'c = a * 2 + 1',
+        'd = x',
+        'e = c / 0',
+        'a = a + 1 $',
+    ]
+
+    def test_matches_json_response(self, client):
+        """Test each statement gets a line matching the JSON response."""
+        data = client.post('/evaluate',
+                           json={'expressions': self.expressions}).get_json()
+        response = client.post('/evaluate', json={
+            'expressions': self.expressions
+        }, headers={'Accept': 'application/x-ndjson'})
+        lines = read_ndjson(response)
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert [line['line'] for line in lines[:-1]] == [1, 3, 4, 5, 6, 7]
+        assert [l for l in lines if 'result' in l] == data['results']
+        assert [l['error'] for l in lines if 'error' in l] == data['errors']
+        assert lines[-1] == {
+            'success': True,
+            'results': 2,
+            'errors': 4,
+            'skipped': 0,
+            'symbol_table': data['symbol_table'],
+        }
+
+    def test_query_parameter_and_outputs(self, client):
+        """Test `?format=ndjson` with outputs and optimizations."""
+        response = client.post('/evaluate?format=ndjson', json={
+            'expressions': ['a = 2', 'b = 1 / 0', 'c = a * 1'],
+            'outputs': ['c', 'w'],
+            'optimize': True
+        })
+        lines = read_ndjson(response)
+
+        assert lines[:-1] == [
+            {
+                'line': 1,
+                'input': 'a = 2',
+                'postfix': 'a 2 =',
+                'result': 'a = 2',
+                'optimizations': []
+            },
+            {'line': 2, 'skipped': True},
+            {
+                'line': 3,
+                'input': 'c = a * 1',
+                'postfix': 'c a =',
+                'result': 'c = 2',
+                'optimizations': ['simplified `a 1 *` to `a`']
+            },
+            {'error': 'Name Error: Output `w` is not defined.'},
+        ]
+        assert lines[-1]['symbol_table'] == {'c': 2}
+        assert lines[-1]['skipped'] == 1
+
+    def test_json_is_default(self, client):
+        """Test clients accepting anything still get a JSON response."""
+        response = client.post('/evaluate', json={'expressions': ['a = 1']},
+                               headers={'Accept': '*/*'})
+
+        assert response.mimetype == 'application/json'
+
+
+class TestSessions:
+    """Test cases for server-held sessions through /sessions."""
+
+    def test_append_and_query(self, client):
+        """Test appends see earlier variables and only report new lines."""
+        response = client.post('/sessions', json={'expressions': ['a = 5']})
+        data = response.get_json()
+        session_id = data['id']
+        assert data['symbol_table'] == {'a': 5}
+
+        response = client.post(f'/sessions/{session_id}/statements', json={
+            'expressions': ['b = a * 2', 'c = (']
+        })
+        data = response.get_json()
+
+        assert data['results'] == [{
+            'line': 2,
+            'input': 'b = a * 2',
+            'postfix': 'b a 2 * =',
+            'result': 'b = 10'
+        }]
+        assert len(data['errors']) == 1
+        assert data['errors'][0].startswith('Line 3: Parse Error:')
+        assert data['symbol_table'] == {'b': 10}
+
+        response = client.get(f'/sessions/{session_id}?name=b&name=z')
+        data = response.get_json()
+        assert data['lines'] == 3
+        assert data['symbol_table'] == {'b': 10}
+        assert data['errors'] == ['Name Error: Variable `z` is not defined.']
+
+        assert client.get(f'/sessions/{session_id}').get_json()[
+            'symbol_table'
+        ] == {'a': 5, 'b': 10}
+
+    def test_unknown_and_deleted_session(self, client):
+        """Test a deleted session can no longer be used."""
+        session_id = client.post('/sessions').get_json()['id']
+
+        assert client.delete(f'/sessions/{session_id}').status_code == 200
+        assert client.get(f'/sessions/{session_id}').status_code == 404
+        response = client.post(f'/sessions/{session_id}/statements',
+                               json={'expressions': ['a = 1']})
+        assert response.status_code == 404
+
+
+class TestResultCache:
+    """Test cases for cached /evaluate responses and ETags."""
+
+    def test_repeat_request_is_cached(self, client):
+        """Test a repeat request gets the same response from the cache."""
+        from main import result_cache
+
+        expressions = ['cached = 6', 'twice = cached * 2']
+        first = client.post('/evaluate', json={'expressions': expressions})
+        hits = result_cache.hits
+        second = client.post('/evaluate', json={
+            'expressions': [' cached = 6', 'twice = cached * 2 ']
+        })
+
+        assert result_cache.hits == hits + 1
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert second.get_data() == first.get_data()
+        assert second.get_json()['symbol_table'] == {'cached': 6, 'twice': 12}
+
+    def test_if_none_match(self, client):
+        """Test a client that already has the response gets a 304."""
+        json = {'expressions': ['etag = 1'], 'optimize': True}
+        etag = client.post('/evaluate', json=json).headers['ETag']
+
+        response = client.post('/evaluate', json=json,
+                               headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.get_data() == b''
+
+        response = client.post('/evaluate', json={'expressions': ['etag = 2']},
+                               headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+
+class TestSnapshots:
+    """Test cases for resuming documents from a shared prefix."""
+
+    def test_shared_preamble(self, client):
+        """Test a document resumes after a preamble seen before."""
+        from main import snapshots
+
+        preamble = ['s0 = 1'] + [f's{i} = s{i - 1} + {i}' for i in range(1, 300)]
+        preamble.insert(100, 'zero = s99 / 0')
+        first = client.post('/evaluate', json={
+            'expressions': preamble + ['first = s299']
+        }).get_json()
+        hits = snapshots.hits
+        second = client.post('/evaluate', json={
+            'expressions': preamble + ['second = s299 * 2']
+        }).get_json()
+
+        assert snapshots.hits == hits + 1
+        assert second['results'][:-1] == first['results'][:-1]
+        assert second['errors'] == first['errors'] == [
+            'Line 101: Error: division by zero'
+        ]
+        assert second['symbol_table']['second'] == 2 * (1 + sum(range(1, 300)))
+        assert second['symbol_table'].keys() - {'second'} == (
+            first['symbol_table'].keys() - {'first'}
+        )
+
+
+class TestMetrics:
+    """Test cases for the /metrics endpoint."""
+
+    def test_stages_and_errors(self, client):
+        """Test evaluation stages and errors by type are reported."""
+        client.post('/evaluate', json={
+            'expressions': ['metric = 1', 'b = (', 'c = q', 'd = 1 / 0']
+        })
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        assert response.mimetype == 'text/plain'
+        for stage in ('lex', 'parse', 'compile', 'execute', 'serialize'):
+            assert f'evaluator_stage_seconds_count{{stage="{stage}"}}' in text
+        for kind in ('ParseError', 'NameError', 'other'):
+            assert f'evaluator_errors_total{{type="{kind}"}}' in text
+        assert 'evaluator_request_lines_bucket{le="10"}' in text
+        assert '# TYPE evaluator_result_cache_hits_total counter' in text
+
+
+class TestJobs:
+    """Test cases for background evaluation through /jobs."""
+
+    def test_submit_poll_and_page(self, client):
+        """Test a job's results can be fetched page by page."""
+        from main import jobs
+
+        expressions = [f'v{i} = {i} * 2' for i in range(5)] + ['bad = q']
+        response = client.post('/jobs', json={'expressions': expressions})
+        assert response.status_code == 202
+        job_id = response.get_json()['id']
+        jobs.get(job_id).future.result()
+
+        status = client.get(f'/jobs/{job_id}').get_json()
+        assert status['state'] == 'done'
+        assert (status['lines_done'], status['errors']) == (6, 1)
+
+        data = client.get(f'/jobs/{job_id}/results?limit=4').get_json()
+        assert [r['result'] for r in data['results']] == [
+            'v0 = 0', 'v1 = 2', 'v2 = 4', 'v3 = 6'
+        ]
+        assert data['next'] == 4
+
+        data = client.get(f'/jobs/{job_id}/results?offset=4').get_json()
+        assert data['errors'] == [
+            'Line 6: Name Error: Variable `q` is not defined.'
+        ]
+        assert data['next'] is None
+        assert data['symbol_table']['v4'] == 8
+
+    def test_unknown_job(self, client):
+        """Test fetching or cancelling a job that does not exist."""
+        assert client.get('/jobs/missing').status_code == 404
+        assert client.delete('/jobs/missing').status_code == 404
+
+
+class TestProfiling:
+    """Test cases for profiling single /evaluate requests."""
+
+    def test_profile_header(self, client, tmp_path):
+        """Test `X-Profile` writes a profile only when allowed."""
+        json = {'expressions': ['a = 1', 'b = a * 2']}
+        response = client.post('/evaluate', json=json,
+                               headers={'X-Profile': 'cprofile'})
+        assert 'X-Profile-File' not in response.headers
+
+        app.config['PROFILE_DIR'] = str(tmp_path)
+        try:
+            response = client.post('/evaluate', json=json,
+                                   headers={'X-Profile': 'tracemalloc'})
+        finally:
+            app.config['PROFILE_DIR'] = None
+
+        path = response.headers['X-Profile-File']
+        assert path.startswith(str(tmp_path)) and path.endswith('.snapshot')
+        assert (tmp_path / path).exists()
+        assert response.get_json()['symbol_table'] == {'a': 1, 'b': 2}
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from jobs import CANCELLED, DONE, FAILED, JobQueue, QueueFull
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1, max_pending=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_runs_to_completion(queue):
+    job = queue.submit(["a = 2", "", "b = (", "c = a * 3", "d = q"])
+    job.future.result()
+
+    assert job.state == DONE
+    assert job.symbol_table == {"a": 2, "c": 6}
+    assert (job.lines_done, job.errors) == (5, 2)
+    assert [line for line, *_ in job.outcomes] == [1, 3, 4, 5]
+    assert job.outcomes[2][1:] == ("c = a * 3", job.outcomes[2][2], 6)
+
+
+def test_queue_limit_and_cancel(queue):
+    # Keep the only worker busy, so submitted jobs stay queued
+    release = threading.Event()
+    queue.executor.submit(release.wait)
+
+    first = queue.submit(["a = 1"])
+    second = queue.submit(["b = 1"])
+    with pytest.raises(QueueFull):
+        queue.submit(["c = 1"])
+
+    assert queue.cancel(first.id) is first
+    assert first.state == CANCELLED
+    third = queue.submit(["c = 1"])
+
+    release.set()
+    second.future.result()
+    third.future.result()
+    assert second.state == third.state == DONE
+    assert queue.pending == 0
+    assert queue.cancel("missing") is None
+
+
+def test_failure_is_reported(queue):
+    job = queue.submit([None])
+    job.future.result()
+
+    assert job.state == FAILED
+    assert job.failure.startswith("AttributeError")
+    assert queue.pending == 0
@@ -1,3 +1,7 @@
+import io
+import itertools
+import mmap
+
 import pytest
 
 from lexer import Lexer, Token, TokenType
@@ -76,3 +80,77 @@ def test_lexer_invalid_character():
     with pytest.raises(ValueError) as excinfo:
         lexer.tokenize()
     assert "Invalid character: ?" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("character", [",", "."])
+def test_lexer_rejects_punctuation(character):
+    lexer = Lexer(f"a = 1 {character} 2")
+
+    with pytest.raises(ValueError, match="Invalid character"):
+        lexer.tokenize()
+
+
+def test_stream_positions_and_newlines():
+    tokens = list(Lexer.stream(io.StringIO("a = 1\n  b=a*2\n")))
+
+    assert tokens == [
+        Token(TokenType.VAR, "a"),
+        Token(TokenType.ASSIGNMENT, None),
+        Token(TokenType.NUMBER, "1"),
+        Token(TokenType.NEWLINE, None),
+        Token(TokenType.VAR, "b"),
+        Token(TokenType.ASSIGNMENT, None),
+        Token(TokenType.VAR, "a"),
+        Token(TokenType.PRED2, "*"),
+        Token(TokenType.NUMBER, "2"),
+        Token(TokenType.NEWLINE, None),
+        Token(TokenType.EOF, None),
+    ]
+    positions = [(t.line, t.column) for t in tokens[4:7]]
+    assert positions == [(2, 3), (2, 4), (2, 5)]
+
+
+def test_stream_invalid_character_does_not_raise():
+    tokens = list(Lexer.stream(io.StringIO("a = ?\n")))
+
+    assert tokens[2] == Token(TokenType.INVALID, "?")
+
+
+def test_stream_mmap(tmp_path):
+    path = tmp_path / "sample.in"
+    path.write_text("x = 10\ny = x % 3")
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            tokens = list(Lexer.stream(m))
+
+    assert [t.type for t in tokens].count(TokenType.NEWLINE) == 2
+    assert tokens[-2].line == 2
+
+
+def test_stream_is_lazy():
+    class Endless:
+        def readline(self):
+            return "a = 1\n"
+
+    tokens = itertools.islice(Lexer.stream(Endless()), 8)
+
+    assert len(list(tokens)) == 8
+
+
+@pytest.mark.parametrize("input_string", ["1 + 2", "x = -5", "3 * (4 - 5)"])
+def test_tokenize_buffer_matches_tokenize(input_string):
+    buffer = Lexer(input_string).tokenize_buffer()
+
+    assert list(buffer) == Lexer(input_string).tokenize()
+    assert buffer.types.typecode == "B"
+
+
+def test_tokenize_buffer_slices_values():
+    buffer = Lexer("total = rate * 12.5").tokenize_buffer()
+
+    assert buffer.type(0) == TokenType.VAR
+    assert buffer.value(0) == "total"
+    assert buffer.value(1) is None
+    assert buffer.value(4) == "12.5"
+    assert (buffer.starts[4], buffer.ends[4]) == (15, 19)
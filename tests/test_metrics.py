@@ -0,0 +1,41 @@
+from metrics import STAGE_SECONDS, Counter, Histogram, Reading, Registry, timed
+
+
+def test_render():
+    registry = Registry()
+    histogram = registry.register(Histogram("h", "A histogram.", (1, 10), "kind"))
+    counter = registry.register(Counter("c", "A counter."))
+    registry.register(Reading("r", "A reading.", lambda: 7))
+
+    histogram.observe(1, "a")  # bounds are inclusive
+    histogram.observe(5, "a")
+    histogram.observe(50, "a")
+    counter.inc()
+    counter.inc(amount=2)
+
+    assert registry.render().splitlines() == [
+        "# HELP h A histogram.",
+        "# TYPE h histogram",
+        'h_bucket{kind="a",le="1"} 1',
+        'h_bucket{kind="a",le="10"} 2',
+        'h_bucket{kind="a",le="+Inf"} 3',
+        'h_sum{kind="a"} 56',
+        'h_count{kind="a"} 3',
+        "# HELP c A counter.",
+        "# TYPE c counter",
+        "c 3",
+        "# HELP r A reading.",
+        "# TYPE r gauge",
+        "r 7",
+    ]
+
+
+def test_timed_records_on_error():
+    count = STAGE_SECONDS.values.get("test", [None, 0, 0])[2]
+    try:
+        with timed("test"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert STAGE_SECONDS.values["test"][2] == count + 1
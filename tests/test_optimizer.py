@@ -0,0 +1,123 @@
+from parser import Parser, Statement
+
+import pytest
+
+from codegen import CompiledProgram
+from evaluator import Evaluator, NodeType, compile_statement, run
+from optimizer import FOLDED, SHARED, SIMPLIFIED, optimize
+
+
+def _optimize(string: str):
+    statement = Parser.parse_program(string)[0]
+    return optimize(statement.ast)
+
+
+def _postfix(ast) -> str:
+    evaluator = Evaluator(ast, {})
+    evaluator.evaluate()
+    return str(evaluator)
+
+
+@pytest.mark.parametrize(
+    "input_str, expected_postfix, expected_kinds",
+    [
+        pytest.param("a = (3600 * 24 * 7)", "a 604800 =", [FOLDED], id="fold"),
+        pytest.param("a = -(2 - 5)", "a 3 =", [FOLDED], id="fold_unary"),
+        pytest.param("a = 1.5 * 2", "a 3.0 =", [FOLDED], id="fold_float"),
+        pytest.param("a = x * (2 + 3)", "a x 5 * =", [FOLDED], id="fold_subtree"),
+        pytest.param("a = x * 1", "a x =", [SIMPLIFIED], id="times_one"),
+        pytest.param("a = 1 * x", "a x =", [SIMPLIFIED], id="one_times"),
+        pytest.param("a = x + 0", "a x =", [SIMPLIFIED], id="plus_zero"),
+        pytest.param("a = 0 + x", "a x =", [SIMPLIFIED], id="zero_plus"),
+        pytest.param("a = x - 0", "a x =", [SIMPLIFIED], id="minus_zero"),
+        pytest.param("a = --x", "a x =", [SIMPLIFIED], id="double_negation"),
+        pytest.param("a = +x", "a x =", [SIMPLIFIED], id="unary_plus"),
+        pytest.param("a = x * 1.0", "a x 1.0 * =", [], id="float_identity"),
+        pytest.param("a = 0 - x", "a 0 x - =", [], id="zero_minus"),
+        pytest.param(
+            "a = (x + y) * (x + y)",
+            "a x y + =$0 $0 * =",
+            [SHARED],
+            id="shared",
+        ),
+        pytest.param(
+            "a = (x + y) * z + (x + y) * z + (x + y)",
+            "a x y + =$1 z * =$0 $0 + $1 + =",
+            [SHARED, SHARED],
+            id="shared_nested",
+        ),
+        pytest.param("a = x + y * 2", "a x y 2 * + =", [], id="unchanged"),
+    ],
+)
+def test_optimize(input_str, expected_postfix, expected_kinds):
+    ast, changes = _optimize(input_str)
+
+    assert _postfix(ast) == expected_postfix
+    assert [change.kind for change in changes] == expected_kinds
+
+
+def test_unchanged_ast_is_returned_as_is():
+    statement = Parser.parse_program("a = x + y * 2")[0]
+
+    ast, changes = optimize(statement.ast)
+
+    assert ast is statement.ast
+    assert changes == []
+
+
+def test_change_report():
+    _, changes = _optimize("a = (x + 2 * 3) * (x + 6)")
+
+    assert [str(change) for change in changes] == [
+        "folded `2 3 *` to `6`",
+        "shared `x 6 +` to `$0`",
+    ]
+
+
+@pytest.mark.parametrize(
+    "input_str",
+    ["a = 1 / 0", "a = x + 5 % (2 - 2)", "a = (1 / 0) * (1 / 0)"],
+)
+def test_division_by_zero_still_raises(input_str):
+    ast, _ = _optimize(input_str)
+
+    with pytest.raises(ZeroDivisionError):
+        Evaluator(ast, {"x": 1}).execute()
+
+
+def test_undefined_variable_still_raises():
+    ast, _ = _optimize("a = (y * 1) + (y * 1)")
+
+    with pytest.raises(NameError, match="Variable `y` is not defined."):
+        Evaluator(ast, {}).execute()
+
+
+def test_shared_values_match_unoptimized():
+    source = "a = (x - y) * (x - y) / -(x % 3) + -(x % 3) - (x - y)"
+    statement = Parser.parse_program(source)[0]
+    ast, _ = optimize(statement.ast)
+    symbol_table = {"x": 7, "y": 2.5}
+
+    expected = run(compile_statement(statement.ast), symbol_table)
+
+    assert run(compile_statement(ast), symbol_table) == expected
+    program = CompiledProgram([Statement(1, ast)])
+    assert program.run(dict(symbol_table)) == [expected]
+
+
+def test_deeply_nested():
+    depth = 20_000
+    source = "a = " + "(" * depth + "x + 1" + ") * 1" * depth
+    ast, changes = _optimize(source)
+
+    assert len(changes) == depth
+    assert ast == (
+        NodeType.ASSIGNMENT,
+        "a",
+        (
+            NodeType.BINARY_OP,
+            "+",
+            (NodeType.VARIABLE, "x"),
+            (NodeType.NUMBER, 1),
+        ),
+    )
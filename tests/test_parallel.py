@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+from parser import Parser
+
+import pytest
+
+from evaluator import Evaluator
+from parallel import chains, run_parallel
+
+DOCUMENT = "\n".join(
+    [
+        "a = 1",
+        "x = 10",
+        "b = a + 1",
+        "y = x * 2",
+        "",
+        "a = b * 3",
+        "z = q + 1",
+        "c = a / (b - 2)",
+        "w = (",
+        "x = y - x",
+        "d = a % 4",
+    ]
+)
+
+
+def _sequential(document: str, symbol_table: dict) -> list:
+    outcomes = []
+    for statement in Parser.parse_program(document):
+        try:
+            if statement.error is not None:
+                raise statement.error
+            target = Evaluator(statement.ast, symbol_table).execute()
+            outcomes.append((statement.line, symbol_table[target]))
+        except Exception as e:
+            outcomes.append((statement.line, e))
+    return outcomes
+
+
+def test_chains():
+    lines = ["a = 1", "x = 2", "b = a", "y = x + z", "z = 3", "c = b * a"]
+
+    assert chains(lines) == [[0, 2, 5], [1, 3, 4]]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_matches_sequential_evaluation(workers):
+    expected_table, symbol_table = {"q": 0.5}, {"q": 0.5}
+    expected = _sequential(DOCUMENT, expected_table)
+
+    with ThreadPoolExecutor(workers) as executor:
+        outcomes = run_parallel(DOCUMENT, symbol_table, workers, executor)
+
+    assert [line for line, _ in outcomes] == [line for line, _ in expected]
+    assert list(map(repr, outcomes)) == list(map(repr, expected))
+    assert list(symbol_table.items()) == list(expected_table.items())
+
+
+def test_process_pool():
+    symbol_table = {}
+
+    outcomes = run_parallel(DOCUMENT, symbol_table, workers=2)
+
+    assert outcomes[2] == (3, 2)
+    assert isinstance(outcomes[6][1], ZeroDivisionError)
+    assert symbol_table == {"a": 6, "x": 10, "b": 2, "y": 20, "d": 2}
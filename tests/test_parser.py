@@ -1,8 +1,10 @@
-from parser import ParseError, Parser, Token, TokenType
+import io
+from parser import ParseError, Parser, Statement, Token, TokenType
 
 import pytest
 
 from evaluator import NodeType
+from lexer import Lexer
 
 
 class TestParser:
@@ -801,3 +803,174 @@ class TestParserEdgeCases:
         parser = Parser(tokens)
         ast = parser.parse()
         assert ast == (NodeType.ASSIGNMENT, "x", (NodeType.NUMBER, 42))
+
+
+class TestParseStream:
+    """Test cases for parsing a token stream statement by statement."""
+
+    def test_statements_with_line_numbers(self):
+        """Test that each non-blank line yields one statement."""
+        source = io.StringIO("a = 1\n\nb = a + 2\n")
+        statements = list(Parser.parse_stream(Lexer.stream(source)))
+
+        assert statements == [
+            Statement(1, (NodeType.ASSIGNMENT, "a", (NodeType.NUMBER, 1))),
+            Statement(
+                3,
+                (
+                    NodeType.ASSIGNMENT,
+                    "b",
+                    (
+                        NodeType.BINARY_OP,
+                        "+",
+                        (NodeType.VARIABLE, "a"),
+                        (NodeType.NUMBER, 2),
+                    ),
+                ),
+            ),
+        ]
+
+    def test_errors_do_not_stop_the_stream(self):
+        """Test that bad lines are reported and parsing continues."""
+        source = io.StringIO("a = \nb = ?\nc = 3")
+        statements = list(Parser.parse_stream(Lexer.stream(source)))
+
+        assert [s.line for s in statements] == [1, 2, 3]
+        assert isinstance(statements[0].error, ParseError)
+        assert isinstance(statements[1].error, ValueError)
+        assert statements[2].ast == (
+            NodeType.ASSIGNMENT,
+            "c",
+            (NodeType.NUMBER, 3),
+        )
+
+
+class TestParseTokenBuffer:
+    """Test cases for parsing from a compact `TokenBuffer`."""
+
+    def test_same_ast_as_token_list(self):
+        """Test that a buffer and a token list parse identically."""
+        lexer = Lexer("x = (a + 2.5) * -b % 3")
+
+        buffer_ast = Parser(lexer.tokenize_buffer()).parse()
+
+        assert buffer_ast == Parser(lexer.tokenize()).parse()
+
+    def test_errors_from_buffer(self):
+        """Test that parse errors still name the offending token."""
+        parser = Parser(Lexer("x = 1 )").tokenize_buffer())
+
+        with pytest.raises(ParseError, match="after statement: PRED3"):
+            parser.parse()
+
+
+class TestParserDeepNesting:
+    """Test that nesting depth is not bounded by the recursion limit."""
+
+    DEPTH = 20_000
+
+    def test_deep_parentheses(self):
+        """Test parenthesis nesting far beyond the recursion limit."""
+        text = "x = " + "(" * self.DEPTH + "1" + ")" * self.DEPTH
+        ast = Parser(Lexer(text).tokenize_buffer()).parse()
+
+        assert ast == (NodeType.ASSIGNMENT, "x", (NodeType.NUMBER, 1))
+
+    def test_deep_unary_chain(self):
+        """Test a long chain of unary minus signs."""
+        text = "x = " + "- " * self.DEPTH + "y"
+        node = Parser(Lexer(text).tokenize_buffer()).parse()[2]
+
+        for _ in range(self.DEPTH):
+            assert node[:2] == (NodeType.UNARY_OP, "-")
+            node = node[2]
+        assert node == (NodeType.VARIABLE, "y")
+
+    def test_deep_right_nested_operations(self):
+        """Test right-nested binary operations inside parentheses."""
+        text = "x = " + "1 - (" * self.DEPTH + "2" + ")" * self.DEPTH
+        node = Parser(Lexer(text).tokenize_buffer()).parse()[2]
+
+        for _ in range(self.DEPTH):
+            assert node[:3] == (NodeType.BINARY_OP, "-", (NodeType.NUMBER, 1))
+            node = node[3]
+        assert node == (NodeType.NUMBER, 2)
+
+
+class TestParseProgram:
+    """Test cases for parsing whole multi-line documents."""
+
+    def test_statements_with_line_numbers(self):
+        """Test that each non-blank line becomes a numbered statement."""
+        statements = Parser.parse_program("a = 1\n\n   \nb = a * 2\n")
+
+        assert statements == [
+            Statement(1, (NodeType.ASSIGNMENT, "a", (NodeType.NUMBER, 1))),
+            Statement(
+                4,
+                (
+                    NodeType.ASSIGNMENT,
+                    "b",
+                    (
+                        NodeType.BINARY_OP,
+                        "*",
+                        (NodeType.VARIABLE, "a"),
+                        (NodeType.NUMBER, 2),
+                    ),
+                ),
+            ),
+        ]
+
+    def test_same_ast_as_single_statements(self):
+        """Test that a document parses like its lines one at a time."""
+        lines = ["x = (a + 2.5) * -b % 3", "y = x - -x", "z = +(y)"]
+        statements = Parser.parse_program("\n".join(lines))
+
+        assert [s.ast for s in statements] == [
+            Parser(Lexer(line).tokenize()).parse() for line in lines
+        ]
+
+    @pytest.mark.parametrize(
+        "line, error, message",
+        [
+            ("b = a +", ParseError, "Unexpected token: EOF"),
+            ("b = (a", ParseError, "Expected closing parenthesis"),
+            ("b = a a", ParseError, "Unexpected token after statement"),
+            ("3 = a", ParseError, "Expected variable name"),
+            ("b = a ? 1", ValueError, "Invalid character: ?"),
+            ("b = ) ?", ValueError, "Invalid character: ?"),
+        ],
+    )
+    def test_recovers_after_error(self, line, error, message):
+        """Test that a bad line is reported and the next one parsed."""
+        statements = Parser.parse_program(f"a = 1\n{line}\nc = 2")
+
+        assert [s.line for s in statements] == [1, 2, 3]
+        assert statements[1].ast is None
+        assert isinstance(statements[1].error, error)
+        assert message in str(statements[1].error)
+        assert statements[2].ast == (
+            NodeType.ASSIGNMENT,
+            "c",
+            (NodeType.NUMBER, 2),
+        )
+
+
+class TestLeafSharing:
+    """Test that identical leaf nodes are built once per parser."""
+
+    def test_leaves_are_shared_across_statements(self):
+        """Test that repeated literals and variables reuse one node."""
+        statements = Parser.parse_program("a = b + b * 2\nc = b - 2")
+        first, second = statements[0].ast[2], statements[1].ast[2]
+
+        assert first[2] is first[3][2] is second[2]
+        assert first[3][3] is second[3]
+
+    def test_int_and_float_literals_stay_distinct(self):
+        """Test that equal int and float literals are not merged."""
+        ast = Parser(Lexer("a = 1 + 1.0").tokenize_buffer()).parse()
+        _, _, left, right = ast[2]
+
+        assert type(left[1]) is int
+        assert type(right[1]) is float
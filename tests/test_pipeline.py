@@ -0,0 +1,87 @@
+import cProfile
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import CProfileHook, Hook, Pipeline, StageTimer, TracemallocHook
+
+
+class Recorder(Hook):
+    def __init__(self):
+        self.events = []
+
+    def run_started(self):
+        self.events.append("run")
+
+    def stage_started(self, stage):
+        self.events.append(stage)
+
+    def statement_finished(self, line, seconds, outcome):
+        self.events.append((line, outcome))
+
+
+def test_hooks_see_every_stage_and_statement():
+    recorder, timer = Recorder(), StageTimer(slowest=2)
+    with Pipeline([recorder, timer]) as pipeline:
+        evaluation = pipeline.evaluate(["a = 2", "", "b = a * 3", "c = 1 +"], True)
+
+    assert recorder.events[:6] == [
+        "run",
+        "lex",
+        "parse",
+        "optimize",
+        "compile",
+        "execute",
+    ]
+    assert recorder.events[6:8] == [(1, 2), (3, 6)]
+    assert recorder.events[8][0] == 4
+    assert set(timer.stages) == {"lex", "parse", "optimize", "compile", "execute"}
+    assert len(timer.statements) == 2
+    assert evaluation.symbol_table == {"a": 2, "b": 6}
+
+
+def test_outputs():
+    evaluation = Pipeline().evaluate(["a = 1", "b = 2", "c = a + 1"], outputs=["c"])
+
+    assert evaluation.needed == [True, False, True]
+    assert evaluation.outcomes == [1, None, 2]
+    assert evaluation.symbol_table == {"c": 2}
+
+
+def test_profilers_write_files(tmp_path):
+    stats, snapshot = tmp_path / "run.pstats", tmp_path / "run.snapshot"
+    hooks = [CProfileHook(str(stats)), TracemallocHook(str(snapshot))]
+    with Pipeline(hooks) as pipeline:
+        pipeline.evaluate(["a = 1", "b = a * 2"])
+
+    assert pstats.Stats(str(stats)).total_calls > 0
+    assert tracemalloc.Snapshot.load(str(snapshot)).traces
+    assert not tracemalloc.is_tracing()
+
+
+def test_concurrent_profiled_runs(tmp_path):
+    paths = [str(tmp_path / f"{i}.pstats") for i in range(4)]
+
+    def profile(path):
+        with Pipeline([CProfileHook(path)]) as pipeline:
+            return pipeline.evaluate(["a = 1", "b = a * 2"]).symbol_table
+
+    with ThreadPoolExecutor(4) as executor:
+        tables = list(executor.map(profile, paths))
+
+    assert tables == [{"a": 1, "b": 2}] * 4
+    assert all(pstats.Stats(path).total_calls > 0 for path in paths)
+
+
+def test_skips_profiling_under_another_profiler(tmp_path):
+    path = tmp_path / "run.pstats"
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        with Pipeline([CProfileHook(str(path))]) as pipeline:
+            evaluation = pipeline.evaluate(["a = 1"])
+    finally:
+        other.disable()
+
+    assert evaluation.symbol_table == {"a": 1}
+    assert not path.exists()
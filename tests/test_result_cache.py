@@ -0,0 +1,30 @@
+from result_cache import ResultCache
+
+
+def test_key_ignores_surrounding_whitespace():
+    key = ResultCache.key(["a = 1 ", " b = a"], optimize=False)
+
+    assert key == ResultCache.key(["a = 1", "b = a"], optimize=False)
+    assert key != ResultCache.key(["a = 1", "b =  a"], optimize=False)
+    assert key != ResultCache.key(["a = 1", "b = a"], optimize=True)
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+
+    assert "b" not in cache
+    assert cache.get("a") == b"1234" and cache.get("c") == b"1234"
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, cache.size) == (3, 1, 8)
+
+
+def test_too_large_is_not_cached():
+    cache = ResultCache(max_bytes=4)
+    cache.put("a", b"12")
+    cache.put("b", b"12345")
+
+    assert "a" in cache and "b" not in cache
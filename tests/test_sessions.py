@@ -0,0 +1,90 @@
+from incremental import Document
+from sessions import Session, SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_append_continues_session():
+    session = Session()
+    session.append(["a = 2", "", "b = a * 3"])
+    outcomes = session.append(["c = a + b", "d = (", "e = q"])
+
+    assert session.symbol_table == {"a": 2, "b": 6, "c": 8}
+    assert session.lines == 6
+    assert [line for line, *_ in outcomes] == [4, 5, 6]
+    assert outcomes[0][1:] == ("c = a + b", outcomes[0][2], 8)
+    assert outcomes[1][2] is None
+    assert str(outcomes[2][3]) == "Variable `q` is not defined."
+
+
+def test_reassignment_keeps_size_current():
+    session = Session()
+    session.append(["a = 1"])
+    small = session.size
+    session.append(["a = " + "9" * 1000])
+
+    assert session.size > small
+    session.append(["a = 1"])
+    assert session.size == small
+
+
+def test_expire_after_ttl():
+    clock = Clock()
+    store = SessionStore(ttl=10, clock=clock)
+    old, _ = store.create()
+    clock.now = 6
+    used, _ = store.create()
+    clock.now = 12
+    store.append(used, ["a = 1"])
+
+    assert store.get(old) is None
+    assert store.get(used) is not None
+    clock.now = 30
+    assert len(store) == 0
+
+
+def test_evict_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    first, _ = store.create()
+    second, _ = store.create()
+    store.get(first)
+    third, _ = store.create()
+
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.evictions == 1
+
+
+def test_store_other_state():
+    store = SessionStore(max_sessions=2, factory=Document)
+    first, document = store.create(["a = 1", "b = a * 2"])
+    assert document.symbol_table == {"a": 1, "b": 2}
+    assert store._size == document.size > 0
+
+    assert store.use(first, lambda d: d.edit([(1, 1, ["a = 5"])])) == [0, 1]
+    assert store._size == document.size
+    store.create()
+    store.create()
+    assert store.use(first, lambda d: d.edit([])) is None
+
+
+def test_memory_budget():
+    store = SessionStore(max_bytes=1000)
+    small, _ = store.create()
+    store.append(small, ["a = 1"])
+    big, session = store.create()
+    store.append(big, ["a = " + "9" * 5000])
+
+    # The session being appended to is kept even though it is over budget
+    assert store.get(small) is None
+    assert store.get(big) is session
+
+    assert store.delete(big)
+    assert not store.delete(big)
+    assert store._size == 0
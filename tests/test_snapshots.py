@@ -0,0 +1,63 @@
+from pipeline import Pipeline
+from snapshots import SnapshotStore, prefix_keys
+
+PREAMBLE = [f"v{i} = v{i - 1} * 3 % 1000" if i else "v0 = 7" for i in range(40)]
+PREAMBLE[5] = "bad = ("
+PREAMBLE[9] = "v9 = v8 / 0"
+PREAMBLE[12] = "v3 = missing + 1"
+
+
+def evaluate(pipeline: Pipeline, expressions: list[str], optimized=False) -> tuple:
+    evaluation = pipeline.evaluate(expressions, optimized)
+    outcomes = [
+        (statement.line, str(statement.error or outcome))
+        for statement, outcome in zip(evaluation.statements, evaluation.outcomes)
+    ]
+    return outcomes, list(evaluation.symbol_table.items())
+
+
+def test_resumes_from_shared_prefix():
+    store = SnapshotStore(interval=8)
+    pipeline = Pipeline(snapshots=store)
+    first = PREAMBLE + ["x = v39 + 1"]
+    second = PREAMBLE + ["", "v0 = 99", "y = v0 + v3"]
+
+    assert evaluate(pipeline, first) == evaluate(Pipeline(), first)
+    assert (store.hits, store.misses) == (0, 1)
+
+    assert evaluate(pipeline, second) == evaluate(Pipeline(), second)
+    assert store.hits == 1 and store.resumed == 40
+    # Whitespace does not change the key, as for the statement cache
+    spaced = ["  " + line.replace(" ", "  ") for line in second]
+    assert evaluate(pipeline, spaced) == evaluate(Pipeline(), spaced)
+    assert store.resumed == 40 + 42
+
+
+def test_optimized_runs_keep_their_own_snapshots():
+    store = SnapshotStore(interval=8)
+    evaluate(Pipeline(snapshots=store), PREAMBLE)
+    expected = evaluate(Pipeline(), PREAMBLE, optimized=True)
+
+    assert evaluate(Pipeline(snapshots=store), PREAMBLE, optimized=True) == expected
+    assert store.hits == 0
+
+
+def test_memory_budget_keeps_the_longest_prefix_it_can():
+    store = SnapshotStore(interval=8)
+    Pipeline(snapshots=store).evaluate(PREAMBLE)
+    assert len(store) == 5
+    budget = store.size
+
+    store = SnapshotStore(max_bytes=budget - 1, interval=8)
+    pipeline = Pipeline(snapshots=store)
+    pipeline.evaluate(PREAMBLE)
+    assert 0 < store.size < budget and len(store) == 4
+    assert store.resume(prefix_keys(PREAMBLE)).length == 32
+    assert evaluate(pipeline, PREAMBLE) == evaluate(Pipeline(), PREAMBLE)
+
+    # Snapshots others build on go last
+    pipeline.evaluate(["other = 1"] * 16)
+    assert all(
+        snapshot.parent is None or snapshot.parent.key in store.snapshots
+        for snapshot in store.snapshots.values()
+    )
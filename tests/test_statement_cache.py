@@ -0,0 +1,80 @@
+from parser import Parser
+
+from incremental import Document
+from jobs import Job
+from pipeline import Pipeline
+from sessions import Session
+from statement_cache import StatementCache
+
+LINES = [
+    "a = 5",
+    "",
+    "b  =  a *   2",
+    "c = (",
+    "d = q",
+    "e = 1 / 0",
+    "f = 2 $",
+    "g = a + b",
+    "c = (",
+]
+
+
+def outcomes(pipeline: Pipeline, expressions: list[str]) -> list:
+    evaluation = pipeline.evaluate(expressions)
+    return [
+        (statement.line, str(statement.error or outcome))
+        for statement, outcome in zip(evaluation.statements, evaluation.outcomes)
+    ] + [evaluation.symbol_table]
+
+
+def test_matches_uncached_pipeline():
+    cache = StatementCache()
+    expected = outcomes(Pipeline(), LINES)
+
+    assert outcomes(Pipeline(cache=cache), LINES) == expected
+    # The unfinished line on both lines 4 and 9 is parsed once
+    assert (cache.hits, cache.misses) == (1, 7)
+    assert outcomes(Pipeline(cache=cache), LINES) == expected
+    assert cache.hits == 9
+    # An unfinished line fails naming EOF wherever it is
+    assert "EOF" in expected[2][1] and expected[2][1] == expected[-2][1]
+
+
+def test_normalized_text_shares_an_entry():
+    cache = StatementCache()
+    first = cache.get("x = 1 + y")
+
+    assert cache.get("  x=1 +   y ") is not first
+    assert cache.get("x  =  1 + y") is first
+    assert first.ast == Parser.parse_program("x = 1 + y")[0].ast
+
+
+def test_memory_budget():
+    cache = StatementCache(max_bytes=1000)
+    for i in range(50):
+        cache.get(f"v{i} = {i} + v{i - 1}")
+
+    assert 0 < cache.size <= 1000
+    assert len(cache.entries) < 50
+    assert cache.get("v49 = 49 + v48") is cache.get("v49 = 49 + v48")
+
+
+def test_shared_by_sessions_documents_and_jobs():
+    cache = StatementCache()
+    expressions = ["a = 5", "b = a * 2", "c = ("]
+
+    Session(cache).append(expressions)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    session = Session(cache)
+    outcomes = session.append(expressions)
+    assert [outcome for *_, outcome in outcomes][:2] == [5, 10]
+    assert session.symbol_table == {"a": 5, "b": 10}
+
+    document = Document(expressions, cache)
+    assert document.symbol_table == {"a": 5, "b": 10}
+
+    job = Job(expressions, cache)
+    job.run()
+    assert job.symbol_table == {"a": 5, "b": 10} and job.errors == 1
+    assert (cache.hits, cache.misses) == (9, 3)
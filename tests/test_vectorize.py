@@ -0,0 +1,92 @@
+from parser import Parser
+
+import pytest
+
+from evaluator import Evaluator
+
+np = pytest.importorskip("numpy")
+
+from vectorize import evaluate_columns  # noqa: E402
+
+
+def _rows(document: str, columns: dict, rows: int) -> list[dict]:
+    """Evaluate `document` one row at a time, the scalar way."""
+    tables = []
+    for row in range(rows):
+        symbol_table = {name: column[row] for name, column in columns.items()}
+        for statement in Parser.parse_program(document):
+            Evaluator(statement.ast, symbol_table).execute()
+        tables.append(symbol_table)
+    return tables
+
+
+def test_statements_run_over_columns():
+    symbol_table = {"a": np.array([1, 2, 3])}
+
+    outcomes = evaluate_columns("b = a + 2\nc = b * 3", symbol_table)
+
+    assert [outcome.tolist() for outcome in outcomes] == [[3, 4, 5], [9, 12, 15]]
+    assert symbol_table["c"].tolist() == [9, 12, 15]
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        pytest.param("r = a / b", id="true_division"),
+        pytest.param("r = a % b", id="modulo_sign_of_divisor"),
+        pytest.param("r = -a % b + a / b * 2", id="mixed"),
+        pytest.param("r = a % f", id="float_modulo"),
+        pytest.param("r = a * 4611686018427387904 * b", id="past_int64"),
+        pytest.param("r = a * 3\ns = r - 9223372036854775807", id="overflow"),
+        pytest.param("r = 9007199254740993 * a / b", id="exact_int_division"),
+        pytest.param("r = 2 * 3", id="constant"),
+    ],
+)
+def test_matches_row_by_row(document):
+    columns = {
+        "a": [7, -7, 7, -7, 0],
+        "b": [2, 2, -2, -2, 3],
+        "f": [2.5, -2.5, 0.5, -0.5, 1.5],
+    }
+    symbol_table = {name: np.array(column) for name, column in columns.items()}
+
+    evaluate_columns(document, symbol_table)
+
+    for row, expected in enumerate(_rows(document, columns, 5)):
+        for name, value in expected.items():
+            actual = symbol_table[name][row]
+            if isinstance(actual, np.generic):
+                actual = actual.item()
+            assert type(actual) is type(value)
+            assert actual == value
+
+
+@pytest.mark.parametrize(
+    "document, message",
+    [
+        ("c = a / b", "division by zero at row 2"),
+        ("c = a % (b * 1.0)", "modulo by zero at row 2"),
+    ],
+)
+def test_division_by_zero_reports_row(document, message):
+    symbol_table = {"a": np.array([1, 2, 3, 4]), "b": np.array([1, 1, 0, 0])}
+
+    outcomes = evaluate_columns(document, symbol_table)
+
+    assert isinstance(outcomes[0], ZeroDivisionError)
+    assert str(outcomes[0]) == message
+    assert "c" not in symbol_table
+
+
+def test_errors_are_per_statement():
+    symbol_table = {"a": np.array([1, 2])}
+
+    outcomes = evaluate_columns("b = x + 1\nc = (\nd = a - 1", symbol_table)
+
+    assert str(outcomes[0]) == "Variable `x` is not defined."
+    assert outcomes[2].tolist() == [0, 1]
+
+
+def test_columns_must_have_the_same_length():
+    with pytest.raises(ValueError, match="different lengths"):
+        evaluate_columns("c = a + b", {"a": [1, 2], "b": [1, 2, 3]})
@@ -0,0 +1,198 @@
+"""
+Evaluate a document over whole columns of inputs with NumPy.
+
+Every variable is bound to a 1-D array with one entry per input row (or to
+a scalar, which broadcasts), and each statement runs as a handful of
+vectorized operations over all rows at once.
+
+Results follow the same semantics as `Evaluator.execute` row by row:
+`/` is true division and `%` takes the sign of the divisor, as in Python.
+Integer columns are int64; an operation that would overflow int64, or
+lose precision by dividing ints past 2**53 as floats, is redone on Python
+ints so results stay exact. Division or modulo by zero raises
+`ZeroDivisionError` naming the first row it happened in.
+"""
+
+from parser import Parser
+
+import numpy as np
+
+from evaluator import BINARY_OPCODES, UNARY_POSTFIX, to_postfix
+
+# float64 represents every integer up to this magnitude exactly
+EXACT_FLOAT_INT = 2**53
+INT64_MIN = np.iinfo(np.int64).min
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def as_column(value) -> np.ndarray:
+    """Convert an input value or column to an int64 or float64 array."""
+    array = np.asarray(value)
+    kind = array.dtype.kind
+    if array.ndim > 1:
+        raise ValueError(f"Columns must be 1-D, got shape {array.shape}")
+    elif kind == "u" and (array > INT64_MAX).any():
+        return array.astype(object)
+    elif kind in "iub":
+        return array.astype(np.int64, copy=False)
+    elif array.dtype.kind == "f":
+        return array.astype(np.float64, copy=False)
+    elif array.dtype.kind == "O":
+        return array  # exact Python ints from an earlier statement
+    raise TypeError(f"Unsupported column type: {array.dtype}")
+
+
+def _is_int64(*arrays) -> bool:
+    return all(array.dtype == np.int64 for array in arrays)
+
+
+def _exact(*arrays) -> list[np.ndarray]:
+    """Redo an int64 operation on Python ints, as an object array."""
+    return [array.astype(object) for array in arrays]
+
+
+def _inexact_as_float(array: np.ndarray) -> bool:
+    return bool(((array > EXACT_FLOAT_INT) | (array < -EXACT_FLOAT_INT)).any())
+
+
+def _first_row(mask: np.ndarray) -> int:
+    return int(np.flatnonzero(mask)[0]) if mask.ndim else 0
+
+
+def _check_divisor(b: np.ndarray, operation: str):
+    zeros = b == 0
+    if zeros.any():
+        row = _first_row(np.asarray(zeros))
+        raise ZeroDivisionError(f"{operation} by zero at row {row}")
+
+
+def _add(a, b):
+    if _is_int64(a, b):
+        result = a + b
+        # overflowed where the sign of the result differs from both
+        if (((a ^ result) & (b ^ result)) < 0).any():
+            a, b = _exact(a, b)
+        else:
+            return result
+    return a + b
+
+
+def _sub(a, b):
+    if _is_int64(a, b):
+        result = a - b
+        if (((a ^ b) & (a ^ result)) < 0).any():
+            a, b = _exact(a, b)
+        else:
+            return result
+    return a - b
+
+
+def _mul(a, b):
+    if _is_int64(a, b):
+        # The float product is within rounding of the exact one, so
+        # anything near 2**63 is redone exactly to be sure
+        estimate = np.abs(a.astype(np.float64) * b.astype(np.float64))
+        if (estimate >= 2.0**62).any():
+            a, b = _exact(a, b)
+        else:
+            return a * b
+    return a * b
+
+
+def _div(a, b):
+    _check_divisor(b, "division")
+    if _is_int64(a, b) and (_inexact_as_float(a) or _inexact_as_float(b)):
+        a, b = _exact(a, b)
+    return a / b
+
+
+def _mod(a, b):
+    _check_divisor(b, "modulo")
+    # `np.remainder` floors like Python's `%`, unlike `np.fmod`
+    return np.remainder(a, b)
+
+
+def _neg(a):
+    if _is_int64(a) and (a == INT64_MIN).any():
+        (a,) = _exact(a)
+    return -a
+
+
+# Indexed by `Opcode`, like `BINARY_OPERATIONS`
+COLUMN_OPERATIONS = (_add, _sub, _mul, _div, _mod)
+
+
+def _run(postfix: list, symbol_table: dict, rows: int | None) -> np.ndarray:
+    """Evaluate one assignment in postfix notation over every row."""
+    stack, temps = [], {}
+
+    # ignore first and last symbol
+    for i in range(1, len(postfix) - 1):
+        item = postfix[i]
+
+        if type(item) is not str:
+            stack.append(as_column(item))
+        elif item in BINARY_OPCODES:
+            b = stack.pop()
+            operation = COLUMN_OPERATIONS[BINARY_OPCODES[item]]
+            # 0-d operands give scalars back, so re-wrap every result
+            stack[-1] = as_column(operation(stack[-1], b))
+        elif item == UNARY_POSTFIX["-"]:
+            stack[-1] = as_column(_neg(stack[-1]))
+        elif item == UNARY_POSTFIX["+"]:
+            continue
+        elif item[0] == "$":
+            stack.append(temps[item[1:]])
+        elif item[:2] == "=$":
+            temps[item[2:]] = stack[-1]
+        elif item not in symbol_table:
+            raise NameError(f"Variable `{item}` is not defined.")
+        else:
+            stack.append(as_column(symbol_table[item]))
+
+    result = stack[0]
+    if rows is not None and result.ndim == 0:
+        result = np.full(rows, result, dtype=result.dtype)
+    return result
+
+
+def _rows(symbol_table: dict) -> int | None:
+    """The number of rows shared by every input column."""
+    lengths = {
+        len(array)
+        for array in map(np.asarray, symbol_table.values())
+        if array.ndim == 1
+    }
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else None
+
+
+def evaluate_columns(document: str, symbol_table: dict) -> list:
+    """
+    Run every statement of `document` over the columns in `symbol_table`.
+
+    Like `CompiledProgram.run`, assigned columns are added to
+    `symbol_table` in place and one outcome is returned per statement: the
+    assigned column, or the exception that statement raised.
+    """
+    rows = _rows(symbol_table)
+    outcomes = []
+
+    for statement in Parser.parse_program(document):
+        if statement.error is not None:
+            outcomes.append(statement.error)
+            continue
+
+        postfix = to_postfix(statement.ast)
+        try:
+            # Python floats overflow to inf and give nan silently too
+            with np.errstate(over="ignore", invalid="ignore"):
+                column = _run(postfix, symbol_table, rows)
+        except Exception as e:
+            outcomes.append(e)
+        else:
+            symbol_table[postfix[0]] = column
+            outcomes.append(column)
+
+    return outcomes